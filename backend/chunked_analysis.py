@@ -0,0 +1,222 @@
+"""
+Chunked (out-of-core) aggregation of scored reviews
+
+Reads the reviews CSV in chunks with explicit dtypes and only the columns
+the analysis needs, scores each chunk and folds it into running aggregates:
+per-station counts and sums, network sentiment/rating distributions, topic
+word counts per sentiment, a bounded reservoir sample for scatter plots and
+the most recent negative reviews per station. Memory stays bounded by the
+chunk size and the number of stations, not by the number of reviews.
+"""
+
+import heapq
+import random
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from sentiment_scorers import STOP_WORDS
+
+REVIEW_COLUMNS = ['place_id', 'place_name', 'author_name', 'rating', 'text', 'time', 'review_date']
+
+REVIEW_DTYPES = {
+    'place_id': 'string',
+    'place_name': 'string',
+    'author_name': 'string',
+    'rating': 'float32',
+    'text': 'string',
+    'time': 'float64',
+    'review_date': 'string',
+}
+
+PLACE_COLUMNS = ['place_id', 'name', 'rating', 'address', 'latitude', 'longitude', 'reviews_count']
+
+PLACE_DTYPES = {
+    'place_id': 'string',
+    'name': 'string',
+    'rating': 'float32',
+    'address': 'string',
+    'latitude': 'float64',
+    'longitude': 'float64',
+    'reviews_count': 'int32',
+}
+
+SENTIMENTS = ('positive', 'neutral', 'negative')
+
+
+def iter_review_chunks(reviews_file: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Yield reviews with usable text, chunk by chunk"""
+    for chunk in pd.read_csv(reviews_file, usecols=REVIEW_COLUMNS, dtype=REVIEW_DTYPES, chunksize=chunksize):
+        text = chunk['text']
+        yield chunk[text.notna() & (text.str.len() > 5)]
+
+
+class ReviewAggregates:
+    """Running aggregates folded from scored review chunks"""
+
+    def __init__(self, sample_size: int = 5000, negatives_per_station: int = 50, seed: int = 0):
+        """
+        Args:
+            sample_size: Reviews kept in the reservoir sample for scatter plots
+            negatives_per_station: Most recent negative reviews kept per station
+            seed: Random seed of the reservoir sample
+        """
+        # place_id -> [count, rating_sum, polarity_sum, positive, neutral, negative,
+        #              weight_sum, positive_weight, negative_weight, rating_weight]; the
+        # rating and polarity sums are weighted by reviewer_weight when chunks carry
+        # one, and rating_weight only covers reviews that have a rating
+        self.stations: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0, 0.0, 0, 0, 0, 0.0, 0.0, 0.0, 0.0])
+        self.sentiment_counts = Counter()
+        self.rating_counts = Counter()
+        self.topic_counts = {sentiment: Counter() for sentiment in SENTIMENTS}
+        self.total_reviews = 0
+        self.rating_sum = 0.0
+        self.rated_reviews = 0
+        self.polarity_sum = 0.0
+
+        self.sample_size = sample_size
+        self.sample: List[tuple] = []  # (rating, sentiment, polarity)
+        self._sample_seen = 0
+        self._random = random.Random(seed)
+
+        self.negatives_per_station = negatives_per_station
+        self._negatives: Dict[str, list] = defaultdict(list)  # min-heaps of (time, seq, review)
+        self._sequence = 0
+
+    def fold(self, chunk: pd.DataFrame):
+        """
+        Fold one scored chunk (needs sentiment and polarity columns)
+
+        Args:
+            chunk: Reviews chunk with rating, sentiment, polarity, text
+        """
+        ratings = chunk['rating'].to_numpy(dtype=float)
+        rated = ~np.isnan(ratings)
+        polarities = chunk['polarity'].to_numpy(dtype=float)
+        sentiments = chunk['sentiment'].to_numpy()
+        if 'reviewer_weight' in chunk.columns:
+            weights = chunk['reviewer_weight'].to_numpy(dtype=float)
+        else:
+            weights = np.ones(len(chunk))
+
+        self.total_reviews += len(chunk)
+        self.rating_sum += ratings[rated].sum()
+        self.rated_reviews += int(rated.sum())
+        self.polarity_sum += polarities.sum()
+        self.sentiment_counts.update(chunk['sentiment'].value_counts().to_dict())
+        self.rating_counts.update(chunk['rating'].value_counts().to_dict())
+
+        # Station sums via a vectorized groupby per chunk
+        grouped = pd.DataFrame({
+            'place_id': chunk['place_id'].to_numpy(),
+            'rating': np.where(rated, ratings, 0.0) * weights,
+            'polarity': polarities * weights,
+            'positive': sentiments == 'positive',
+            'neutral': sentiments == 'neutral',
+            'negative': sentiments == 'negative',
+            'weight': weights,
+            'positive_weight': (sentiments == 'positive') * weights,
+            'negative_weight': (sentiments == 'negative') * weights,
+            'rating_weight': rated * weights,
+        }).groupby('place_id').agg(
+            count=('rating', 'size'), rating=('rating', 'sum'), polarity=('polarity', 'sum'),
+            positive=('positive', 'sum'), neutral=('neutral', 'sum'), negative=('negative', 'sum'),
+            weight=('weight', 'sum'), positive_weight=('positive_weight', 'sum'),
+            negative_weight=('negative_weight', 'sum'), rating_weight=('rating_weight', 'sum')
+        )
+        for place_id, row in zip(grouped.index, grouped.to_numpy()):
+            totals = self.stations[place_id]
+            for i, value in enumerate(row):
+                totals[i] += value
+
+        # Topic word counts per sentiment
+        for sentiment in SENTIMENTS:
+            texts = chunk.loc[chunk['sentiment'] == sentiment, 'text']
+            if len(texts):
+                words = re.sub(r'[^\w\s]', ' ', ' '.join(texts.astype(str)).lower()).split()
+                self.topic_counts[sentiment].update(
+                    word for word in words if len(word) > 2 and word not in STOP_WORDS
+                )
+
+        # Reservoir sample for the rating/sentiment scatter
+        for rating, sentiment, polarity in zip(ratings, sentiments, polarities):
+            self._sample_seen += 1
+            if len(self.sample) < self.sample_size:
+                self.sample.append((rating, sentiment, polarity))
+            else:
+                slot = self._random.randrange(self._sample_seen)
+                if slot < self.sample_size:
+                    self.sample[slot] = (rating, sentiment, polarity)
+
+        # Most recent negative reviews per station
+        negatives = chunk[chunk['sentiment'] == 'negative']
+        for review in negatives[['place_id', 'rating', 'text', 'time', 'review_date']].to_dict('records'):
+            heap = self._negatives[review['place_id']]
+            entry = (review['time'] if review['time'] == review['time'] else 0, self._sequence, review)
+            self._sequence += 1
+            if len(heap) < self.negatives_per_station:
+                heapq.heappush(heap, entry)
+            else:
+                heapq.heappushpop(heap, entry)
+
+    def station_frame(self, places_df: pd.DataFrame, min_reviews: int = 5) -> pd.DataFrame:
+        """
+        Build the same table as RaizenSentimentAnalyzer.analyze_by_station
+
+        Args:
+            places_df: Places with name, address and coordinates
+            min_reviews: Minimum number of reviews to include a station
+
+        Returns:
+            Station DataFrame sorted by sentiment score
+        """
+        places = places_df.drop_duplicates('place_id').set_index('place_id')
+        rows = []
+        for place_id, totals in self.stations.items():
+            (count, rating_sum, polarity_sum, positive, neutral, negative,
+             weight, positive_weight, negative_weight, rating_weight) = totals
+            if count < min_reviews or place_id not in places.index:
+                continue
+            place = places.loc[place_id]
+            rows.append({
+                'place_id': place_id,
+                'name': place['name'],
+                'address': place['address'],
+                'latitude': place.get('latitude'),
+                'longitude': place.get('longitude'),
+                'total_reviews': int(count),
+                'avg_rating': rating_sum / rating_weight if rating_weight else np.nan,
+                'avg_polarity': polarity_sum / weight,
+                'positive_reviews': int(positive),
+                'negative_reviews': int(negative),
+                'neutral_reviews': int(neutral),
+                'positive_ratio': positive_weight / weight,
+                'negative_ratio': negative_weight / weight,
+                'sentiment_score': int(positive - negative)
+            })
+        station_df = pd.DataFrame(rows)
+        if len(station_df):
+            station_df = station_df.sort_values('sentiment_score', ascending=False)
+        return station_df
+
+    def sample_frame(self) -> pd.DataFrame:
+        """Reservoir sample as a DataFrame with rating, sentiment and polarity"""
+        return pd.DataFrame(self.sample, columns=['rating', 'sentiment', 'polarity'])
+
+    def negative_reviews_frame(self) -> pd.DataFrame:
+        """Retained recent negative reviews of every station"""
+        reviews = [entry[2] for heap in self._negatives.values() for entry in heap]
+        frame = pd.DataFrame(reviews, columns=['place_id', 'rating', 'text', 'time', 'review_date'])
+        frame['sentiment'] = 'negative'
+        return frame
+
+    @property
+    def avg_rating(self) -> float:
+        return self.rating_sum / self.rated_reviews if self.rated_reviews else float(np.nan)
+
+    @property
+    def avg_polarity(self) -> float:
+        return self.polarity_sum / self.total_reviews if self.total_reviews else float(np.nan)
@@ -0,0 +1,149 @@
+"""
+Process-wide pool of Google Places clients keyed by API key
+
+Reusing one googlemaps.Client per key keeps its HTTP keep-alive session (and
+TLS connections) warm between jobs, and sharing one AIMDRateLimiter per key
+means concurrent jobs on the same key are paced together instead of each
+assuming it has the whole quota. Idle entries are evicted and their sessions
+closed after ``idle_timeout`` seconds, by a background sweep while the pool
+holds any client. Leased extractors keep their reviews in a columnar
+ReviewBuffer by default, since long-lived web workers are where the memory
+savings matter.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import googlemaps
+
+from google_places_extractor import AIMDRateLimiter, GooglePlacesReviewsAPI, RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class _PoolEntry:
+    __slots__ = ('client', 'rate_limiter', 'leases', 'last_used')
+
+    def __init__(self, client: googlemaps.Client, rate_limiter: AIMDRateLimiter):
+        self.client = client
+        self.rate_limiter = rate_limiter
+        self.leases = 0
+        self.last_used = time.monotonic()
+
+
+class PlacesClientPool:
+    """Thread-safe pool of googlemaps clients and rate limiters per API key"""
+
+    def __init__(self, idle_timeout: float = 600.0, client_kwargs: Optional[Dict] = None,
+                 limiter_kwargs: Optional[Dict] = None):
+        """
+        Args:
+            idle_timeout: Seconds without use after which a key's client is
+                closed and dropped from the pool
+            client_kwargs: Extra googlemaps.Client arguments (e.g. base_url
+                and queries_per_second when pointing at a fake server)
+            limiter_kwargs: AIMDRateLimiter arguments for new keys
+        """
+        self.idle_timeout = idle_timeout
+        self.client_kwargs = client_kwargs or {}
+        self.limiter_kwargs = limiter_kwargs or {}
+        self._entries: Dict[str, _PoolEntry] = {}
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+
+    def _create_entry(self, api_key: str) -> _PoolEntry:
+        # Same client settings as GooglePlacesReviewsAPI builds on its own
+        client = googlemaps.Client(key=api_key, retry_over_query_limit=False, **self.client_kwargs)
+        return _PoolEntry(client, AIMDRateLimiter(**self.limiter_kwargs))
+
+    def _evict_idle(self, now: float):
+        for api_key, entry in list(self._entries.items()):
+            if entry.leases == 0 and now - entry.last_used > self.idle_timeout:
+                del self._entries[api_key]
+                entry.client.session.close()
+                logger.info(f"Evicted idle Places client ...{api_key[-4:]}")
+
+    def _sweep(self):
+        # Runs until the pool is closed or empty; lease() restarts it
+        while not self._closed.wait(max(self.idle_timeout / 2, 1.0)):
+            with self._lock:
+                self._evict_idle(time.monotonic())
+                if not self._entries:
+                    self._sweeper = None
+                    return
+
+    def _ensure_sweeper(self):
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep, name='places-pool-sweep', daemon=True)
+            self._sweeper.start()
+
+    @contextmanager
+    def lease(self, api_key: str, columnar_reviews: bool = True,
+              retry_policy: Optional[RetryPolicy] = None,
+              companies: Optional[Dict[str, str]] = None) -> Iterator[GooglePlacesReviewsAPI]:
+        """
+        Borrow an extractor backed by the pooled client and limiter for a key
+
+        The extractor itself is fresh (its places_data belongs to the job);
+        only the connection pool and rate limiter are shared.
+
+        Args:
+            api_key: Google Places API key
+            columnar_reviews: Keep reviews in a columnar ReviewBuffer (see GooglePlacesReviewsAPI)
+            retry_policy: Passed through to GooglePlacesReviewsAPI
+            companies: Passed through to GooglePlacesReviewsAPI
+
+        Yields:
+            GooglePlacesReviewsAPI instance
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._evict_idle(now)
+            entry = self._entries.get(api_key)
+            if entry is None:
+                entry = self._entries[api_key] = self._create_entry(api_key)
+                self._ensure_sweeper()
+            entry.leases += 1
+            entry.last_used = now
+
+        try:
+            yield GooglePlacesReviewsAPI(
+                api_key,
+                columnar_reviews=columnar_reviews,
+                rate_limiter=entry.rate_limiter,
+                retry_policy=retry_policy,
+                client=entry.client,
+                companies=companies
+            )
+        finally:
+            with self._lock:
+                entry.leases -= 1
+                entry.last_used = time.monotonic()
+
+    def stats(self) -> Dict:
+        """Return pool size and per-key lease counts and current rates"""
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            return {
+                'clients': len(self._entries),
+                'keys': {
+                    f"...{api_key[-4:]}": {
+                        'active_jobs': entry.leases,
+                        'rate_per_second': round(entry.rate_limiter.rate, 2),
+                        'idle_seconds': round(time.monotonic() - entry.last_used, 1)
+                    }
+                    for api_key, entry in self._entries.items()
+                }
+            }
+
+    def close(self):
+        """Close every pooled client session and stop the sweep"""
+        self._closed.set()
+        with self._lock:
+            for entry in self._entries.values():
+                entry.client.session.close()
+            self._entries.clear()
@@ -0,0 +1,361 @@
+"""
+Company (RAZAOSOCIAL) rollups of station ratings and review sentiment
+
+Stations are franchised: one company (razão social) often runs several of
+them. ``CompanyRollupStore`` keeps the place_id -> company mapping plus
+running totals per station and per company (stations, Google ratings,
+review counts, rating and polarity sums, sentiment counts), updated as
+reviews are ingested. Franchise-group reports read the company totals, one
+entry per company, instead of joining and re-grouping every review.
+
+Per-station totals are kept alongside the company ones, so when the mapping
+changes (a station sold to another group, a corrected RAZAOSOCIAL) only that
+station's totals move between companies. Which reviews are already folded
+in is tracked by the shared ReviewLedger ('companies' store), not in the
+rollup file.
+
+Usage:
+    python company_rollups.py data/raizen_places_reviews_..._reviews.csv \
+        --places data/raizen_places_reviews_..._places.csv --top 20
+"""
+
+import argparse
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from google_places_extractor import load_place_companies, normalize_company_name
+from review_ledger import REVIEW_LEDGER_FILE, TOTAL_COLUMNS, ReviewLedger, review_totals
+from sentiment_scorers import get_scorer, sentiment_labels
+from text_utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+COMPANY_ROLLUPS_FILE = "data/company_rollups.json"
+PLACE_COMPANIES_FILE = "place_razao_table.json"
+LEDGER_STORE = 'companies'
+
+# Review totals (per station and per company), in review_ledger.TOTAL_COLUMNS order:
+# count, rating_sum, rating_count, polarity_sum, polarity_count, positive, neutral, negative
+_COUNT, _RATING_SUM, _RATING_N, _POLARITY_SUM, _POLARITY_N = range(5)
+_SENTIMENT_SLOTS = {'positive': 5, 'neutral': 6, 'negative': 7}
+_REVIEW_SIZE = len(TOTAL_COLUMNS)
+
+# Company totals append: stations, stations with a Google rating,
+# Google rating sum, Google user_ratings_total
+_STATIONS, _RATED_STATIONS, _GOOGLE_RATING_SUM, _USER_RATINGS = range(_REVIEW_SIZE, _REVIEW_SIZE + 4)
+_COMPANY_SIZE = _REVIEW_SIZE + 4
+
+
+def _company_key(name: str) -> str:
+    return ' '.join(tokenize(name))
+
+
+def _review_metrics(totals: List[float]) -> Dict:
+    count = totals[_COUNT]
+    return {
+        'total_reviews': int(count),
+        'avg_rating': round(totals[_RATING_SUM] / totals[_RATING_N], 4) if totals[_RATING_N] else None,
+        'avg_polarity': round(totals[_POLARITY_SUM] / totals[_POLARITY_N], 4) if totals[_POLARITY_N] else None,
+        'positive_reviews': int(totals[_SENTIMENT_SLOTS['positive']]),
+        'neutral_reviews': int(totals[_SENTIMENT_SLOTS['neutral']]),
+        'negative_reviews': int(totals[_SENTIMENT_SLOTS['negative']]),
+        'positive_ratio': round(totals[_SENTIMENT_SLOTS['positive']] / count, 4) if count else None,
+        'negative_ratio': round(totals[_SENTIMENT_SLOTS['negative']] / count, 4) if count else None,
+    }
+
+
+class CompanyRollupStore:
+    """Incrementally maintained place_id -> company mapping and per-company totals"""
+
+    def __init__(self):
+        self.place_companies: Dict[str, str] = {}
+        # place_id -> {'name', 'rating', 'user_ratings_total', 'totals': review totals}
+        self.stations: Dict[str, Dict] = {}
+        # company -> company totals
+        self.companies: Dict[str, List[float]] = {}
+        self.generated_at = None
+
+    def __len__(self) -> int:
+        return len(self.companies)
+
+    def _contribution(self, station: Dict) -> List[float]:
+        totals = list(station['totals']) + [0] * (_COMPANY_SIZE - _REVIEW_SIZE)
+        totals[_STATIONS] = 1
+        rating = station['rating']
+        if rating:
+            totals[_RATED_STATIONS] = 1
+            totals[_GOOGLE_RATING_SUM] = rating
+        totals[_USER_RATINGS] = station['user_ratings_total']
+        return totals
+
+    def _apply(self, place_id: str, sign: int):
+        """Add (sign=1) or remove (sign=-1) a station's contribution to its company"""
+        company = self.place_companies.get(place_id)
+        station = self.stations.get(place_id)
+        if not company or station is None:
+            return
+        totals = self.companies.get(company)
+        if totals is None:
+            totals = self.companies[company] = [0] * _COMPANY_SIZE
+        for i, value in enumerate(self._contribution(station)):
+            totals[i] += sign * value
+        if totals[_STATIONS] <= 0:
+            del self.companies[company]
+
+    def _station(self, place_id: str) -> Dict:
+        station = self.stations.get(place_id)
+        if station is None:
+            station = self.stations[place_id] = {'name': '', 'rating': 0.0, 'user_ratings_total': 0,
+                                                 'totals': [0] * _REVIEW_SIZE}
+            self._apply(place_id, 1)
+        return station
+
+    def assign(self, place_id: str, company: str) -> bool:
+        """
+        Map a station to a company, moving its totals if it was mapped elsewhere
+
+        Args:
+            place_id: Station place ID
+            company: Company name (normalized with normalize_company_name)
+
+        Returns:
+            True if the mapping changed
+        """
+        company = normalize_company_name(company)
+        if not company or self.place_companies.get(place_id) == company:
+            return False
+        self._apply(place_id, -1)
+        self.place_companies[place_id] = company
+        self._apply(place_id, 1)
+        return True
+
+    def set_companies(self, companies: Dict[str, str]) -> int:
+        """
+        Apply a place_id -> company mapping (see load_place_companies)
+
+        Returns:
+            Number of stations whose company changed
+        """
+        return sum(self.assign(place_id, company) for place_id, company in companies.items())
+
+    def set_places(self, places_df: pd.DataFrame) -> int:
+        """
+        Record the Google rating of each station, and its company when the
+        places export carries one
+
+        Args:
+            places_df: Places with place_id, name and rating (user_ratings_total
+                and company are optional)
+
+        Returns:
+            Number of stations updated
+        """
+        names = places_df['name'] if 'name' in places_df.columns else [''] * len(places_df)
+        # Not in the out-of-core column subset; keep what an earlier run recorded
+        totals = (places_df['user_ratings_total'] if 'user_ratings_total' in places_df.columns
+                  else [None] * len(places_df))
+        companies = places_df['company'] if 'company' in places_df.columns else [None] * len(places_df)
+        updated = 0
+        for place_id, name, rating, user_ratings_total, company in zip(
+                places_df['place_id'], names, places_df['rating'], totals, companies):
+            if isinstance(company, str):
+                self.assign(place_id, company)
+            # float32 in out-of-core runs; Google ratings have one decimal
+            rating = round(float(rating), 2) if rating == rating else 0.0
+            station = self._station(place_id)
+            if user_ratings_total is None:
+                user_ratings_total = station['user_ratings_total']
+            else:
+                user_ratings_total = int(user_ratings_total) if user_ratings_total == user_ratings_total else 0
+            if (station['rating'], station['user_ratings_total']) != (rating, user_ratings_total):
+                self._apply(place_id, -1)
+                station['rating'], station['user_ratings_total'] = rating, user_ratings_total
+                self._apply(place_id, 1)
+                updated += 1
+            station['name'] = name if isinstance(name, str) else ''
+        return updated
+
+    def add_frame(self, reviews_df: pd.DataFrame, ledger: Optional[ReviewLedger] = None) -> int:
+        """
+        Fold new reviews into the station and company totals
+
+        Reviews are aggregated per station first, so the per-company update is
+        one addition per station touched. Uses ``rating``, ``polarity`` and
+        ``sentiment`` when present. With a ledger, reviews already in the
+        rollups are skipped, except that a review first added without a
+        polarity gets its score added once it arrives with one.
+
+        Args:
+            reviews_df: Reviews with place_id, time and author_name
+            ledger: Shared review ledger (without one, every row is added)
+
+        Returns:
+            Number of new reviews added
+        """
+        if ledger is None:
+            new, rescored = reviews_df, reviews_df.iloc[:0]
+        else:
+            new, rescored = ledger.select(reviews_df, LEDGER_STORE)
+
+        self._fold(new)
+        self._fold(rescored, scores_only=True)
+        if ledger is not None:
+            ledger.record(new, LEDGER_STORE)
+            ledger.record(rescored, LEDGER_STORE)
+        if len(new) or len(rescored):
+            self.generated_at = datetime.now().isoformat(timespec='seconds')
+        return len(new)
+
+    def _fold(self, df: pd.DataFrame, scores_only: bool = False):
+        if df.empty:
+            return
+        grouped = review_totals(df, df['place_id'].astype(str), scores_only)
+        for place_id, row in zip(grouped.index, grouped.to_numpy().tolist()):
+            station = self._station(place_id)
+            self._apply(place_id, -1)
+            station['totals'] = [total + value for total, value in zip(station['totals'], row)]
+            self._apply(place_id, 1)
+
+    @staticmethod
+    def _summary(company: str, totals: List[float]) -> Dict:
+        rated = totals[_RATED_STATIONS]
+        return {
+            'company': company,
+            'stations': int(totals[_STATIONS]),
+            'avg_google_rating': round(totals[_GOOGLE_RATING_SUM] / rated, 4) if rated else None,
+            'user_ratings_total': int(totals[_USER_RATINGS]),
+            **_review_metrics(totals),
+        }
+
+    def summary(self, sort: str = 'stations', limit: Optional[int] = None, min_stations: int = 1) -> List[Dict]:
+        """
+        Every company's rollup, read straight from the running totals
+
+        Args:
+            sort: Metric to sort by, descending (e.g. 'stations', 'total_reviews', 'negative_ratio')
+            limit: Number of companies to return, at least 1 (all when None)
+            min_stations: Minimum stations per company (2+ for franchise groups)
+
+        Returns:
+            Company summaries
+        """
+        rows = [self._summary(company, totals) for company, totals in self.companies.items()
+                if totals[_STATIONS] >= min_stations]
+        if rows and sort not in rows[0]:
+            raise ValueError(f"Unknown sort '{sort}'. Use one of: {', '.join(rows[0])}")
+        rows.sort(key=lambda row: (row[sort] is not None, row[sort] or 0, row['stations']), reverse=True)
+        return rows[:max(limit, 1)] if limit is not None else rows
+
+    def company(self, name: str) -> Dict:
+        """
+        One company's rollup and its stations (names match accent- and case-insensitively)
+
+        Raises:
+            KeyError: If no station is mapped to the company
+        """
+        wanted = _company_key(normalize_company_name(name))
+        for company, totals in self.companies.items():
+            if company == name or _company_key(company) == wanted:
+                break
+        else:
+            raise KeyError(f"No stations for company '{name}'")
+
+        stations = []
+        for place_id, station_company in self.place_companies.items():
+            station = self.stations.get(place_id)
+            if station_company == company and station is not None:
+                stations.append({'place_id': place_id, 'name': station['name'], 'rating': station['rating'],
+                                 'user_ratings_total': station['user_ratings_total'],
+                                 **_review_metrics(station['totals'])})
+        stations.sort(key=lambda entry: entry['total_reviews'], reverse=True)
+        return {**self._summary(company, totals), 'station_list': stations}
+
+    def save(self, path: str = COMPANY_ROLLUPS_FILE) -> str:
+        """
+        Persist the mapping and station totals as JSON (company totals are
+        rebuilt on load; the reviews they contain are in the ReviewLedger)
+
+        Args:
+            path: Output file path
+
+        Returns:
+            Path to the written file
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            'generated_at': self.generated_at,
+            'place_companies': self.place_companies,
+            'stations': self.stations,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        logger.info(f"Company rollups saved: {path} ({len(self)} companies)")
+        return path
+
+    @classmethod
+    def load(cls, path: str = COMPANY_ROLLUPS_FILE) -> 'CompanyRollupStore':
+        """
+        Load a store written by save(); returns an empty store if the file is missing
+
+        Args:
+            path: Input file path
+
+        Returns:
+            CompanyRollupStore instance
+        """
+        store = cls()
+        if not Path(path).exists():
+            return store
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        store.place_companies = data.get('place_companies', {})
+        store.stations = data.get('stations', {})
+        for place_id in store.stations:
+            store._apply(place_id, 1)
+        store.generated_at = data.get('generated_at')
+        return store
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Company (RAZAOSOCIAL) rollups of station reviews")
+    parser.add_argument('reviews_file')
+    parser.add_argument('--places', help="Places CSV of the same extraction (Google ratings, company column)")
+    parser.add_argument('--companies', default=PLACE_COMPANIES_FILE, help="place_id -> RAZAOSOCIAL table")
+    parser.add_argument('--rollups', default=COMPANY_ROLLUPS_FILE)
+    parser.add_argument('--ledger', default=REVIEW_LEDGER_FILE)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--scorer', default='lexicon', help="Sentiment scorer (textblob or lexicon)")
+    args = parser.parse_args()
+
+    store = CompanyRollupStore.load(args.rollups)
+    ledger = ReviewLedger.load(args.ledger)
+    if not Path(args.rollups).exists():
+        ledger.reset(LEDGER_STORE)
+    moved = store.set_companies(load_place_companies(args.companies))
+    if args.places:
+        store.set_places(pd.read_csv(args.places))
+    reviews = pd.read_csv(args.reviews_file)
+    texts = reviews['text'].fillna('').astype(str)
+    polarities, _ = get_scorer(args.scorer).score(texts.tolist())
+    # Same rule as the analysis: very short texts carry no sentiment
+    polarities[(texts.str.strip().str.len() < 3).to_numpy()] = 0.0
+    added = store.add_frame(reviews.assign(polarity=polarities, sentiment=sentiment_labels(polarities)), ledger)
+    store.save(args.rollups)
+    ledger.save(args.ledger)
+    print(f"🏢 {len(store):,} companies ({moved:,} stations mapped or moved, {added:,} reviews added)")
+
+    print("🏢 Largest franchise groups:")
+    for row in store.summary(limit=args.top, min_stations=2):
+        print(f"   • {row['company']}: {row['stations']} stations, {row['total_reviews']} reviews, "
+              f"avg rating {row['avg_rating']}, negative {row['negative_ratio']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Local fake Google Places Details server for load testing
+
+Serves ``/maps/api/place/details/json`` with synthetic responses shaped like
+the real API (the fields ``process_place_data`` reads), so the extractor and
+the web job path can be exercised at scale without spending quota. Point a
+``googlemaps.Client`` at it with ``base_url=server.base_url``.
+
+Configurable:
+    latency      'constant:MS', 'uniform:LOW_MS:HIGH_MS', 'exponential:MEAN_MS'
+                 or 'lognormal:MEDIAN_MS:SIGMA'
+    over_query_limit_rate  share of requests answered with OVER_QUERY_LIMIT
+    not_found_rate         share of place IDs that always return NOT_FOUND
+    reviews      'N' or 'MIN-MAX' reviews per place (the real API caps at 5)
+
+Place data is derived from a stable hash of the place_id, so repeated
+requests for a place return the same station and reviews.
+
+Usage:
+    python fake_places_server.py --port 8765 --latency lognormal:40:0.5 --over-query-limit-rate 0.01
+"""
+
+import argparse
+import json
+import logging
+import math
+import random
+import socket
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Tuple
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+DETAILS_PATH = "/maps/api/place/details/json"
+
+_REVIEW_TEXTS = [
+    "Atendimento rápido e frentistas educados, recomendo.",
+    "Preço alto comparado com outros postos da região.",
+    "Banheiro sujo e sem papel, precisa melhorar.",
+    "Ótimo posto, conveniência com bons produtos e café excelente.",
+    "Fila enorme e só uma bomba funcionando, demorou demais.",
+    "Cobraram errado no cartão, tive que voltar para resolver.",
+    "Gasolina de qualidade, o carro rende bem.",
+    "Frentista tentou empurrar aditivo sem necessidade.",
+    "Great service, clean restrooms and fair prices.",
+    "Calibrador quebrado há semanas.",
+]
+_STREETS = ["Av. Paulista", "Rua Augusta", "Av. Brasil", "Rod. Anhanguera", "Av. Atlântica", "Rua XV de Novembro"]
+# Review times are spread over the five years before this moment (2025-06-01)
+_REFERENCE_TIME = 1748736000
+
+_CITIES = [("São Paulo", "SP"), ("Rio de Janeiro", "RJ"), ("Curitiba", "PR"), ("Campinas", "SP"), ("Recife", "PE")]
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Build a latency sampler (seconds) from a spec string
+
+    Args:
+        spec: 'constant:MS', 'uniform:LOW:HIGH', 'exponential:MEAN' or 'lognormal:MEDIAN:SIGMA'
+
+    Returns:
+        Function drawing one latency from a random generator
+    """
+    kind, _, args = spec.partition(':')
+    values = [float(value) for value in args.split(':')] if args else []
+    if kind == 'constant':
+        return lambda rng: values[0] / 1000
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == 'exponential':
+        return lambda rng: rng.expovariate(1000 / values[0])
+    if kind == 'lognormal':
+        mu = math.log(values[0] / 1000)
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Unknown latency distribution '{spec}'")
+
+
+def parse_review_range(spec: str) -> Tuple[int, int]:
+    low, _, high = str(spec).partition('-')
+    return int(low), int(high or low)
+
+
+def _stable_fraction(place_id: str, salt: str) -> float:
+    return zlib.crc32(f"{salt}:{place_id}".encode('utf-8')) / 0xFFFFFFFF
+
+
+def fake_place(place_id: str, review_range: Tuple[int, int]) -> Dict:
+    """Synthetic Place Details result for a place ID (deterministic per ID)"""
+    rng = random.Random(zlib.crc32(place_id.encode('utf-8')))
+    city, state = rng.choice(_CITIES)
+    now = _REFERENCE_TIME
+    reviews = []
+    for _ in range(rng.randint(*review_range)):
+        rating = rng.choice([1, 2, 3, 4, 5, 5, 4])
+        review_time = now - rng.randint(0, 5 * 365 * 86400)
+        reviews.append({
+            'author_name': f"Cliente {rng.randint(1, 10 ** 6)}",
+            'rating': rating,
+            'text': rng.choice(_REVIEW_TEXTS),
+            'time': review_time,
+            'relative_time_description': f"{max((now - review_time) // (30 * 86400), 1)} months ago",
+            'language': 'pt',
+        })
+    return {
+        'place_id': place_id,
+        'name': f"Posto Shell {place_id[-6:]}",
+        'rating': round(rng.uniform(2.5, 5.0), 1),
+        'user_ratings_total': rng.randint(len(reviews), 3000),
+        'reviews': reviews,
+        'formatted_address': f"{rng.choice(_STREETS)}, {rng.randint(1, 9999)} - {city} - {state}, "
+                             f"{rng.randint(10000, 99999)}-{rng.randint(100, 999)}, Brazil",
+        'formatted_phone_number': f"({rng.randint(11, 99)}) {rng.randint(3000, 3999)}-{rng.randint(1000, 9999)}",
+        'website': f"https://postos.example.com/{place_id[-6:]}",
+        'business_status': 'OPERATIONAL',
+        'price_level': rng.randint(1, 3),
+        'geometry': {'location': {'lat': rng.uniform(-33.0, -3.0), 'lng': rng.uniform(-60.0, -35.0)}},
+    }
+
+
+class FakePlacesServer:
+    """Threaded HTTP server answering Place Details requests with synthetic data"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: str = 'constant:0',
+                 over_query_limit_rate: float = 0.0, not_found_rate: float = 0.0,
+                 reviews: str = '0-5', seed: int = 0):
+        """
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            latency: Latency distribution spec (see parse_latency)
+            over_query_limit_rate: Share of requests answered with OVER_QUERY_LIMIT
+            not_found_rate: Share of place IDs answered with NOT_FOUND
+            reviews: Reviews per place, 'N' or 'MIN-MAX'
+            seed: Seed for latency and quota error draws
+        """
+        self.sample_latency = parse_latency(latency)
+        self.over_query_limit_rate = over_query_limit_rate
+        self.not_found_rate = not_found_rate
+        self.review_range = parse_review_range(reviews)
+        self.stats = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like the real endpoint
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out in separate writes; without this,
+                # Nagle plus delayed ACKs add ~40ms to every response
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_GET(self):
+                status, body = server.respond(self.path)
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def respond(self, path: str) -> Tuple[int, Dict]:
+        """Build the (HTTP status, JSON body) for a request path"""
+        url = urlparse(path)
+        if url.path != DETAILS_PATH:
+            self._count('HTTP_404')
+            return 404, {'status': 'NOT_FOUND'}
+
+        with self._lock:
+            latency = self.sample_latency(self._rng)
+            over_limit = self._rng.random() < self.over_query_limit_rate
+        time.sleep(max(latency, 0))
+
+        query = parse_qs(url.query)
+        # googlemaps sends the legacy 'placeid' parameter
+        place_id = (query.get('placeid') or query.get('place_id') or [''])[0]
+        if over_limit:
+            self._count('OVER_QUERY_LIMIT')
+            return 200, {'status': 'OVER_QUERY_LIMIT', 'error_message': 'You have exceeded your rate-limit for this API.'}
+        if not place_id or _stable_fraction(place_id, 'not_found') < self.not_found_rate:
+            self._count('NOT_FOUND')
+            return 200, {'status': 'NOT_FOUND', 'html_attributions': []}
+
+        self._count('OK')
+        return 200, {'status': 'OK', 'html_attributions': [], 'result': fake_place(place_id, self.review_range)}
+
+    def _count(self, status: str):
+        with self._lock:
+            self.stats[status] += 1
+
+    def start(self) -> 'FakePlacesServer':
+        """Serve from a background thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fake-places', daemon=True)
+        self._thread.start()
+        logger.info(f"Fake Places server listening on {self.base_url}")
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> 'FakePlacesServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Fake Google Places Details server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='lognormal:40:0.5')
+    parser.add_argument('--over-query-limit-rate', type=float, default=0.0)
+    parser.add_argument('--not-found-rate', type=float, default=0.0)
+    parser.add_argument('--reviews', default='0-5')
+    args = parser.parse_args()
+
+    server = FakePlacesServer(args.host, args.port, latency=args.latency,
+                              over_query_limit_rate=args.over_query_limit_rate,
+                              not_found_rate=args.not_found_rate, reviews=args.reviews)
+    print(f"🧪 Fake Places server on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"📊 Requests: {dict(server.stats)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,20 @@
 import googlemaps
+from googlemaps import exceptions as gm_exceptions
 import pandas as pd
+import csv
 import json
 import time
 import logging
-from typing import List, Dict, Optional
-from dataclasses import dataclass
+import random
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from collections.abc import Sequence as SequenceABC
+from typing import List, Dict, Iterator, Optional, Sequence, Tuple
+from dataclasses import dataclass, fields
 from datetime import datetime
 import os
 from pathlib import Path
@@ -13,8 +23,30 @@ from pathlib import Path
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def _intern(value):
+    """Intern strings so repeated values share storage; pass anything else through"""
+    return sys.intern(value) if type(value) is str else value
+
+def _slotted(cls):
+    """
+    Rebuild a dataclass with __slots__ for its fields
+
+    Hand-written __slots__ cannot coexist with field defaults (the default
+    would shadow the slot), and dataclass(slots=True) needs Python 3.10.
+    """
+    names = tuple(f.name for f in fields(cls))
+    namespace = {key: value for key, value in cls.__dict__.items()
+                 if key not in names and key not in ('__dict__', '__weakref__')}
+    namespace['__slots__'] = names
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
 @dataclass
 class PlaceReview:
+    __slots__ = (
+        'place_id', 'place_name', 'author_name', 'rating', 'text',
+        'time', 'relative_time_description', 'language'
+    )
+
     place_id: str
     place_name: str
     author_name: str
@@ -24,13 +56,23 @@ class PlaceReview:
     relative_time_description: str
     language: str
 
+    def __post_init__(self):
+        # Place and author strings repeat across thousands of reviews;
+        # interning makes every review point at one shared copy
+        self.place_id = _intern(self.place_id)
+        self.place_name = _intern(self.place_name)
+        self.author_name = _intern(self.author_name)
+        self.relative_time_description = _intern(self.relative_time_description)
+        self.language = _intern(self.language)
+
+@_slotted
 @dataclass
 class PlaceInfo:
     place_id: str
     name: str
     rating: float
     user_ratings_total: int
-    reviews: List[PlaceReview]
+    reviews: Sequence[PlaceReview]
     address: str
     phone_number: str
     website: str
@@ -38,17 +80,273 @@ class PlaceInfo:
     price_level: Optional[int]
     latitude: Optional[float]
     longitude: Optional[float]
+    company: str = ''
+
+    def __post_init__(self):
+        self.place_id = _intern(self.place_id)
+        self.name = _intern(self.name)
+        self.business_status = _intern(self.business_status)
+        # One company owns many stations
+        self.company = _intern(self.company)
+
+class ReviewBuffer:
+    """
+    Columnar storage for the reviews of many places.
+
+    Numeric fields live in typed arrays and repeated strings (place name,
+    author, language, relative time) are stored once in a string table and
+    referenced by index. Each place owns a contiguous ``[start, end)`` slice
+    of the columns, recorded in ``offsets``.
+    """
+
+    __slots__ = (
+        '_strings', '_string_ids', 'place_ids', 'place_names', 'offsets',
+        'authors', 'ratings', 'times', 'texts', 'relative_times', 'languages'
+    )
+
+    def __init__(self):
+        self._strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        # Per place
+        self.place_ids = array('I')
+        self.place_names = array('I')
+        self.offsets = array('I', [0])
+        # Per review
+        self.authors = array('I')
+        self.ratings = array('b')
+        self.times = array('q')
+        self.texts: List[str] = []
+        self.relative_times = array('I')
+        self.languages = array('I')
+
+    def _string_id(self, value: str) -> int:
+        value = value or ''
+        index = self._string_ids.get(value)
+        if index is None:
+            index = len(self._strings)
+            self._strings.append(value)
+            self._string_ids[value] = index
+        return index
+
+    def add_place(self, place_id: str, place_name: str, reviews: List[Dict]) -> 'ReviewSlice':
+        """
+        Append the raw reviews of one place to the buffer
+
+        Args:
+            place_id: Google Places ID
+            place_name: Name of the place the reviews belong to
+            reviews: Raw review dictionaries from the Places API
+
+        Returns:
+            ReviewSlice view over the appended reviews
+        """
+        slot = len(self.place_ids)
+        self.place_ids.append(self._string_id(place_id))
+        self.place_names.append(self._string_id(place_name))
+
+        for review in reviews:
+            self.authors.append(self._string_id(review.get('author_name', '')))
+            self.ratings.append(int(review.get('rating', 0) or 0))
+            self.times.append(int(review.get('time', 0) or 0))
+            self.texts.append(review.get('text', '') or '')
+            self.relative_times.append(self._string_id(review.get('relative_time_description', '')))
+            self.languages.append(self._string_id(review.get('language', 'en')))
+
+        self.offsets.append(len(self.texts))
+        return ReviewSlice(self, slot)
+
+    def review(self, index: int) -> PlaceReview:
+        """Materialize the review stored at a global row index"""
+        slot = bisect_right(self.offsets, index) - 1
+        strings = self._strings
+        return PlaceReview(
+            place_id=strings[self.place_ids[slot]],
+            place_name=strings[self.place_names[slot]],
+            author_name=strings[self.authors[index]],
+            rating=self.ratings[index],
+            text=self.texts[index],
+            time=self.times[index],
+            relative_time_description=strings[self.relative_times[index]],
+            language=strings[self.languages[index]]
+        )
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+class ReviewSlice(SequenceABC):
+    """Read-only sequence of PlaceReview objects backed by a ReviewBuffer"""
+
+    __slots__ = ('_buffer', '_slot')
+
+    def __init__(self, buffer: ReviewBuffer, slot: int):
+        self._buffer = buffer
+        self._slot = slot
+
+    def _bounds(self):
+        offsets = self._buffer.offsets
+        return offsets[self._slot], offsets[self._slot + 1]
+
+    def __len__(self) -> int:
+        start, end = self._bounds()
+        return end - start
+
+    def __getitem__(self, index):
+        start, end = self._bounds()
+        if isinstance(index, slice):
+            return [self._buffer.review(start + i) for i in range(*index.indices(end - start))]
+        if index < 0:
+            index += end - start
+        if not 0 <= index < end - start:
+            raise IndexError('review index out of range')
+        return self._buffer.review(start + index)
+
+    def __repr__(self) -> str:
+        return f"ReviewSlice({list(self)!r})"
+
+# Error classes used to decide whether a failed request is worth retrying
+RETRYABLE = 'retryable'
+QUOTA = 'quota'
+PERMANENT = 'permanent'
+
+_QUOTA_STATUSES = {'OVER_QUERY_LIMIT', 'RESOURCE_EXHAUSTED', 'OVER_DAILY_LIMIT'}
+_RETRYABLE_STATUSES = {'UNKNOWN_ERROR'}
+
+def classify_error(error: Exception) -> str:
+    """
+    Classify a Places API error
+    
+    Args:
+        error: Exception raised by the googlemaps client
+        
+    Returns:
+        QUOTA for rate/quota errors, RETRYABLE for transient failures
+        (timeouts, transport errors, 5xx/429), PERMANENT otherwise
+    """
+    if isinstance(error, gm_exceptions.ApiError):
+        if error.status in _QUOTA_STATUSES:
+            return QUOTA
+        if error.status in _RETRYABLE_STATUSES:
+            return RETRYABLE
+        return PERMANENT
+    if isinstance(error, gm_exceptions.HTTPError):
+        if error.status_code == 429:
+            return QUOTA
+        return RETRYABLE if error.status_code >= 500 else PERMANENT
+    if isinstance(error, (gm_exceptions.Timeout, gm_exceptions.TransportError, ConnectionError, TimeoutError)):
+        return RETRYABLE
+    return PERMANENT
+
+class RetryPolicy:
+    """Jittered exponential backoff with a retry budget shared by a whole run"""
+    
+    def __init__(self, max_attempts: int = 5, base_delay: float = 0.5, max_delay: float = 30.0,
+                 retry_budget: int = 200):
+        """
+        Args:
+            max_attempts: Attempts per request, including the first one
+            base_delay: Backoff delay for the first retry in seconds
+            max_delay: Upper bound for a single backoff delay
+            retry_budget: Total retries allowed per run; once spent, failures
+                are returned immediately instead of retried
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget = retry_budget
+        self.retries_used = 0
+        self._lock = threading.Lock()
+    
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number `attempt` (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+    
+    def consume(self) -> bool:
+        """Take one retry from the budget; returns False when it is exhausted"""
+        with self._lock:
+            if self.retries_used >= self.retry_budget:
+                return False
+            self.retries_used += 1
+            return True
+    
+    def reset(self):
+        with self._lock:
+            self.retries_used = 0
+
+class AIMDRateLimiter:
+    """
+    Request pacing with additive-increase / multiplicative-decrease
+    
+    Every success raises the allowed rate by `increase / rate`, so it climbs
+    by roughly `increase` requests/second for each second of traffic; every
+    quota error multiplies it by `decrease`. This converges on the highest
+    rate the API key sustains. Thread-safe, so several workers can share one
+    limiter per key.
+    """
+    
+    def __init__(self, initial_rate: float = 10.0, min_rate: float = 0.5, max_rate: float = 50.0,
+                 increase: float = 0.5, decrease: float = 0.5):
+        """
+        Args:
+            initial_rate: Starting rate in requests per second
+            min_rate: Lowest rate the limiter backs off to
+            max_rate: Highest rate the limiter climbs to
+            increase: Additive increase in requests/second per second
+            decrease: Factor the rate is multiplied by after a quota error
+        """
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until the next request may be sent"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+    
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+    
+    def on_quota_error(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            # Push out already scheduled slots so the cut applies immediately
+            self._next_slot = max(self._next_slot, time.monotonic() + 1.0 / self.rate)
+            logger.warning(f"Quota error: lowering request rate to {self.rate:.2f}/s")
 
 class GooglePlacesReviewsAPI:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, columnar_reviews: bool = False,
+                 rate_limiter: Optional[AIMDRateLimiter] = None, retry_policy: Optional[RetryPolicy] = None,
+                 client: Optional[googlemaps.Client] = None, companies: Optional[Dict[str, str]] = None):
         """
         Initialize the Google Places API client
         
         Args:
             api_key: Your Google Places API key
+            columnar_reviews: If True, keep reviews in a shared ReviewBuffer
+                instead of one PlaceReview object per review (lower memory
+                for large runs and long-lived workers)
+            rate_limiter: Adaptive request pacing (a new AIMDRateLimiter by default)
+            retry_policy: Backoff and retry budget (a new RetryPolicy by default)
+            client: Existing googlemaps client to reuse (e.g. from PlacesClientPool)
+            companies: place_id -> company name (RAZAOSOCIAL), see load_place_companies
         """
-        self.client = googlemaps.Client(key=api_key)
+        # Quota errors are handled by our own backoff and AIMD controller
+        # instead of the client's silent internal retries
+        self.client = client or googlemaps.Client(key=api_key, retry_over_query_limit=False)
         self.places_data = []
+        self.review_buffer = ReviewBuffer() if columnar_reviews else None
+        self.rate_limiter = rate_limiter or AIMDRateLimiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.error_counts = Counter()
+        self.companies = companies or {}
         
     def get_place_details(self, place_id: str, fields: List[str] = None, cost_optimized: bool = False) -> Optional[Dict]:
         """
@@ -79,22 +377,41 @@ class GooglePlacesReviewsAPI:
                     'website', 'business_status', 'price_level', 'geometry'
                 ]
         
-        try:
-            # Add delay to respect rate limits
-            time.sleep(0.1)
-            
-            result = self.client.place(
-                place_id=place_id,
-                fields=fields,
-                language='en'  # Set language for consistency
-            )
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
+            # Adaptive pacing to respect rate limits
+            self.rate_limiter.acquire()
             
-            logger.info(f"Successfully fetched data for place_id: {place_id}")
-            return result.get('result', {})
-            
-        except Exception as e:
-            logger.error(f"Error fetching place details for {place_id}: {str(e)}")
-            return None
+            try:
+                result = self.client.place(
+                    place_id=place_id,
+                    fields=fields,
+                    language='en'  # Set language for consistency
+                )
+                
+                self.rate_limiter.on_success()
+                logger.info(f"Successfully fetched data for place_id: {place_id}")
+                return result.get('result', {})
+                
+            except Exception as e:
+                error_class = classify_error(e)
+                self.error_counts[error_class] += 1
+                
+                if error_class == QUOTA:
+                    self.rate_limiter.on_quota_error()
+                
+                if error_class == PERMANENT:
+                    logger.error(f"Error fetching place details for {place_id}: {str(e)}")
+                    return None
+                
+                if attempt == self.retry_policy.max_attempts or not self.retry_policy.consume():
+                    logger.error(f"Giving up on {place_id} after {attempt} attempts ({error_class}): {str(e)}")
+                    return None
+                
+                delay = self.retry_policy.backoff(attempt)
+                logger.warning(f"{error_class.title()} error for {place_id} (attempt {attempt}): {str(e)}. Retrying in {delay:.1f}s")
+                time.sleep(delay)
+        
+        return None
     
     def process_place_data(self, place_data: Dict, place_id: str) -> PlaceInfo:
         """
@@ -110,7 +427,11 @@ class GooglePlacesReviewsAPI:
         reviews = []
         
         # Process reviews if available
-        if 'reviews' in place_data:
+        if self.review_buffer is not None:
+            reviews = self.review_buffer.add_place(
+                place_id, place_data.get('name', ''), place_data.get('reviews', [])
+            )
+        elif 'reviews' in place_data:
             for review in place_data['reviews']:
                 place_review = PlaceReview(
                     place_id=place_id,
@@ -145,40 +466,59 @@ class GooglePlacesReviewsAPI:
             business_status=place_data.get('business_status', ''),
             price_level=place_data.get('price_level'),
             latitude=latitude,
-            longitude=longitude
+            longitude=longitude,
+            company=self.companies.get(place_id, '')
         )
         
         return place_info
     
-    def fetch_multiple_places(self, place_ids: List[str], batch_size: int = 10) -> List[PlaceInfo]:
+    def iter_places(self, place_ids: List[str], batch_size: int = 10, keep: bool = True) -> Iterator[Tuple[str, Optional[PlaceInfo]]]:
         """
-        Fetch data for multiple places with rate limiting
+        Fetch places one at a time, yielding each result as soon as it arrives
+        
+        The generator only fetches the next place when the consumer asks for
+        it, so a slow consumer (e.g. a streaming HTTP client) throttles the
+        extraction instead of results piling up in memory.
         
         Args:
             place_ids: List of Google Places IDs
-            batch_size: Number of places to process before longer delay
+            batch_size: Number of places between progress log lines
+            keep: If True, also append results to self.places_data
             
-        Returns:
-            List of PlaceInfo objects
+        Yields:
+            Tuples of (place_id, PlaceInfo or None if the fetch failed)
         """
-        all_places = []
+        self.retry_policy.reset()
         
         for i, place_id in enumerate(place_ids):
             logger.info(f"Processing place {i+1}/{len(place_ids)}: {place_id}")
             
             place_data = self.get_place_details(place_id)
+            place_info = None
             
             if place_data:
                 place_info = self.process_place_data(place_data, place_id)
-                all_places.append(place_info)
-                self.places_data.append(place_info)
+                if keep:
+                    self.places_data.append(place_info)
             
-            # Add longer delay every batch_size requests to avoid rate limiting
-            if (i + 1) % batch_size == 0:
-                logger.info(f"Processed {i+1} places. Taking a short break...")
-                time.sleep(2)
+            yield place_id, place_info
+            
+            # Pacing is left to the rate limiter; batch_size only sets how often progress is logged
+            if (i + 1) % batch_size == 0 and i + 1 < len(place_ids):
+                logger.info(f"Processed {i+1} places (limiter rate {self.rate_limiter.rate:.1f}/s)")
+    
+    def fetch_multiple_places(self, place_ids: List[str], batch_size: int = 10) -> List[PlaceInfo]:
+        """
+        Fetch data for multiple places with rate limiting
         
-        return all_places
+        Args:
+            place_ids: List of Google Places IDs
+            batch_size: Number of places between progress log lines
+            
+        Returns:
+            List of PlaceInfo objects
+        """
+        return [place_info for _, place_info in self.iter_places(place_ids, batch_size) if place_info]
     
     def export_to_csv(self, filename: str = None) -> str:
         """
@@ -201,38 +541,12 @@ class GooglePlacesReviewsAPI:
         reviews_data = []
         
         for place in self.places_data:
-            places_data.append({
-                'place_id': place.place_id,
-                'name': place.name,
-                'rating': place.rating,
-                'user_ratings_total': place.user_ratings_total,
-                'address': place.address,
-                'phone_number': place.phone_number,
-                'website': place.website,
-                'business_status': place.business_status,
-                'price_level': place.price_level,
-                'latitude': place.latitude,
-                'longitude': place.longitude,
-                'reviews_count': len(place.reviews)
-            })
-            
-            # Add reviews data
-            for review in place.reviews:
-                reviews_data.append({
-                    'place_id': review.place_id,
-                    'place_name': review.place_name,
-                    'author_name': review.author_name,
-                    'rating': review.rating,
-                    'text': review.text,
-                    'time': review.time,
-                    'relative_time_description': review.relative_time_description,
-                    'language': review.language,
-                    'review_date': datetime.fromtimestamp(review.time).strftime('%Y-%m-%d %H:%M:%S') if review.time else ''
-                })
+            places_data.append(place_csv_row(place))
+            reviews_data.extend(review_csv_rows(place))
         
         # Save to CSV
-        places_df = pd.DataFrame(places_data)
-        reviews_df = pd.DataFrame(reviews_data)
+        places_df = pd.DataFrame(places_data, columns=PLACE_CSV_COLUMNS)
+        reviews_df = pd.DataFrame(reviews_data, columns=REVIEW_CSV_COLUMNS)
         
         places_file = f"data/{filename}_places.csv"
         reviews_file = f"data/{filename}_reviews.csv"
@@ -260,37 +574,7 @@ class GooglePlacesReviewsAPI:
         Path("data").mkdir(exist_ok=True)
         
         # Convert to JSON-serializable format
-        json_data = []
-        
-        for place in self.places_data:
-            place_dict = {
-                'place_id': place.place_id,
-                'name': place.name,
-                'rating': place.rating,
-                'user_ratings_total': place.user_ratings_total,
-                'address': place.address,
-                'phone_number': place.phone_number,
-                'website': place.website,
-                'business_status': place.business_status,
-                'price_level': place.price_level,
-                'latitude': place.latitude,
-                'longitude': place.longitude,
-                'reviews': []
-            }
-            
-            for review in place.reviews:
-                review_dict = {
-                    'author_name': review.author_name,
-                    'rating': review.rating,
-                    'text': review.text,
-                    'time': review.time,
-                    'relative_time_description': review.relative_time_description,
-                    'language': review.language,
-                    'review_date': datetime.fromtimestamp(review.time).strftime('%Y-%m-%d %H:%M:%S') if review.time else ''
-                }
-                place_dict['reviews'].append(review_dict)
-            
-            json_data.append(place_dict)
+        json_data = [place_json_dict(place) for place in self.places_data]
         
         json_file = f"data/{filename}.json"
         
@@ -299,6 +583,180 @@ class GooglePlacesReviewsAPI:
         
         logger.info(f"JSON file saved: {json_file}")
         return json_file
+    
+    def export_snapshot(self, directory: str = "data/snapshots", run_id: str = None) -> Dict:
+        """
+        Store the current data as a compressed snapshot (a delta against the
+        previous run when one exists)
+        
+        Args:
+            directory: Snapshot store directory
+            run_id: Snapshot identifier (defaults to a timestamp)
+            
+        Returns:
+            Manifest entry of the stored snapshot
+        """
+        from snapshot_store import SnapshotStore
+        
+        store = SnapshotStore(directory)
+        return store.write([place_json_dict(place) for place in self.places_data], run_id=run_id)
+
+PLACE_CSV_COLUMNS = [
+    'place_id', 'name', 'rating', 'user_ratings_total', 'address', 'phone_number',
+    'website', 'business_status', 'price_level', 'latitude', 'longitude', 'reviews_count', 'company'
+]
+
+REVIEW_CSV_COLUMNS = [
+    'place_id', 'place_name', 'author_name', 'rating', 'text', 'time',
+    'relative_time_description', 'language', 'review_date'
+]
+
+def _review_date(review: PlaceReview) -> str:
+    return datetime.fromtimestamp(review.time).strftime('%Y-%m-%d %H:%M:%S') if review.time else ''
+
+def place_csv_row(place: PlaceInfo) -> Dict:
+    """Flatten a place into a row of the *_places.csv export"""
+    return {
+        'place_id': place.place_id,
+        'name': place.name,
+        'rating': place.rating,
+        'user_ratings_total': place.user_ratings_total,
+        'address': place.address,
+        'phone_number': place.phone_number,
+        'website': place.website,
+        'business_status': place.business_status,
+        'price_level': place.price_level,
+        'latitude': place.latitude,
+        'longitude': place.longitude,
+        'reviews_count': len(place.reviews),
+        'company': place.company
+    }
+
+def review_csv_rows(place: PlaceInfo) -> List[Dict]:
+    """Flatten the reviews of a place into rows of the *_reviews.csv export"""
+    return [{
+        'place_id': review.place_id,
+        'place_name': review.place_name,
+        'author_name': review.author_name,
+        'rating': review.rating,
+        'text': review.text,
+        'time': review.time,
+        'relative_time_description': review.relative_time_description,
+        'language': review.language,
+        'review_date': _review_date(review)
+    } for review in place.reviews]
+
+def place_json_dict(place: PlaceInfo) -> Dict:
+    """Convert a place and its reviews into the JSON export structure"""
+    return {
+        'place_id': place.place_id,
+        'name': place.name,
+        'rating': place.rating,
+        'user_ratings_total': place.user_ratings_total,
+        'address': place.address,
+        'phone_number': place.phone_number,
+        'website': place.website,
+        'business_status': place.business_status,
+        'price_level': place.price_level,
+        'latitude': place.latitude,
+        'longitude': place.longitude,
+        'company': place.company,
+        'reviews': [{
+            'author_name': review.author_name,
+            'rating': review.rating,
+            'text': review.text,
+            'time': review.time,
+            'relative_time_description': review.relative_time_description,
+            'language': review.language,
+            'review_date': _review_date(review)
+        } for review in place.reviews]
+    }
+
+def place_from_json_dict(data: Dict) -> PlaceInfo:
+    """Rebuild a PlaceInfo from the JSON export structure"""
+    reviews = [PlaceReview(
+        place_id=data['place_id'],
+        place_name=data.get('name', ''),
+        author_name=review.get('author_name', ''),
+        rating=review.get('rating', 0),
+        text=review.get('text', ''),
+        time=review.get('time', 0),
+        relative_time_description=review.get('relative_time_description', ''),
+        language=review.get('language', 'en')
+    ) for review in data.get('reviews', [])]
+
+    return PlaceInfo(
+        place_id=data['place_id'],
+        name=data.get('name', ''),
+        rating=data.get('rating', 0.0),
+        user_ratings_total=data.get('user_ratings_total', 0),
+        reviews=reviews,
+        address=data.get('address', ''),
+        phone_number=data.get('phone_number', ''),
+        website=data.get('website', ''),
+        business_status=data.get('business_status', ''),
+        price_level=data.get('price_level'),
+        latitude=data.get('latitude'),
+        longitude=data.get('longitude'),
+        company=data.get('company') or ''
+    )
+
+class StreamingExporter:
+    """
+    Write the usual *_places.csv, *_reviews.csv and .json exports one place
+    at a time, so a run never has to hold every PlaceInfo in memory
+    """
+    
+    def __init__(self, filename: str, directory: str = "data"):
+        """
+        Args:
+            filename: Base filename (without extension)
+            directory: Output directory
+        """
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self.base_path = f"{directory}/{filename}"
+        self.places_file = f"{self.base_path}_places.csv"
+        self.reviews_file = f"{self.base_path}_reviews.csv"
+        self.json_file = f"{self.base_path}.json"
+        
+        self._places_handle = open(self.places_file, 'w', newline='', encoding='utf-8')
+        self._reviews_handle = open(self.reviews_file, 'w', newline='', encoding='utf-8')
+        self._json_handle = open(self.json_file, 'w', encoding='utf-8')
+        self._places_writer = csv.DictWriter(self._places_handle, fieldnames=PLACE_CSV_COLUMNS)
+        self._reviews_writer = csv.DictWriter(self._reviews_handle, fieldnames=REVIEW_CSV_COLUMNS)
+        self._places_writer.writeheader()
+        self._reviews_writer.writeheader()
+        self._json_handle.write('[')
+        self.places_written = 0
+    
+    def write(self, place: PlaceInfo):
+        """Append one place (and its reviews) to all three exports"""
+        self._places_writer.writerow(place_csv_row(place))
+        self._reviews_writer.writerows(review_csv_rows(place))
+        
+        separator = ',\n' if self.places_written else '\n'
+        body = json.dumps(place_json_dict(place), indent=2, ensure_ascii=False)
+        self._json_handle.write(separator + '  ' + body.replace('\n', '\n  '))
+        self.places_written += 1
+    
+    def close(self) -> str:
+        """
+        Finish the exports and close the files
+        
+        Returns:
+            Base path of the created files (same convention as export_to_csv)
+        """
+        self._json_handle.write('\n]' if self.places_written else ']')
+        for handle in (self._places_handle, self._reviews_handle, self._json_handle):
+            handle.close()
+        logger.info(f"Streaming export saved: {self.places_file}, {self.reviews_file}, {self.json_file}")
+        return self.base_path
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
 
 def load_place_ids_from_json(json_file: str) -> List[str]:
     """
@@ -326,6 +784,90 @@ def load_place_ids_from_json(json_file: str) -> List[str]:
         logger.error(f"Error loading place IDs from {json_file}: {str(e)}")
         return []
 
+def fix_mojibake(text: str) -> str:
+    """
+    Repair UTF-8 text that was decoded as cp1252 (e.g. 'BUDIÃƒO' -> 'BUDIÃO')
+
+    Text that is not mojibake (plain ASCII, or already-correct accents that
+    do not form valid UTF-8 once re-encoded) is returned unchanged.
+    """
+    if not isinstance(text, str) or text.isascii():
+        return text
+    raw = bytearray()
+    for char in text:
+        try:
+            raw += char.encode('cp1252')
+        except UnicodeEncodeError:
+            # The 5 bytes cp1252 leaves undefined (0x81, 0x8d, ...) come through as control characters
+            if ord(char) > 0xff:
+                return text
+            raw.append(ord(char))
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return text
+
+def normalize_company_name(name) -> str:
+    """Company (RAZAOSOCIAL) name with mojibake repaired and whitespace collapsed"""
+    if not isinstance(name, str):
+        return ''
+    return ' '.join(fix_mojibake(name).split())
+
+# Google place IDs are long URL-safe base64 tokens; placeholders like 'INVALID'/'UNKNOWN' are not
+_PLACE_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{20,}')
+
+def _looks_like_place_id(value: str) -> bool:
+    return bool(_PLACE_ID_PATTERN.fullmatch(value))
+
+def load_place_companies(path: str) -> Dict[str, str]:
+    """
+    Load the place_id -> company (RAZAOSOCIAL) mapping
+
+    Reads the place_razao_table.json / raizen_places.csv layout ('PLACE ID ',
+    'RAZAOSOCIAL'), normalizes the company names and skips rows whose place
+    ID is a placeholder ('INVALID', 'UNKNOWN') or whose company column holds
+    a place ID instead of a name. When one place ID is listed under several
+    companies the first one wins; conflicts are summarized in one warning,
+    with the companies of each place logged at DEBUG.
+
+    Args:
+        path: Path to the .json or .csv file
+
+    Returns:
+        Dictionary of place_id -> company name
+    """
+    try:
+        if str(path).lower().endswith('.csv'):
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                rows = list(csv.DictReader(f))
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                rows = json.load(f)
+    except Exception as e:
+        logger.error(f"Error loading place companies from {path}: {str(e)}")
+        return {}
+
+    companies = {}
+    conflicts: Dict[str, List[str]] = {}
+    for row in rows:
+        place_id = (row.get('PLACE ID ') or row.get('PLACE ID') or '').strip()
+        company = normalize_company_name(row.get('RAZAOSOCIAL'))
+        if not _looks_like_place_id(place_id) or not company or _looks_like_place_id(company):
+            continue
+        existing = companies.setdefault(place_id, company)
+        if existing != company:
+            listed = conflicts.setdefault(place_id, [existing])
+            if company not in listed:
+                listed.append(company)
+
+    for place_id, listed in conflicts.items():
+        logger.debug(f"Place {place_id} is listed under {len(listed)} companies in {path}: "
+                       f"{', '.join(listed)}; keeping {listed[0]}")
+    if conflicts:
+        logger.warning(f"{len(conflicts)} place IDs in {path} are listed under more than one company; kept the first")
+    logger.info(f"Loaded companies for {len(companies)} place IDs from {path}")
+    return companies
+
 if __name__ == "__main__":
     # Example usage with your data
     def example_usage():
@@ -351,8 +893,8 @@ if __name__ == "__main__":
             print("❌ Processing cancelled. Using first 5 places for testing...")
             place_ids = place_ids[:5]
         
-        # Initialize the API
-        places_api = GooglePlacesReviewsAPI(API_KEY)
+        # Initialize the API, tagging each place with its company (RAZAOSOCIAL)
+        places_api = GooglePlacesReviewsAPI(API_KEY, companies=load_place_companies("place_razao_table.json"))
         
         print(f"🚀 Processing {len(place_ids)} places...")
         
@@ -362,6 +904,7 @@ if __name__ == "__main__":
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         places_api.export_to_csv(f"raizen_places_reviews_{timestamp}")
         places_api.export_to_json(f"raizen_places_reviews_{timestamp}")
+        places_api.export_snapshot(run_id=f"raizen_places_reviews_{timestamp}")
         
         print(f"\n✅ Processing completed!")
         print(f"📊 Processed {len(places_data)} places")
@@ -0,0 +1,283 @@
+"""
+End-to-end load test against the local fake Places server
+
+Starts a FakePlacesServer, then drives either the extractor directly
+(``GooglePlacesReviewsAPI.iter_places`` from one or more worker threads) or
+the web job path (``/api/fetch-places`` and ``/api/fetch-places/stream``
+through the Flask test client and the shared client pool), and reports
+throughput, per-place latency percentiles, error counts and memory.
+
+Exports written by the web path go to a temporary working directory.
+
+Usage:
+    python load_test.py extractor --places 10000 --workers 4 --latency lognormal:20:0.6
+    python load_test.py web --places 10000 --jobs 4 --stream --over-query-limit-rate 0.01
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List
+
+import googlemaps
+import numpy as np
+
+from client_pool import PlacesClientPool
+from fake_places_server import FakePlacesServer
+from google_places_extractor import AIMDRateLimiter, GooglePlacesReviewsAPI, RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+# googlemaps only checks the prefix of the key
+FAKE_API_KEY = "AIzaFakeLoadTestKey000000000000000000000"
+
+# No client-side throttling beyond our own limiter
+CLIENT_KWARGS = {'queries_per_second': 100000, 'queries_per_minute': 6000000, 'retry_timeout': 600}
+
+
+def fake_place_ids(count: int) -> List[str]:
+    """Synthetic place IDs shaped like real ones"""
+    return [f"ChIJLoadTest{i:012d}" for i in range(count)]
+
+
+def _percentiles(latencies: List[float]) -> Dict:
+    if not latencies:
+        return {}
+    values = np.array(latencies) * 1000
+    return {
+        'p50_ms': round(float(np.percentile(values, 50)), 1),
+        'p95_ms': round(float(np.percentile(values, 95)), 1),
+        'p99_ms': round(float(np.percentile(values, 99)), 1),
+        'max_ms': round(float(values.max()), 1),
+    }
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _limiter_kwargs(rate: float) -> Dict:
+    # Injected quota errors are random, not caused by our rate, so the
+    # default AIMD floor and climb (tuned for real quotas of ~10 req/s)
+    # would pin the run near 1 req/s after the first few errors
+    return {'initial_rate': rate, 'max_rate': rate * 2, 'min_rate': rate / 10, 'increase': rate / 10}
+
+
+def run_extractor_load(place_ids: List[str], base_url: str, workers: int = 1,
+                       rate: float = 1000.0) -> Dict:
+    """
+    Fetch place_ids with GooglePlacesReviewsAPI instances sharing one client and limiter
+
+    Args:
+        place_ids: Place IDs to fetch (split across workers)
+        base_url: Fake server URL
+        workers: Concurrent extractor threads
+        rate: Initial AIMD rate (requests/second) of the shared limiter
+
+    Returns:
+        Result dictionary
+    """
+    client = googlemaps.Client(key=FAKE_API_KEY, retry_over_query_limit=False, base_url=base_url, **CLIENT_KWARGS)
+    limiter = AIMDRateLimiter(**_limiter_kwargs(rate))
+    latencies: List[float] = []
+    errors = Counter()
+    fetched = Counter()
+    lock = threading.Lock()
+
+    def work(chunk: List[str]):
+        api = GooglePlacesReviewsAPI(FAKE_API_KEY, rate_limiter=limiter, client=client,
+                                     retry_policy=RetryPolicy(base_delay=0.05, max_delay=1.0, retry_budget=len(chunk)))
+        local = []
+        ok = 0
+        last = time.perf_counter()
+        for _, place in api.iter_places(chunk, keep=False):
+            now = time.perf_counter()
+            local.append(now - last)
+            last = now
+            ok += place is not None
+        with lock:
+            latencies.extend(local)
+            errors.update(api.error_counts)
+            fetched['ok'] += ok
+            fetched['failed'] += len(chunk) - ok
+
+    chunks = [place_ids[i::workers] for i in range(workers)]
+    start = time.perf_counter()
+    threads = [threading.Thread(target=work, args=(chunk,)) for chunk in chunks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    client.session.close()
+
+    return {
+        'mode': 'extractor',
+        'places': len(place_ids),
+        'fetched': fetched['ok'],
+        'failed': fetched['failed'],
+        'seconds': round(elapsed, 2),
+        'places_per_second': round(len(place_ids) / elapsed, 1),
+        'latency': _percentiles(latencies),
+        'errors': dict(errors),
+        'final_rate': round(limiter.rate, 1),
+    }
+
+
+def run_web_load(place_ids: List[str], base_url: str, jobs: int = 1, stream: bool = False,
+                 rate: float = 1000.0) -> Dict:
+    """
+    Run extraction jobs through the Flask endpoints against the fake server
+
+    Args:
+        place_ids: Place IDs to fetch (split across jobs)
+        base_url: Fake server URL
+        jobs: Concurrent jobs (all on the same key, so they share one limiter)
+        stream: Use /api/fetch-places/stream instead of /api/fetch-places
+        rate: Initial AIMD rate of the pooled limiter
+
+    Returns:
+        Result dictionary
+    """
+    import web_app
+
+    web_app.client_pool = PlacesClientPool(client_kwargs={'base_url': base_url, **CLIENT_KWARGS},
+                                           limiter_kwargs=_limiter_kwargs(rate))
+    app = web_app.app
+    latencies: List[float] = []
+    job_seconds: List[float] = []
+    summaries: List[Dict] = []
+    lock = threading.Lock()
+
+    def job(chunk: List[str]):
+        payload = {'api_key': FAKE_API_KEY, 'place_ids': chunk}
+        local = []
+        started = time.perf_counter()
+        with app.test_client() as client:
+            if stream:
+                response = client.post('/api/fetch-places/stream', json=payload, buffered=False)
+                last = time.perf_counter()
+                summary = None
+                event = None
+                for line in response.response:
+                    for row in line.decode('utf-8').splitlines():
+                        if row.startswith('event: '):
+                            event = row[7:]
+                        elif row.startswith('data: ') and event in ('place', 'failed'):
+                            now = time.perf_counter()
+                            local.append(now - last)
+                            last = now
+                        elif row.startswith('data: ') and event == 'done':
+                            summary = json.loads(row[6:])['summary']
+                response.close()
+            else:
+                summary = client.post('/api/fetch-places', json=payload).get_json().get('summary')
+        with lock:
+            job_seconds.append(time.perf_counter() - started)
+            latencies.extend(local)
+            if summary:
+                summaries.append(summary)
+
+    chunks = [place_ids[i::jobs] for i in range(jobs)]
+    start = time.perf_counter()
+    threads = [threading.Thread(target=job, args=(chunk,)) for chunk in chunks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    pool_stats = web_app.client_pool.stats()
+    web_app.client_pool.close()
+
+    errors = Counter()
+    for summary in summaries:
+        errors.update(summary.get('errors', {}))
+
+    result = {
+        'mode': 'web-stream' if stream else 'web',
+        'places': len(place_ids),
+        'jobs': jobs,
+        'completed_jobs': len(summaries),
+        'fetched': sum(summary['total_places'] for summary in summaries),
+        'reviews': sum(summary['total_reviews'] for summary in summaries),
+        'seconds': round(elapsed, 2),
+        'places_per_second': round(len(place_ids) / elapsed, 1),
+        'job_seconds': _percentiles(job_seconds),
+        'errors': dict(errors),
+        'pool': pool_stats,
+    }
+    if stream:
+        result['latency'] = _percentiles(latencies)
+    return result
+
+
+def main():
+    # force: the extractor module configures INFO logging on import
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s', force=True)
+
+    parser = argparse.ArgumentParser(description="Load test the extractor against a fake Places server")
+    parser.add_argument('mode', choices=['extractor', 'web'])
+    parser.add_argument('--places', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=1, help="Extractor threads (extractor mode)")
+    parser.add_argument('--jobs', type=int, default=1, help="Concurrent jobs (web mode)")
+    parser.add_argument('--stream', action='store_true', help="Use the SSE endpoint (web mode)")
+    parser.add_argument('--rate', type=float, default=1000.0, help="Initial requests/second of the limiter")
+    parser.add_argument('--latency', default='lognormal:5:0.5')
+    parser.add_argument('--over-query-limit-rate', type=float, default=0.0)
+    parser.add_argument('--not-found-rate', type=float, default=0.0)
+    parser.add_argument('--reviews', default='0-5')
+    parser.add_argument('--trace-memory', action='store_true', help="Report the tracemalloc peak (slower)")
+    parser.add_argument('--output', help="Also write the result as JSON")
+    args = parser.parse_args()
+
+    place_ids = fake_place_ids(args.places)
+    if args.trace_memory:
+        tracemalloc.start()
+    rss_before = _max_rss_mb()
+
+    with FakePlacesServer(latency=args.latency, over_query_limit_rate=args.over_query_limit_rate,
+                          not_found_rate=args.not_found_rate, reviews=args.reviews) as server:
+        if args.mode == 'extractor':
+            result = run_extractor_load(place_ids, server.base_url, workers=args.workers, rate=args.rate)
+        else:
+            workdir = tempfile.mkdtemp(prefix='places_load_')
+            previous = os.getcwd()
+            os.chdir(workdir)
+            try:
+                result = run_web_load(place_ids, server.base_url, jobs=args.jobs, stream=args.stream, rate=args.rate)
+            finally:
+                os.chdir(previous)
+            result['exports_dir'] = workdir
+        result['server'] = dict(server.stats)
+
+    result['max_rss_mb'] = round(_max_rss_mb(), 1)
+    result['rss_growth_mb'] = round(_max_rss_mb() - rss_before, 1)
+    if args.trace_memory:
+        result['tracemalloc_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 1)
+        tracemalloc.stop()
+
+    print(f"🧪 Load test ({result['mode']}): {result['places']:,} places in {result['seconds']}s "
+          f"→ {result['places_per_second']} places/s")
+    if result.get('latency'):
+        latency = result['latency']
+        print(f"   • Per-place latency: p50 {latency['p50_ms']}ms, p95 {latency['p95_ms']}ms, "
+              f"p99 {latency['p99_ms']}ms, max {latency['max_ms']}ms")
+    print(f"   • Errors: {result['errors']} | Server: {result['server']}")
+    print(f"   • Memory: max RSS {result['max_rss_mb']} MB (+{result['rss_growth_mb']} MB)"
+          + (f", tracemalloc peak {result['tracemalloc_peak_mb']} MB" if args.trace_memory else ''))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
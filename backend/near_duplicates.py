@@ -0,0 +1,350 @@
+"""
+Near-duplicate review detection with MinHash and LSH
+
+Each review's accent-folded word shingles are hashed into a MinHash
+signature; signatures are split into bands and bucketed (locality-sensitive
+hashing), so only reviews sharing a band bucket are compared. Candidates whose
+estimated Jaccard similarity reaches the threshold are joined into clusters
+with union-find. Indexing is one pass over the reviews and new reviews are
+added incrementally, without recomputing the existing signatures.
+
+Very short reviews ("Ótimo", "Bom atendimento") are legitimately identical
+across thousands of stations, so only reviews with at least ``min_tokens``
+tokens take part in clustering.
+
+A saved index keeps its settings. Loading it with a different threshold
+re-links the stored signatures; settings that change the signatures
+themselves (num_perm, bands, shingle_size, min_tokens, seed) need a rebuild
+and are rejected.
+
+Usage:
+    python near_duplicates.py data/raizen_places_reviews_..._reviews.csv
+"""
+
+import argparse
+import json
+import logging
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from review_ledger import review_key
+from text_utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+NEAR_DUPLICATES_FILE = "data/near_duplicates.npz"
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+class NearDuplicateDetector:
+    """Incremental MinHash/LSH index of review texts with union-find clusters"""
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, threshold: float = 0.8,
+                 shingle_size: int = 3, min_tokens: int = 8, seed: int = 1):
+        """
+        Args:
+            num_perm: MinHash signature length
+            bands: LSH bands (num_perm must be divisible by bands); with
+                128/16 pairs above ~0.7 Jaccard are almost always candidates
+            threshold: Minimum estimated Jaccard similarity to link two reviews
+            shingle_size: Words per shingle
+            min_tokens: Shorter reviews are never treated as near-duplicates
+            seed: Seed of the MinHash permutations
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.min_tokens = min_tokens
+        self.seed = seed
+
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = generator.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+        self.keys: List[str] = []
+        self._doc_of: Dict[str, int] = {}
+        self._signatures: List[np.ndarray] = []
+        self._parent: List[int] = []
+        self._buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """
+        MinHash signature of a text, or None if it is too short
+
+        Args:
+            text: Review text
+
+        Returns:
+            uint32 array of length num_perm
+        """
+        tokens = tokenize(text)
+        if len(tokens) < self.min_tokens:
+            return None
+        size = self.shingle_size
+        shingles = {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        permuted = (hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME
+        return (permuted.min(axis=0) & _MAX_HASH).astype(np.uint32)
+
+    def _find(self, doc: int) -> int:
+        parent = self._parent
+        while parent[doc] != doc:
+            parent[doc] = parent[parent[doc]]
+            doc = parent[doc]
+        return doc
+
+    def _union(self, a: int, b: int):
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a != root_b:
+            # The earlier review stays the cluster's representative
+            if root_b < root_a:
+                root_a, root_b = root_b, root_a
+            self._parent[root_b] = root_a
+
+    def _insert(self, key: str, signature: np.ndarray) -> int:
+        doc = len(self.keys)
+        self.keys.append(key)
+        self._doc_of[key] = doc
+        self._signatures.append(signature)
+        self._parent.append(doc)
+
+        # Each candidate is compared once, even if it shares several bands
+        checked = set()
+        for band, buckets in enumerate(self._buckets):
+            members = buckets[signature[band * self.rows:(band + 1) * self.rows].tobytes()]
+            for other in members:
+                if other in checked:
+                    continue
+                checked.add(other)
+                if self._find(other) == self._find(doc):
+                    continue
+                if np.mean(self._signatures[other] == signature) >= self.threshold:
+                    self._union(doc, other)
+            members.append(doc)
+        return doc
+
+    def relink(self, threshold: float):
+        """
+        Rebuild the clusters from the stored signatures with a new threshold
+
+        Args:
+            threshold: Minimum estimated Jaccard similarity to link two reviews
+        """
+        keys, signatures = self.keys, self._signatures
+        self.threshold = threshold
+        self.keys, self._doc_of, self._signatures, self._parent = [], {}, [], []
+        self._buckets = [defaultdict(list) for _ in range(self.bands)]
+        for key, signature in zip(keys, signatures):
+            self._insert(key, signature)
+
+    def add(self, key: str, text: str) -> Optional[int]:
+        """
+        Index one review (reviews already indexed are not added again)
+
+        Args:
+            key: Review identity (see review_ledger.review_key)
+            text: Review text
+
+        Returns:
+            Document number, or None if the review is too short to cluster
+        """
+        doc = self._doc_of.get(key)
+        if doc is not None:
+            return doc
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        return self._insert(key, signature)
+
+    def cluster_of(self, key: str) -> Optional[str]:
+        """Key of the representative of a review's cluster, or None if not indexed"""
+        doc = self._doc_of.get(key)
+        return self.keys[self._find(doc)] if doc is not None else None
+
+    def label(self, keys: Sequence[str], texts: Sequence[str],
+              seen_clusters: Optional[Set[str]] = None) -> Tuple[List[Optional[str]], np.ndarray]:
+        """
+        Index a batch and mark near-duplicates
+
+        All reviews are indexed first, so links found later in the batch still
+        apply to earlier reviews. The first review of each cluster in this
+        batch (or in earlier batches sharing ``seen_clusters``) is kept; every
+        later one is marked as a duplicate.
+
+        Args:
+            keys: Review identities
+            texts: Review texts
+            seen_clusters: Clusters already represented by a kept review;
+                updated in place
+
+        Returns:
+            Tuple of (cluster representative key per review, duplicate mask)
+        """
+        seen = seen_clusters if seen_clusters is not None else set()
+        docs = [self.add(key, text if isinstance(text, str) else '') for key, text in zip(keys, texts)]
+
+        clusters: List[Optional[str]] = []
+        duplicate = np.zeros(len(docs), dtype=bool)
+        for i, doc in enumerate(docs):
+            if doc is None:
+                clusters.append(None)
+                continue
+            cluster = self.keys[self._find(doc)]
+            clusters.append(cluster)
+            if cluster in seen:
+                duplicate[i] = True
+            else:
+                seen.add(cluster)
+        return clusters, duplicate
+
+    def mark_frame(self, reviews_df: pd.DataFrame, seen_clusters: Optional[Set[str]] = None) -> pd.DataFrame:
+        """
+        Add ``dup_cluster`` and ``near_duplicate`` columns to a reviews frame
+
+        Args:
+            reviews_df: Reviews with place_id, time, author_name and text
+            seen_clusters: Shared across chunks of one run (see label())
+
+        Returns:
+            The same frame, with the two columns added
+        """
+        keys = [
+            review_key(place_id, time if time == time else 0,
+                                            author if isinstance(author, str) else '')
+            for place_id, time, author in zip(reviews_df['place_id'], reviews_df['time'], reviews_df['author_name'])
+        ]
+        clusters, duplicate = self.label(keys, reviews_df['text'].tolist(), seen_clusters)
+        reviews_df['dup_cluster'] = clusters
+        reviews_df['near_duplicate'] = duplicate
+        return reviews_df
+
+    def clusters(self, min_size: int = 2) -> Dict[str, List[str]]:
+        """
+        Current clusters
+
+        Args:
+            min_size: Smallest cluster to return
+
+        Returns:
+            Dictionary of representative key -> member keys
+        """
+        members = defaultdict(list)
+        for doc, key in enumerate(self.keys):
+            members[self.keys[self._find(doc)]].append(key)
+        return {root: keys for root, keys in members.items() if len(keys) >= min_size}
+
+    def save(self, path: str = NEAR_DUPLICATES_FILE) -> str:
+        """
+        Persist signatures, keys and cluster links as .npz
+
+        Args:
+            path: Output file path
+
+        Returns:
+            Path to the written file
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        signatures = np.vstack(self._signatures) if self._signatures else np.empty((0, self.num_perm), np.uint32)
+        parents = np.fromiter((self._find(doc) for doc in range(len(self.keys))), dtype=np.int64,
+                              count=len(self.keys))
+        settings = {'num_perm': self.num_perm, 'bands': self.bands, 'threshold': self.threshold,
+                    'shingle_size': self.shingle_size, 'min_tokens': self.min_tokens, 'seed': self.seed}
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, signatures=signatures, parents=parents,
+                                keys=np.array([json.dumps(self.keys, ensure_ascii=False)], dtype=object),
+                                settings=np.array([json.dumps(settings)], dtype=object))
+        logger.info(f"Near-duplicate index saved: {path} ({len(self)} reviews)")
+        return path
+
+    @classmethod
+    def load(cls, path: str = NEAR_DUPLICATES_FILE, **settings) -> 'NearDuplicateDetector':
+        """
+        Load an index written by save(); returns an empty detector if the file is missing
+
+        Settings default to the ones the index was built with. A different
+        threshold is applied by re-linking the stored signatures; any other
+        differing setting raises ValueError.
+
+        Args:
+            path: Input file path
+            **settings: Constructor arguments
+
+        Returns:
+            NearDuplicateDetector instance
+        """
+        if not Path(path).exists():
+            return cls(**settings)
+
+        with np.load(path, allow_pickle=True) as data:
+            stored = json.loads(data['settings'][0])
+            conflicts = {name: value for name, value in settings.items()
+                         if name != 'threshold' and stored.get(name) != value}
+            if conflicts:
+                raise ValueError(f"{path} was built with {stored}; delete it to rebuild with {conflicts}")
+            detector = cls(**stored)
+            signatures = data['signatures']
+            detector.keys = json.loads(data['keys'][0])
+            detector._parent = data['parents'].tolist()
+
+        detector._doc_of = {key: doc for doc, key in enumerate(detector.keys)}
+        detector._signatures = list(signatures)
+        rows = detector.rows
+        for band, buckets in enumerate(detector._buckets):
+            for doc, band_bytes in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+                buckets[band_bytes.tobytes()].append(doc)
+
+        threshold = settings.get('threshold', detector.threshold)
+        if threshold != detector.threshold:
+            logger.info(f"Re-linking {len(detector)} reviews with threshold {threshold} "
+                        f"(index built with {detector.threshold})")
+            detector.relink(threshold)
+        return detector
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Find near-duplicate reviews")
+    parser.add_argument('reviews_file')
+    parser.add_argument('--index', default=NEAR_DUPLICATES_FILE)
+    parser.add_argument('--threshold', type=float,
+                        help="Minimum estimated Jaccard similarity (default 0.8, or the existing index's)")
+    parser.add_argument('--top', type=int, default=10, help="Largest clusters to print")
+    args = parser.parse_args()
+
+    settings = {'threshold': args.threshold} if args.threshold is not None else {}
+    detector = NearDuplicateDetector.load(args.index, **settings)
+    reviews = pd.read_csv(args.reviews_file)
+    reviews = reviews[reviews['text'].notna()].copy()
+    detector.mark_frame(reviews)
+    detector.save(args.index)
+
+    flagged = reviews[reviews['near_duplicate']]
+    clusters = reviews[reviews['dup_cluster'].notna()].groupby('dup_cluster')
+    sizes = clusters['place_id'].agg(['size', 'nunique']).sort_values('size', ascending=False)
+    sizes = sizes[sizes['size'] > 1]
+
+    print(f"🔁 {len(flagged):,} of {len(reviews):,} reviews are near-duplicates "
+          f"({len(sizes):,} clusters)")
+    for cluster, row in sizes.head(args.top).iterrows():
+        text = reviews.loc[reviews['dup_cluster'] == cluster, 'text'].iloc[0]
+        print(f"   • {row['size']} reviews at {row['nunique']} stations: {text[:100]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Dependency-aware stage runner
+
+Stages are declared with the stages they depend on; every stage whose
+dependencies have finished is submitted to a thread pool, so independent
+stages (e.g. the dashboard, the word clouds and the station → map/report
+chain once scoring is done) run concurrently. Each stage function receives
+the dictionary of results of the stages finished so far.
+
+Threads only overlap I/O and code that releases the GIL. Stages declared
+``cpu_bound`` run in a process pool instead (when ``run`` is given
+``max_processes``): their function must be picklable (a module-level
+function or a functools.partial of one), receives only the results of the
+stages it depends on, and its return value is pickled back. Workers are
+spawned, not forked, so they import the function's module afresh.
+
+If a stage fails, the stages depending on it are skipped, the independent
+ones still run, and a StageFailure is raised at the end.
+"""
+
+import logging
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StageFailure(RuntimeError):
+    """Raised when one or more stages failed; carries the partial results"""
+
+    def __init__(self, errors: Dict[str, BaseException], skipped: List[str], results: Dict[str, Any]):
+        self.errors = errors
+        self.skipped = skipped
+        self.results = results
+        failed = ', '.join(f"{name} ({type(error).__name__}: {error})" for name, error in errors.items())
+        message = f"Stages failed: {failed}"
+        if skipped:
+            message += f"; skipped: {', '.join(skipped)}"
+        super().__init__(message)
+
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable[[Dict[str, Any]], Any]
+    depends_on: Tuple[str, ...] = field(default_factory=tuple)
+    cpu_bound: bool = False
+
+
+class StageGraph:
+    """A set of stages with dependencies, run in parallel where possible"""
+
+    def __init__(self):
+        self.stages: Dict[str, Stage] = {}
+        self.timings: Dict[str, float] = {}
+
+    def add(self, name: str, func: Callable[[Dict[str, Any]], Any], depends_on: Sequence[str] = (),
+            cpu_bound: bool = False) -> 'StageGraph':
+        """
+        Declare a stage
+
+        Args:
+            name: Unique stage name (key of its result)
+            func: Called with the results dictionary once dependencies are done
+            depends_on: Names of stages that must finish first
+            cpu_bound: Run in the process pool (func must be picklable and
+                only gets the results of depends_on)
+
+        Returns:
+            The graph, for chaining
+        """
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' declared twice")
+        self.stages[name] = Stage(name, func, tuple(depends_on), cpu_bound)
+        return self
+
+    def _validate(self):
+        for stage in self.stages.values():
+            missing = [dep for dep in stage.depends_on if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {missing}")
+
+        # Kahn's algorithm: every stage must become ready at some point
+        remaining = {name: set(stage.depends_on) for name, stage in self.stages.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Dependency cycle among stages: {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def run(self, max_workers: Optional[int] = 4, max_processes: int = 0) -> Dict[str, Any]:
+        """
+        Run every stage, as soon as its dependencies are done
+
+        Args:
+            max_workers: Worker threads; 1 runs the stages one at a time
+            max_processes: Worker processes for cpu_bound stages; 0 runs
+                them in the thread pool like the other stages
+
+        Returns:
+            Dictionary of stage name -> result
+        """
+        self._validate()
+        results: Dict[str, Any] = {}
+        errors: Dict[str, BaseException] = {}
+        skipped: List[str] = []
+        pending = dict(self.stages)
+        running: Dict[Future, str] = {}
+        started: Dict[str, float] = {}
+
+        def blocked(stage: Stage) -> bool:
+            return any(dep in errors or dep in skipped for dep in stage.depends_on)
+
+        with ExitStack() as stack:
+            pool = stack.enter_context(ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stage'))
+            processes = None
+            if max_processes and any(stage.cpu_bound for stage in self.stages.values()):
+                # Stages are already running in threads here, and forking a
+                # threaded process can copy locks (logging, stdout) mid-use
+                processes = stack.enter_context(ProcessPoolExecutor(
+                    max_workers=max_processes, mp_context=multiprocessing.get_context('spawn')))
+
+            while pending or running:
+                # Skip stages that can never run, then submit the ready ones
+                for name, stage in list(pending.items()):
+                    if blocked(stage):
+                        skipped.append(name)
+                        del pending[name]
+                        logger.warning(f"Skipping stage {name}: a dependency failed")
+                    elif all(dep in results for dep in stage.depends_on):
+                        del pending[name]
+                        started[name] = time.perf_counter()
+                        if stage.cpu_bound and processes is not None:
+                            inputs = {dep: results[dep] for dep in stage.depends_on}
+                            running[processes.submit(stage.func, inputs)] = name
+                        else:
+                            running[pool.submit(stage.func, dict(results))] = name
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    self.timings[name] = time.perf_counter() - started[name]
+                    error = future.exception()
+                    if error is not None:
+                        errors[name] = error
+                        logger.error(f"Stage {name} failed: {error}")
+                    else:
+                        results[name] = future.result()
+                        logger.info(f"Stage {name} finished in {self.timings[name]:.2f}s")
+
+        if errors:
+            raise StageFailure(errors, skipped, results)
+        return results
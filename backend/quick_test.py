@@ -3,7 +3,7 @@ Quick start script for Google Places Reviews Extractor
 Run this to test the system with a few sample places
 """
 
-from google_places_extractor import GooglePlacesReviewsAPI, load_place_ids_from_json
+from google_places_extractor import GooglePlacesReviewsAPI, load_place_companies, load_place_ids_from_json
 from datetime import datetime
 import logging
 
@@ -45,7 +45,7 @@ def quick_test():
     
     # Initialize API
     print(f"\n🔄 Processing {num_places} places...")
-    places_api = GooglePlacesReviewsAPI(api_key)
+    places_api = GooglePlacesReviewsAPI(api_key, companies=load_place_companies("place_razao_table.json"))
     
     # Process places
     test_place_ids = place_ids[:num_places]
@@ -0,0 +1,362 @@
+"""
+Cached address parsing and state -> city -> station rollups
+
+Google's ``formatted_address`` is free-form ("Av. Brasil, 100 - Centro,
+Guarapari - ES, 29211-630, Brazil", "Camocim - Ceará, 62400-000, Brazil",
+"Itaobim - State of Minas Gerais, 39625-000, Brazil", ...). ``parse_address``
+extracts city, two-letter state code and postal code (CEP) from the known
+shapes; ``AddressCache`` memoizes the result per place_id in a JSON file, so
+an address is only parsed again when the place's address changes.
+
+``RegionRollups`` folds the per-station metrics of analyze_by_station into
+precomputed state and city aggregates (review-weighted averages, summed
+counts), so regional dashboards and API queries read finished numbers.
+
+Usage:
+    python region_rollups.py data/raizen_places_reviews_..._places.csv \
+        --stations data/station_sentiment_analysis.csv
+"""
+
+import argparse
+import json
+import logging
+import re
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_CACHE_FILE = "data/address_cache.json"
+REGION_ROLLUPS_FILE = "data/region_rollups.json"
+UNKNOWN = '?'
+
+STATES = {
+    'AC': 'Acre', 'AL': 'Alagoas', 'AP': 'Amapá', 'AM': 'Amazonas', 'BA': 'Bahia', 'CE': 'Ceará',
+    'DF': 'Distrito Federal', 'ES': 'Espírito Santo', 'GO': 'Goiás', 'MA': 'Maranhão',
+    'MT': 'Mato Grosso', 'MS': 'Mato Grosso do Sul', 'MG': 'Minas Gerais', 'PA': 'Pará',
+    'PB': 'Paraíba', 'PR': 'Paraná', 'PE': 'Pernambuco', 'PI': 'Piauí', 'RJ': 'Rio de Janeiro',
+    'RN': 'Rio Grande do Norte', 'RS': 'Rio Grande do Sul', 'RO': 'Rondônia', 'RR': 'Roraima',
+    'SC': 'Santa Catarina', 'SP': 'São Paulo', 'SE': 'Sergipe', 'TO': 'Tocantins',
+}
+
+_POSTAL_CODE = re.compile(r"^\d{5}(?:-?\d{3})?$")
+_COUNTRY = {'brazil', 'brasil'}
+
+
+def _fold(text: str) -> str:
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower().strip()
+
+
+# Accent-folded state names (Portuguese and Google's English forms) -> code
+_STATE_NAMES = {_fold(name): code for code, name in STATES.items()}
+_STATE_NAMES.update({f"state of {name}": code for name, code in list(_STATE_NAMES.items())})
+_STATE_NAMES.update({'federal district': 'DF', 'distrito federal': 'DF'})
+
+
+def _state_code(text: str) -> Optional[str]:
+    text = text.strip()
+    if text.upper() in STATES and len(text) == 2:
+        return text.upper()
+    return _STATE_NAMES.get(_fold(text))
+
+
+def parse_address(address: str) -> Dict[str, Optional[str]]:
+    """
+    Extract city, state code and postal code from a formatted address
+
+    Args:
+        address: Google formatted_address of a Brazilian place
+
+    Returns:
+        Dictionary with city, state and postal_code (None when not found)
+    """
+    parsed = {'city': None, 'state': None, 'postal_code': None}
+    parts = [part.strip() for part in (address or '').split(',') if part.strip()]
+    if parts and _fold(parts[-1]) in _COUNTRY:
+        parts.pop()
+    if parts and _POSTAL_CODE.match(parts[-1]):
+        digits = parts.pop().replace('-', '')
+        parsed['postal_code'] = f"{digits[:5]}-{digits[5:]}" if len(digits) == 8 else digits
+    if not parts:
+        return parsed
+
+    # "City - UF" / "City - State of X" / "Neighbourhood, City - UF"
+    city, _, state = parts[-1].rpartition(' - ')
+    code = _state_code(state)
+    if code and city:
+        parsed['state'] = code
+        parsed['city'] = city.strip()
+        return parsed
+
+    # "Street - City, UF" / "City, State of X"
+    code = _state_code(parts[-1])
+    if code:
+        parsed['state'] = code
+        if len(parts) > 1:
+            parsed['city'] = parts[-2].rpartition(' - ')[2].strip()
+    return parsed
+
+
+class AddressCache:
+    """Parsed addresses per place_id, re-parsed only when the address changes"""
+
+    def __init__(self):
+        # place_id -> {'address', 'city', 'state', 'postal_code'}
+        self.entries: Dict[str, Dict[str, Optional[str]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, place_id: str, address: str) -> Dict[str, Optional[str]]:
+        """
+        Parsed address of a place (from the cache when the address is unchanged)
+
+        Args:
+            place_id: Station ID
+            address: Current formatted address
+
+        Returns:
+            Dictionary with city, state and postal_code
+        """
+        address = address if isinstance(address, str) else ''
+        entry = self.entries.get(place_id)
+        if entry is not None and entry['address'] == address:
+            self.hits += 1
+        else:
+            self.misses += 1
+            entry = self.entries[place_id] = {'address': address, **parse_address(address)}
+        return {'city': entry['city'], 'state': entry['state'], 'postal_code': entry['postal_code']}
+
+    def annotate(self, places_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Return a copy of a frame with place_id and address, plus city, state and postal_code
+
+        Args:
+            places_df: Frame with place_id and address columns
+
+        Returns:
+            Annotated copy
+        """
+        parsed = [self.get(place_id, address) for place_id, address in zip(places_df['place_id'], places_df['address'])]
+        annotated = places_df.copy()
+        for field in ('city', 'state', 'postal_code'):
+            annotated[field] = [entry[field] for entry in parsed]
+        return annotated
+
+    def save(self, path: str = ADDRESS_CACHE_FILE) -> str:
+        """
+        Persist the cache as JSON
+
+        Args:
+            path: Output file path
+
+        Returns:
+            Path to the written file
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        logger.info(f"Address cache saved: {path} ({len(self)} places, {self.misses} parsed this run)")
+        return path
+
+    @classmethod
+    def load(cls, path: str = ADDRESS_CACHE_FILE) -> 'AddressCache':
+        """
+        Load a cache written by save(); returns an empty cache if the file is missing
+
+        Args:
+            path: Input file path
+
+        Returns:
+            AddressCache instance
+        """
+        cache = cls()
+        if Path(path).exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                cache.entries = json.load(f)
+        return cache
+
+
+# Summed per region; averages are rebuilt from the sums
+_SUM_FIELDS = ('total_reviews', 'positive_reviews', 'negative_reviews', 'neutral_reviews', 'sentiment_score')
+
+
+def _new_totals() -> Dict[str, float]:
+    return {'stations': 0, **{field: 0 for field in _SUM_FIELDS}, 'rating_sum': 0.0, 'polarity_sum': 0.0}
+
+
+def _add(totals: Dict[str, float], station: Dict):
+    reviews = station['total_reviews']
+    totals['stations'] += 1
+    for field in _SUM_FIELDS:
+        totals[field] += station[field]
+    totals['rating_sum'] += station['avg_rating'] * reviews
+    totals['polarity_sum'] += station['avg_polarity'] * reviews
+
+
+def _metrics(totals: Dict[str, float]) -> Dict:
+    reviews = totals['total_reviews']
+    return {
+        'stations': totals['stations'],
+        **{field: totals[field] for field in _SUM_FIELDS},
+        'avg_rating': round(totals['rating_sum'] / reviews, 4) if reviews else None,
+        'avg_polarity': round(totals['polarity_sum'] / reviews, 4) if reviews else None,
+        'positive_ratio': round(totals['positive_reviews'] / reviews, 4) if reviews else None,
+        'negative_ratio': round(totals['negative_reviews'] / reviews, 4) if reviews else None,
+    }
+
+
+class RegionRollups:
+    """Precomputed network, state and city aggregates of station metrics"""
+
+    def __init__(self, states: Optional[Dict] = None, network: Optional[Dict] = None,
+                 generated_at: Optional[str] = None):
+        # state -> {'metrics': ..., 'cities': {city -> {'metrics': ..., 'stations': [...]}}}
+        self.states: Dict[str, Dict] = states or {}
+        self.network: Dict = network or _metrics(_new_totals())
+        self.generated_at = generated_at
+
+    @classmethod
+    def build(cls, station_df: pd.DataFrame, cache: AddressCache) -> 'RegionRollups':
+        """
+        Roll station metrics up to cities and states
+
+        Args:
+            station_df: Output of analyze_by_station (place_id, name, address
+                and the per-station metrics)
+            cache: Address cache used to place each station
+
+        Returns:
+            RegionRollups instance
+        """
+        network = _new_totals()
+        state_totals: Dict[str, Dict] = {}
+        city_totals: Dict[Tuple[str, str], Dict] = {}
+        city_stations: Dict[Tuple[str, str], List[Dict]] = {}
+
+        for station in station_df.to_dict('records'):
+            region = cache.get(station['place_id'], station.get('address'))
+            state = region['state'] or UNKNOWN
+            city = region['city'] or UNKNOWN
+            _add(network, station)
+            _add(state_totals.setdefault(state, _new_totals()), station)
+            _add(city_totals.setdefault((state, city), _new_totals()), station)
+            city_stations.setdefault((state, city), []).append({
+                'place_id': station['place_id'],
+                'name': station['name'],
+                'postal_code': region['postal_code'],
+                'total_reviews': int(station['total_reviews']),
+                'avg_rating': round(float(station['avg_rating']), 4),
+                'avg_polarity': round(float(station['avg_polarity']), 4),
+                'negative_ratio': round(float(station['negative_ratio']), 4),
+                'sentiment_score': int(station['sentiment_score']),
+            })
+
+        states = {state: {'metrics': _metrics(totals), 'cities': {}} for state, totals in state_totals.items()}
+        for (state, city), totals in city_totals.items():
+            stations = sorted(city_stations[(state, city)], key=lambda entry: entry['sentiment_score'], reverse=True)
+            states[state]['cities'][city] = {'metrics': _metrics(totals), 'stations': stations}
+        return cls(states, _metrics(network), datetime.now().isoformat(timespec='seconds'))
+
+    def state_summary(self) -> List[Dict]:
+        """Every state's metrics, most reviewed first"""
+        rows = [{'state': state, 'name': STATES.get(state), 'cities': len(entry['cities']), **entry['metrics']}
+                for state, entry in self.states.items()]
+        return sorted(rows, key=lambda row: row['total_reviews'], reverse=True)
+
+    def city_summary(self, state: str) -> List[Dict]:
+        """
+        Cities of a state with their metrics, most reviewed first
+
+        Raises:
+            KeyError: If the state has no stations
+        """
+        entry = self.states.get(state.upper())
+        if entry is None:
+            raise KeyError(f"No stations in state {state}")
+        rows = [{'city': city, **city_entry['metrics']} for city, city_entry in entry['cities'].items()]
+        return sorted(rows, key=lambda row: row['total_reviews'], reverse=True)
+
+    def city(self, state: str, city: str) -> Dict:
+        """
+        One city's metrics and stations (city names match accent- and case-insensitively)
+
+        Raises:
+            KeyError: If the city has no stations
+        """
+        cities = self.states.get(state.upper(), {}).get('cities', {})
+        wanted = _fold(city)
+        for name, entry in cities.items():
+            if _fold(name) == wanted:
+                return {'state': state.upper(), 'city': name, **entry}
+        raise KeyError(f"No stations in {city} - {state}")
+
+    def save(self, path: str = REGION_ROLLUPS_FILE) -> str:
+        """
+        Persist the rollups as JSON
+
+        Args:
+            path: Output file path
+
+        Returns:
+            Path to the written file
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        data = {'generated_at': self.generated_at, 'network': self.network, 'states': self.states}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        logger.info(f"Region rollups saved: {path} ({len(self.states)} states)")
+        return path
+
+    @classmethod
+    def load(cls, path: str = REGION_ROLLUPS_FILE) -> 'RegionRollups':
+        """
+        Load rollups written by save(); returns empty rollups if the file is missing
+
+        Args:
+            path: Input file path
+
+        Returns:
+            RegionRollups instance
+        """
+        if not Path(path).exists():
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['states'], data['network'], data.get('generated_at'))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Parse station addresses and build region rollups")
+    parser.add_argument('places_file')
+    parser.add_argument('--stations', help="Station analysis CSV written by sentiment_analysis.py")
+    parser.add_argument('--cache', default=ADDRESS_CACHE_FILE)
+    parser.add_argument('--output', default=REGION_ROLLUPS_FILE)
+    args = parser.parse_args()
+
+    cache = AddressCache.load(args.cache)
+    places = cache.annotate(pd.read_csv(args.places_file, usecols=['place_id', 'address']).drop_duplicates('place_id'))
+    cache.save(args.cache)
+    unparsed = places['state'].isna().sum()
+    print(f"🗺️ Parsed {len(places)} addresses ({cache.misses} new, {cache.hits} cached, {unparsed} without a state)")
+
+    if args.stations:
+        rollups = RegionRollups.build(pd.read_csv(args.stations), cache)
+        rollups.save(args.output)
+        print(f"🗺️ Region rollups saved to {args.output}")
+        for row in rollups.state_summary()[:10]:
+            print(f"   • {row['state']}: {row['stations']} stations, {row['total_reviews']} reviews, "
+                  f"avg rating {row['avg_rating']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Filtered, streaming review exports
+
+Reads an extraction's reviews CSV chunk by chunk, applies the filters
+(stations, rating range, date range, bounding box and text sentiment) and
+encodes each surviving chunk as CSV or NDJSON, optionally gzip-compressed on
+the fly. Only one chunk of reviews and the (small) places table are in
+memory at a time, so a full-network export uses the same memory as a
+filtered one.
+
+Sentiment is scored per chunk, and only for reviews that passed the other
+filters, with the same thresholds as the analysis pipeline.
+
+Usage:
+    python review_export.py --sentiment negative --bbox -24.1,-47.0,-23.3,-46.3 --start 2025-03-01 > out.csv
+    python review_export.py --dataset raizen_places_reviews_20250609_150209 --format ndjson --gzip > out.ndjson.gz
+"""
+
+import argparse
+import logging
+import re
+import sys
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from company_rollups import PLACE_COMPANIES_FILE
+from google_places_extractor import load_place_companies
+from review_search import SENTIMENT_CODES, date_to_epoch
+from sentiment_scorers import get_scorer, sentiment_labels
+from station_index import parse_bbox
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = "data"
+EXPORT_CHUNKSIZE = 5000
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+REVIEW_COLUMNS = ['place_id', 'place_name', 'author_name', 'rating', 'text', 'time',
+                  'relative_time_description', 'language', 'review_date']
+PLACE_COLUMNS = ['address', 'latitude', 'longitude', 'company']
+SENTIMENT_COLUMNS = ['sentiment', 'polarity']
+EXPORT_COLUMNS = REVIEW_COLUMNS + PLACE_COLUMNS + SENTIMENT_COLUMNS
+
+_DATASET_PATTERN = re.compile(r"[\w.-]+")
+
+
+@dataclass
+class ExportFilters:
+    """Row filters of an export; unset fields do not filter"""
+    place_ids: List[str] = field(default_factory=list)
+    sentiment: Optional[str] = None
+    min_rating: Optional[float] = None
+    max_rating: Optional[float] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+    bbox: Optional[Tuple[float, float, float, float]] = None
+
+    def __post_init__(self):
+        if self.sentiment is not None and self.sentiment not in SENTIMENT_CODES:
+            raise ValueError(f"sentiment must be one of: {', '.join(SENTIMENT_CODES)}")
+        # Fail on bad dates before any row is streamed
+        self._start_time = date_to_epoch(self.start)
+        self._end_time = date_to_epoch(self.end, end_of_day=True)
+
+    def apply(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Apply every filter except sentiment (which needs scoring)"""
+        mask = np.ones(len(chunk), dtype=bool)
+        if self.place_ids:
+            mask &= chunk['place_id'].isin(self.place_ids).to_numpy()
+        if self.min_rating is not None:
+            mask &= (chunk['rating'] >= self.min_rating).to_numpy()
+        if self.max_rating is not None:
+            mask &= (chunk['rating'] <= self.max_rating).to_numpy()
+        if self._start_time is not None:
+            mask &= (chunk['time'] >= self._start_time).to_numpy()
+        if self._end_time is not None:
+            mask &= (chunk['time'] <= self._end_time).to_numpy()
+        if self.bbox is not None:
+            min_lat, min_lng, max_lat, max_lng = self.bbox
+            latitude, longitude = chunk['latitude'], chunk['longitude']
+            mask &= ((latitude >= min_lat) & (latitude <= max_lat)
+                     & (longitude >= min_lng) & (longitude <= max_lng)).to_numpy()
+        return chunk[mask]
+
+
+def find_dataset(name: Optional[str] = None, directory: str = EXPORT_DIR) -> Tuple[str, str]:
+    """
+    Resolve an extraction's reviews and places CSVs
+
+    Args:
+        name: Base filename of the extraction (e.g. raizen_places_reviews_20250609_150209);
+            the most recent extraction when omitted
+        directory: Export directory
+
+    Returns:
+        Tuple of (reviews_file, places_file)
+
+    Raises:
+        ValueError: If the name is not a plain file name
+        FileNotFoundError: If the extraction does not exist
+    """
+    if name:
+        if not _DATASET_PATTERN.fullmatch(name):
+            raise ValueError(f"Invalid dataset name '{name}'")
+        reviews_file = Path(directory) / f"{name}_reviews.csv"
+        if not reviews_file.exists():
+            raise FileNotFoundError(f"Dataset '{name}' not found")
+    else:
+        candidates = sorted(Path(directory).glob("*_reviews.csv"), key=lambda path: path.stat().st_mtime)
+        if not candidates:
+            raise FileNotFoundError(f"No extractions found in {directory}/")
+        reviews_file = candidates[-1]
+    places_file = reviews_file.with_name(reviews_file.name[:-len("_reviews.csv")] + "_places.csv")
+    return str(reviews_file), str(places_file)
+
+
+def parse_columns(value: Optional[str]) -> List[str]:
+    """Parse a comma-separated column list (all review columns when empty)"""
+    if not value:
+        return list(REVIEW_COLUMNS)
+    columns = [column.strip() for column in value.split(',') if column.strip()]
+    unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}. Available: {', '.join(EXPORT_COLUMNS)}")
+    return columns
+
+
+def iter_filtered_reviews(reviews_file: str, places_file: str, filters: ExportFilters,
+                          columns: Sequence[str], chunksize: int = EXPORT_CHUNKSIZE,
+                          scorer=None, companies: Optional[Dict[str, str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield filtered review chunks with the requested columns
+
+    Args:
+        reviews_file: Reviews CSV of an extraction
+        places_file: Places CSV of the same extraction (for bbox and place columns)
+        filters: Row filters
+        columns: Output columns, in order
+        chunksize: Reviews read per chunk
+        scorer: Sentiment scorer (name or instance) when sentiment is needed
+        companies: place_id -> company for places the places CSV has no
+            company for (default: loaded from PLACE_COMPANIES_FILE when needed)
+
+    Returns:
+        Iterator of DataFrames
+    """
+    needs_places = filters.bbox is not None or any(column in PLACE_COLUMNS for column in columns)
+    needs_sentiment = filters.sentiment is not None or any(column in SENTIMENT_COLUMNS for column in columns)
+
+    places = None
+    if needs_places:
+        # Older extractions may lack coordinates (their stations never match a
+        # bbox) or the company column (filled from the company table)
+        places = pd.read_csv(places_file, usecols=lambda column: column in ['place_id'] + PLACE_COLUMNS,
+                             dtype={'place_id': 'string'})
+        places = places.drop_duplicates('place_id').set_index('place_id').reindex(columns=PLACE_COLUMNS)
+        missing = places['company'].isna() | (places['company'] == '')
+        if 'company' in columns and missing.any():
+            if companies is None:
+                companies = load_place_companies(PLACE_COMPANIES_FILE)
+            places['company'] = places['company'].astype(object)
+            places.loc[missing, 'company'] = places.index[missing].map(companies)
+    sentiment_scorer = get_scorer(scorer) if needs_sentiment else None
+
+    reader = pd.read_csv(reviews_file, usecols=lambda column: column in REVIEW_COLUMNS, chunksize=chunksize,
+                         dtype={'place_id': 'string', 'text': 'string', 'author_name': 'string'})
+    for chunk in reader:
+        if places is not None:
+            chunk = chunk.join(places, on='place_id')
+        chunk = filters.apply(chunk)
+        if sentiment_scorer is not None and len(chunk):
+            texts = chunk['text'].fillna('').astype(str)
+            polarities, _ = sentiment_scorer.score(texts.tolist())
+            # Same rule as the analysis: very short texts carry no sentiment
+            polarities[(texts.str.strip().str.len() < 3).to_numpy()] = 0.0
+            chunk = chunk.assign(polarity=polarities, sentiment=sentiment_labels(polarities))
+            if filters.sentiment is not None:
+                chunk = chunk[chunk['sentiment'] == filters.sentiment]
+        if len(chunk):
+            yield chunk.reindex(columns=list(columns))
+
+
+def _encode(chunk: pd.DataFrame, fmt: str) -> str:
+    if fmt == 'csv':
+        return chunk.to_csv(index=False, header=False)
+    lines = chunk.to_json(orient='records', lines=True, force_ascii=False)
+    return lines if lines.endswith('\n') else lines + '\n'
+
+
+def stream_export(reviews_file: str, places_file: str, filters: ExportFilters,
+                  columns: Sequence[str], fmt: str = 'csv', compress: bool = False,
+                  chunksize: int = EXPORT_CHUNKSIZE, scorer=None,
+                  companies: Optional[Dict[str, str]] = None) -> Iterator[bytes]:
+    """
+    Encode a filtered export as a stream of byte blocks
+
+    Args:
+        reviews_file, places_file: Extraction CSVs (see find_dataset)
+        filters: Row filters
+        columns: Output columns, in order
+        fmt: 'csv' or 'ndjson'
+        compress: gzip the stream
+        chunksize: Reviews read per chunk
+        scorer: Sentiment scorer (name or instance) when sentiment is needed
+        companies: Fallback place_id -> company (see iter_filtered_reviews)
+
+    Returns:
+        Iterator of byte blocks, one per non-empty chunk
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    # wbits 31 = gzip container
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def emit(text: str) -> bytes:
+        data = text.encode('utf-8')
+        return compressor.compress(data) if compressor else data
+
+    rows = 0
+    if fmt == 'csv':
+        yield emit(pd.DataFrame(columns=list(columns)).to_csv(index=False))
+    for chunk in iter_filtered_reviews(reviews_file, places_file, filters, columns, chunksize, scorer, companies):
+        rows += len(chunk)
+        block = emit(_encode(chunk, fmt))
+        if block:
+            yield block
+    if compressor:
+        yield compressor.flush()
+    logger.info(f"Export of {reviews_file}: {rows} rows ({fmt}{', gzip' if compress else ''})")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stderr)
+
+    parser = argparse.ArgumentParser(description="Stream a filtered review export to stdout")
+    parser.add_argument('--dataset', help="Extraction base name (default: the most recent)")
+    parser.add_argument('--place-id', action='append', default=[])
+    parser.add_argument('--sentiment', choices=list(SENTIMENT_CODES))
+    parser.add_argument('--min-rating', type=float)
+    parser.add_argument('--max-rating', type=float)
+    parser.add_argument('--start', help="YYYY-MM-DD")
+    parser.add_argument('--end', help="YYYY-MM-DD")
+    parser.add_argument('--bbox', help="min_lat,min_lng,max_lat,max_lng")
+    parser.add_argument('--columns', help=f"Comma-separated subset of: {', '.join(EXPORT_COLUMNS)}")
+    parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument('--scorer', default='lexicon', help="Sentiment scorer (textblob or lexicon)")
+    args = parser.parse_args()
+
+    reviews_file, places_file = find_dataset(args.dataset)
+    filters = ExportFilters(args.place_id, args.sentiment, args.min_rating, args.max_rating,
+                            args.start, args.end, parse_bbox(args.bbox))
+    for block in stream_export(reviews_file, places_file, filters, parse_columns(args.columns),
+                               args.format, args.gzip, scorer=args.scorer):
+        sys.stdout.buffer.write(block)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Review identity and the shared ledger of ingested reviews
+
+A review is identified by place_id, timestamp and author name
+(``review_key``). The incremental stores (time-series rollups, search index,
+reviewer index, company rollups) must each fold a review in exactly once,
+across runs and across re-fetches. Rather than every store keeping its own
+set of key strings, ``ReviewLedger`` keeps one sorted array of 64-bit key
+hashes with a flag byte per review: for each store, whether the review was
+ingested and whether it was ingested with a sentiment score. That is 9 bytes
+per review on disk, memory-mapped on load, instead of a Python string per
+review per store.
+
+``review_totals`` is the per-group aggregation the rollup stores share:
+counts, rating and polarity sums and sentiment counts.
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+REVIEW_LEDGER_FILE = "data/review_ledger.npy"
+
+# Stores tracked by the ledger; each gets an 'ingested' and a 'scored' bit
+LEDGER_STORES = ('rollups', 'search', 'reviewers', 'companies')
+
+_ENTRY_DTYPE = np.dtype([('hash', '<u8'), ('flags', 'u1')])
+
+# Pending additions are compacted into one sorted array beyond this many parts
+_MAX_PENDING_PARTS = 8
+
+# Columns of review_totals, in bucket order
+TOTAL_COLUMNS = ['count', 'rating_sum', 'rating_n', 'polarity_sum', 'polarity_n',
+                 'positive', 'neutral', 'negative']
+SENTIMENTS = ('positive', 'neutral', 'negative')
+
+
+def review_key(place_id: str, time: int, author_name: str = '') -> str:
+    """Identity of a review, used to avoid counting re-fetched reviews twice"""
+    return f"{place_id}|{int(time or 0)}|{author_name or ''}"
+
+
+def review_keys(reviews_df: pd.DataFrame) -> pd.Series:
+    """Vectorized review_key over a reviews frame (place_id, time, author_name)"""
+    df = reviews_df
+    return (
+        df['place_id'].astype(str) + '|' +
+        (df['time'].fillna(0).astype('int64').astype(str) if 'time' in df.columns else '0') + '|' +
+        (df['author_name'].fillna('').astype(str) if 'author_name' in df.columns else '')
+    )
+
+
+def review_hashes(reviews_df: pd.DataFrame) -> np.ndarray:
+    """64-bit hashes of the review keys of a frame (stable across runs)"""
+    keys = review_keys(reviews_df)
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy(dtype=np.uint64)
+
+
+def review_totals(reviews_df: pd.DataFrame, by, scores_only: bool = False) -> pd.DataFrame:
+    """
+    Sum review counts, ratings, polarities and sentiment labels per group
+
+    Uses ``rating``, ``polarity`` and ``sentiment`` when present; missing
+    ratings and polarities are left out of both the sum and the count.
+
+    Args:
+        reviews_df: Reviews frame
+        by: Grouping keys (column name, list, or Series aligned with the frame)
+        scores_only: Only sum polarity and sentiment (count and rating stay 0),
+            for reviews counted earlier without a score
+
+    Returns:
+        DataFrame indexed by group with TOTAL_COLUMNS
+    """
+    df = reviews_df
+    index = df.index
+    frame = pd.DataFrame(index=index)
+    frame['count'] = 0 if scores_only else 1
+    for column in ('rating', 'polarity'):
+        values = df[column] if column in df.columns else pd.Series(np.nan, index=index)
+        if scores_only and column == 'rating':
+            values = pd.Series(np.nan, index=index)
+        frame[f'{column}_sum'] = values.fillna(0).astype(float)
+        frame[f'{column}_n'] = values.notna().astype(int)
+    for sentiment in SENTIMENTS:
+        frame[sentiment] = (df['sentiment'] == sentiment).astype(int) if 'sentiment' in df.columns else 0
+    if isinstance(by, str):
+        by = df[by]
+    elif isinstance(by, list):
+        by = [df[column] if isinstance(column, str) else column for column in by]
+    return frame.groupby(by)[TOTAL_COLUMNS].sum()
+
+
+def _merge(parts: Sequence[np.ndarray]) -> np.ndarray:
+    """Merge entry arrays into one sorted array with unique hashes (flags OR-ed)"""
+    parts = [part for part in parts if len(part)]
+    if not parts:
+        return np.empty(0, dtype=_ENTRY_DTYPE)
+    entries = np.concatenate([np.asarray(part) for part in parts])
+    entries = entries[np.argsort(entries['hash'], kind='stable')]
+    hashes, starts = np.unique(entries['hash'], return_index=True)
+    merged = np.empty(len(hashes), dtype=_ENTRY_DTYPE)
+    merged['hash'] = hashes
+    merged['flags'] = np.bitwise_or.reduceat(entries['flags'], starts)
+    return merged
+
+
+class ReviewLedger:
+    """Which reviews each incremental store has already ingested"""
+
+    def __init__(self, entries: Optional[np.ndarray] = None):
+        # Sorted by hash; possibly a read-only memory map
+        self._entries = entries if entries is not None else np.empty(0, dtype=_ENTRY_DTYPE)
+        self._pending: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        self._compact(force=True)
+        return len(self._entries) + sum(len(part) for part in self._pending)
+
+    @staticmethod
+    def bits(store: str) -> Tuple[int, int]:
+        """(ingested, scored) flag bits of a store"""
+        if store not in LEDGER_STORES:
+            raise ValueError(f"Unknown ledger store '{store}'. Use one of {LEDGER_STORES}")
+        position = 2 * LEDGER_STORES.index(store)
+        return 1 << position, 1 << (position + 1)
+
+    @staticmethod
+    def _lookup(entries: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+        flags = np.zeros(len(hashes), dtype=np.uint8)
+        if len(entries) == 0 or len(hashes) == 0:
+            return flags
+        positions = np.searchsorted(entries['hash'], hashes)
+        positions[positions == len(entries)] = 0
+        found = entries['hash'][positions] == hashes
+        flags[found] = entries['flags'][positions[found]]
+        return flags
+
+    def flags(self, hashes: np.ndarray) -> np.ndarray:
+        """Flag byte of each review hash (0 for reviews never ingested)"""
+        flags = self._lookup(self._entries, hashes)
+        for part in self._pending:
+            flags |= self._lookup(part, hashes)
+        return flags
+
+    def mark(self, hashes: np.ndarray, bits: int):
+        """Set flag bits on reviews"""
+        if len(hashes) == 0:
+            return
+        entries = np.empty(len(hashes), dtype=_ENTRY_DTYPE)
+        entries['hash'] = hashes
+        entries['flags'] = bits
+        self._pending.append(_merge([entries]))
+        self._compact()
+
+    def _compact(self, force: bool = False):
+        if len(self._pending) > _MAX_PENDING_PARTS or (force and len(self._pending) > 1):
+            self._pending = [_merge(self._pending)]
+
+    def select(self, reviews_df: pd.DataFrame, store: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Split a frame into the reviews a store has not ingested yet, and the
+        ones it ingested without a score that now carry one
+
+        Reviews repeated within the frame count once.
+
+        Args:
+            reviews_df: Reviews frame (place_id, time, author_name; polarity optional)
+            store: Store name (see LEDGER_STORES)
+
+        Returns:
+            Tuple of (new_reviews, newly_scored_reviews)
+        """
+        ingested, scored = self.bits(store)
+        hashes = review_hashes(reviews_df)
+        flags = self.flags(hashes)
+        first = ~pd.Series(hashes).duplicated().to_numpy()
+        has_score = (reviews_df['polarity'].notna().to_numpy() if 'polarity' in reviews_df.columns
+                     else np.zeros(len(reviews_df), dtype=bool))
+        new = first & (flags & ingested == 0)
+        rescored = first & (flags & ingested != 0) & (flags & scored == 0) & has_score
+        return reviews_df[new], reviews_df[rescored]
+
+    def record(self, reviews_df: pd.DataFrame, store: str):
+        """Mark a frame's reviews as ingested by a store (and scored where they have a polarity)"""
+        if reviews_df.empty:
+            return
+        ingested, scored = self.bits(store)
+        hashes = review_hashes(reviews_df)
+        has_score = (reviews_df['polarity'].notna().to_numpy() if 'polarity' in reviews_df.columns
+                     else np.zeros(len(reviews_df), dtype=bool))
+        self.mark(hashes[has_score], ingested | scored)
+        self.mark(hashes[~has_score], ingested)
+
+    def reset(self, store: str):
+        """Forget what a store ingested (when its file was deleted for a rebuild)"""
+        mask = np.uint8(0xff ^ sum(self.bits(store)))
+        entries = _merge([self._entries, *self._pending])
+        entries['flags'] &= mask
+        self._entries = entries[entries['flags'] != 0]
+        self._pending = []
+
+    def save(self, path: str = REVIEW_LEDGER_FILE) -> str:
+        """
+        Persist the ledger as a sorted .npy array
+
+        Args:
+            path: Output file path
+
+        Returns:
+            Path to the written file
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        entries = _merge([self._entries, *self._pending])
+        # Write next to the target and swap, so a memory map of the old file stays valid
+        tmp_path = f"{path}.tmp.npy"
+        np.save(tmp_path, entries)
+        os.replace(tmp_path, path)
+        self._entries = entries
+        self._pending = []
+        logger.info(f"Review ledger saved: {path} ({len(entries)} reviews)")
+        return path
+
+    @classmethod
+    def load(cls, path: str = REVIEW_LEDGER_FILE) -> 'ReviewLedger':
+        """
+        Memory-map a ledger written by save(); returns an empty ledger if the file is missing
+
+        Args:
+            path: Input file path
+
+        Returns:
+            ReviewLedger instance
+        """
+        if not Path(path).exists():
+            return cls()
+        return cls(np.load(path, mmap_mode='r'))
@@ -0,0 +1,480 @@
+"""
+Full-text search over review text
+
+An inverted index maps every accent-folded token (``não`` and ``nao`` are the
+same term) to the sorted array of reviews containing it, with per-review term
+frequencies for BM25 ranking and term positions for phrase matching. Queries support implicit AND, ``OR``, ``-term``
+exclusion and ``"quoted phrases"``; results can be filtered by station,
+sentiment and review date and are returned ranked and paginated.
+
+The index is built incrementally from review frames (during sentiment
+analysis, chunk by chunk in out-of-core mode) and stored as one ``.npz`` file
+the web app loads once.
+
+Usage:
+    python review_search.py build data/raizen_places_reviews_..._reviews.csv
+    python review_search.py query "bomba quebrada" --sentiment negative
+"""
+
+import argparse
+import json
+import logging
+import shlex
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from review_ledger import REVIEW_LEDGER_FILE, ReviewLedger
+from sentiment_scorers import LexiconScorer, sentiment_labels
+from text_utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_FILE = "data/review_search_index.npz"
+LEDGER_STORE = 'search'
+
+SENTIMENT_CODES = {'positive': 0, 'neutral': 1, 'negative': 2}
+_SENTIMENT_NAMES = {code: name for name, code in SENTIMENT_CODES.items()}
+_NO_SENTIMENT = -1
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+
+def _term_positions(tokens: List[str]) -> Dict[str, List[int]]:
+    positions: Dict[str, List[int]] = {}
+    for position, token in enumerate(tokens):
+        positions.setdefault(token, []).append(position)
+    return positions
+
+
+def parse_query(query: str) -> List[Tuple[List[List[str]], List[List[str]]]]:
+    """
+    Parse a query into OR-ed clauses of required and excluded items
+
+    Each item is a list of tokens: one token for a term, several for a phrase.
+    ``bomba "troco errado" -gasolina OR frentista`` becomes two clauses:
+    ([["bomba"], ["troco", "errado"]], [["gasolina"]]) and ([["frentista"]], []).
+
+    Args:
+        query: Query string
+
+    Returns:
+        List of (required, excluded) tuples
+    """
+    try:
+        parts = shlex.split(query, posix=True)
+    except ValueError:
+        # Unbalanced quote: treat the rest as plain terms
+        parts = query.replace('"', ' ').split()
+
+    clauses = []
+    required: List[List[str]] = []
+    excluded: List[List[str]] = []
+    for part in parts:
+        if part == 'OR':
+            if required:
+                clauses.append((required, excluded))
+            required, excluded = [], []
+            continue
+        if part in ('AND', '+'):
+            continue
+        negate = part.startswith('-') and len(part) > 1
+        tokens = tokenize(part[1:] if negate else part)
+        if not tokens:
+            continue
+        (excluded if negate else required).append(tokens)
+    if required:
+        clauses.append((required, excluded))
+    return clauses
+
+
+def date_to_epoch(date: Optional[str], end_of_day: bool = False) -> Optional[int]:
+    if not date:
+        return None
+    moment = datetime.fromisoformat(date)
+    if end_of_day and len(date) <= 10:
+        return int(moment.timestamp()) + 86399
+    return int(moment.timestamp())
+
+
+class ReviewSearchIndex:
+    """Inverted index over review text with BM25 ranking and metadata filters"""
+
+    def __init__(self):
+        # Document columns
+        self.place_ids: List[str] = []
+        self.place_names: List[str] = []
+        self.authors: List[str] = []
+        self.texts: List[str] = []
+        self._ratings: List[float] = []
+        self._times: List[int] = []
+        self._sentiments: List[int] = []
+        self._lengths: List[int] = []
+
+        # term -> list of (doc, positions) while building
+        self._pending: Dict[str, List[Tuple[int, List[int]]]] = {}
+        # term -> (docs, tfs, positions); a doc's positions are the next tf entries
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._compiled = True
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def add_frame(self, reviews_df: pd.DataFrame, ledger: Optional[ReviewLedger] = None) -> int:
+        """
+        Index a batch of reviews
+
+        Expects ``place_id`` and ``text``; uses ``place_name``, ``author_name``,
+        ``rating``, ``time`` and ``sentiment`` when present. Reviews without
+        text are not indexed.
+
+        Args:
+            reviews_df: Reviews DataFrame
+            ledger: Shared review ledger; reviews it lists for the search index
+                are skipped (without one, every row is added)
+
+        Returns:
+            Number of reviews added
+        """
+        texts = reviews_df['text']
+        reviews_df = reviews_df[texts.map(lambda text: isinstance(text, str) and text != '')]
+        if ledger is not None:
+            reviews_df, _ = ledger.select(reviews_df, LEDGER_STORE)
+            ledger.record(reviews_df, LEDGER_STORE)
+
+        def column(name, default):
+            if name in reviews_df.columns:
+                return reviews_df[name].tolist()
+            return [default] * len(reviews_df)
+
+        added = 0
+        for place_id, place_name, author, rating, time, sentiment, text in zip(
+                column('place_id', ''), column('place_name', ''), column('author_name', ''),
+                column('rating', float('nan')), column('time', 0), column('sentiment', None),
+                column('text', '')):
+            time = int(time) if time == time and time else 0
+            doc = len(self.texts)
+            tokens = tokenize(text)
+            for token, token_positions in _term_positions(tokens).items():
+                self._pending.setdefault(token, []).append((doc, token_positions))
+
+            self.place_ids.append(str(place_id))
+            self.place_names.append(place_name if isinstance(place_name, str) else '')
+            self.authors.append(author if isinstance(author, str) else '')
+            self.texts.append(text)
+            self._ratings.append(float(rating) if rating is not None else float('nan'))
+            self._times.append(time)
+            self._sentiments.append(SENTIMENT_CODES.get(sentiment, _NO_SENTIMENT))
+            self._lengths.append(len(tokens))
+            added += 1
+
+        if added:
+            self._compiled = False
+        return added
+
+    def _compile(self):
+        """Merge pending postings into sorted arrays and refresh column arrays"""
+        if self._compiled:
+            return
+        for term, entries in self._pending.items():
+            docs = np.fromiter((doc for doc, _ in entries), dtype=np.int32, count=len(entries))
+            tfs = np.fromiter((len(positions) for _, positions in entries), dtype=np.int32, count=len(entries))
+            positions = np.fromiter((position for _, doc_positions in entries for position in doc_positions),
+                                    dtype=np.int32, count=int(tfs.sum()))
+            if term in self._postings:
+                old_docs, old_tfs, old_positions = self._postings[term]
+                docs = np.concatenate([old_docs, docs])
+                tfs = np.concatenate([old_tfs, tfs])
+                positions = np.concatenate([old_positions, positions])
+            self._postings[term] = (docs, tfs, positions)
+        self._pending = {}
+
+        self.ratings = np.asarray(self._ratings, dtype=np.float32)
+        self.times = np.asarray(self._times, dtype=np.int64)
+        self.sentiments = np.asarray(self._sentiments, dtype=np.int8)
+        self.lengths = np.asarray(self._lengths, dtype=np.int32)
+        self._place_codes, self._place_table = self._encode_places()
+        self._compiled = True
+
+    def _encode_places(self) -> Tuple[np.ndarray, Dict[str, int]]:
+        table: Dict[str, int] = {}
+        codes = np.fromiter((table.setdefault(place_id, len(table)) for place_id in self.place_ids),
+                            dtype=np.int32, count=len(self.place_ids))
+        return codes, table
+
+    def _docs(self, term: str) -> np.ndarray:
+        postings = self._postings.get(term)
+        return postings[0] if postings is not None else np.empty(0, dtype=np.int32)
+
+    def _occurrences(self, term: str, docs: np.ndarray) -> np.ndarray:
+        """(doc << 32) + position of every occurrence of a term in the given docs (all containing it)"""
+        term_docs, tfs, positions = self._postings[term]
+        entries = np.searchsorted(term_docs, docs)
+        counts = tfs[entries].astype(np.int64)
+        firsts = np.cumsum(tfs, dtype=np.int64)[entries] - counts
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return (np.repeat(docs.astype(np.int64), counts) << 32) + positions[np.repeat(firsts, counts) + within]
+
+    def _phrase_docs(self, tokens: List[str]) -> np.ndarray:
+        docs = self._docs(tokens[0])
+        for token in tokens[1:]:
+            docs = np.intersect1d(docs, self._docs(token), assume_unique=True)
+        if len(tokens) == 1 or not len(docs):
+            return docs
+        # A phrase starts wherever token i occurs i positions after token 0
+        starts = self._occurrences(tokens[0], docs)
+        for offset, token in enumerate(tokens[1:], start=1):
+            starts = np.intersect1d(starts, self._occurrences(token, docs) - offset)
+            if not len(starts):
+                break
+        return np.unique(starts >> 32).astype(np.int32)
+
+    def _match(self, clauses) -> np.ndarray:
+        matched = np.empty(0, dtype=np.int32)
+        for required, excluded in clauses:
+            # Intersect the rarest items first
+            items = sorted(required, key=lambda tokens: min(len(self._docs(t)) for t in tokens))
+            docs = self._phrase_docs(items[0])
+            for tokens in items[1:]:
+                if not len(docs):
+                    break
+                docs = np.intersect1d(docs, self._phrase_docs(tokens), assume_unique=True)
+            for tokens in excluded:
+                docs = np.setdiff1d(docs, self._phrase_docs(tokens), assume_unique=True)
+            matched = np.union1d(matched, docs)
+        return matched
+
+    def _filter(self, docs: np.ndarray, place_ids: Optional[Sequence[str]], sentiment: Optional[str],
+                start: Optional[str], end: Optional[str], min_rating: Optional[float],
+                max_rating: Optional[float]) -> np.ndarray:
+        mask = np.ones(len(docs), dtype=bool)
+        if place_ids:
+            codes = [self._place_table[p] for p in place_ids if p in self._place_table]
+            mask &= np.isin(self._place_codes[docs], codes)
+        if sentiment:
+            if sentiment not in SENTIMENT_CODES:
+                raise ValueError(f"Unknown sentiment '{sentiment}'. Use one of {tuple(SENTIMENT_CODES)}")
+            mask &= self.sentiments[docs] == SENTIMENT_CODES[sentiment]
+        start_time, end_time = date_to_epoch(start), date_to_epoch(end, end_of_day=True)
+        if start_time is not None:
+            mask &= self.times[docs] >= start_time
+        if end_time is not None:
+            mask &= self.times[docs] <= end_time
+        if min_rating is not None:
+            mask &= self.ratings[docs] >= min_rating
+        if max_rating is not None:
+            mask &= self.ratings[docs] <= max_rating
+        return docs[mask]
+
+    def _rank(self, docs: np.ndarray, terms: List[str]) -> np.ndarray:
+        """BM25 scores of the given docs for the query terms"""
+        scores = np.zeros(len(docs))
+        if not len(docs):
+            return scores
+        total = len(self.texts)
+        lengths = self.lengths[docs]
+        norm = _K1 * (1 - _B + _B * lengths / max(self.lengths.mean(), 1))
+        for term in set(terms):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            term_docs, tfs, _ = postings
+            idf = np.log(1 + (total - len(term_docs) + 0.5) / (len(term_docs) + 0.5))
+            positions = np.searchsorted(term_docs, docs)
+            positions[positions >= len(term_docs)] = 0
+            tf = np.where(term_docs[positions] == docs, tfs[positions], 0)
+            scores += idf * tf * (_K1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str, place_ids: Optional[Sequence[str]] = None, sentiment: Optional[str] = None,
+               start: Optional[str] = None, end: Optional[str] = None, min_rating: Optional[float] = None,
+               max_rating: Optional[float] = None, page: int = 1, per_page: int = 20) -> Dict:
+        """
+        Run a query and return one page of ranked results
+
+        Args:
+            query: Query string (terms, "phrases", OR, -exclusions)
+            place_ids: Only return reviews of these stations
+            sentiment: 'positive', 'neutral' or 'negative'
+            start: Earliest review date (YYYY-MM-DD, inclusive)
+            end: Latest review date (YYYY-MM-DD, inclusive)
+            min_rating: Minimum star rating
+            max_rating: Maximum star rating
+            page: 1-based page number
+            per_page: Results per page
+
+        Returns:
+            Dictionary with total, page, per_page and results
+        """
+        self._compile()
+        clauses = parse_query(query)
+        docs = self._match(clauses) if clauses else np.empty(0, dtype=np.int32)
+        docs = self._filter(docs, place_ids, sentiment, start, end, min_rating, max_rating)
+
+        terms = [token for required, _ in clauses for tokens in required for token in tokens]
+        scores = self._rank(docs, terms)
+        # Best score first, newest review breaks ties
+        order = np.lexsort((-self.times[docs], -scores))
+
+        page = max(int(page), 1)
+        per_page = max(int(per_page), 1)
+        selected = order[(page - 1) * per_page:page * per_page]
+
+        results = []
+        for position in selected:
+            doc = int(docs[position])
+            rating = float(self.ratings[doc])
+            results.append({
+                'place_id': self.place_ids[doc],
+                'place_name': self.place_names[doc],
+                'author_name': self.authors[doc],
+                'rating': rating if rating == rating else None,
+                'time': int(self.times[doc]),
+                'review_date': datetime.fromtimestamp(self.times[doc]).strftime('%Y-%m-%d %H:%M:%S')
+                if self.times[doc] else None,
+                'sentiment': _SENTIMENT_NAMES.get(int(self.sentiments[doc])),
+                'score': round(float(scores[position]), 4),
+                'text': self.texts[doc]
+            })
+
+        return {'total': int(len(docs)), 'page': page, 'per_page': per_page, 'results': results}
+
+    def save(self, path: str = SEARCH_INDEX_FILE) -> str:
+        """
+        Persist the index as a single .npz file
+
+        Args:
+            path: Output file path
+
+        Returns:
+            Path to the written file
+        """
+        self._compile()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        terms = sorted(self._postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(self._postings[term][0]) for term in terms])
+        position_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        position_offsets[1:] = np.cumsum([len(self._postings[term][2]) for term in terms])
+        empty = np.empty(0, dtype=np.int32)
+        with open(path, 'wb') as f:
+            np.savez_compressed(
+                f,
+                terms=np.array(terms, dtype=object),
+                offsets=offsets,
+                docs=np.concatenate([self._postings[term][0] for term in terms]) if terms else empty,
+                tfs=np.concatenate([self._postings[term][1] for term in terms]) if terms else empty,
+                position_offsets=position_offsets,
+                positions=np.concatenate([self._postings[term][2] for term in terms]) if terms else empty,
+                ratings=self.ratings,
+                times=self.times,
+                sentiments=self.sentiments,
+                lengths=self.lengths,
+                strings=np.array([json.dumps([self.place_ids, self.place_names, self.authors, self.texts],
+                                             ensure_ascii=False)], dtype=object)
+            )
+        logger.info(f"Search index saved: {path} ({len(self)} reviews, {len(terms)} terms)")
+        return path
+
+    @classmethod
+    def load(cls, path: str = SEARCH_INDEX_FILE) -> 'ReviewSearchIndex':
+        """
+        Load an index written by save(); returns an empty index if the file is missing
+
+        Args:
+            path: Input file path
+
+        Returns:
+            ReviewSearchIndex instance
+        """
+        index = cls()
+        if not Path(path).exists():
+            index._compiled = False
+            index._compile()
+            return index
+
+        with np.load(path, allow_pickle=True) as data:
+            terms = data['terms'].tolist()
+            offsets = data['offsets']
+            docs = data['docs']
+            tfs = data['tfs']
+            index.place_ids, index.place_names, index.authors, index.texts = json.loads(data['strings'][0])
+            if 'positions' in data.files:
+                position_offsets = data['position_offsets']
+                positions = data['positions']
+                index._postings = {
+                    term: (docs[offsets[i]:offsets[i + 1]], tfs[offsets[i]:offsets[i + 1]],
+                           positions[position_offsets[i]:position_offsets[i + 1]])
+                    for i, term in enumerate(terms)
+                }
+            else:
+                # Older files have no positions: re-tokenize the texts once
+                index._postings = {}
+                index._pending = {}
+                for doc, text in enumerate(index.texts):
+                    for token, token_positions in _term_positions(tokenize(text)).items():
+                        index._pending.setdefault(token, []).append((doc, token_positions))
+            index._ratings = data['ratings'].tolist()
+            index._times = data['times'].tolist()
+            index._sentiments = data['sentiments'].tolist()
+            index._lengths = data['lengths'].tolist()
+
+        index._compiled = False
+        index._compile()
+        return index
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Full-text search over review text")
+    parser.add_argument('--index', default=SEARCH_INDEX_FILE)
+    parser.add_argument('--ledger', default=REVIEW_LEDGER_FILE)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="Index a reviews CSV (scored with the lexicon scorer)")
+    build_parser.add_argument('reviews_file')
+    build_parser.add_argument('--chunksize', type=int, default=50000)
+
+    query_parser = subparsers.add_parser('query', help="Run a query against the index")
+    query_parser.add_argument('query')
+    query_parser.add_argument('--place-id', action='append')
+    query_parser.add_argument('--sentiment', choices=tuple(SENTIMENT_CODES))
+    query_parser.add_argument('--start')
+    query_parser.add_argument('--end')
+    query_parser.add_argument('--page', type=int, default=1)
+    query_parser.add_argument('--per-page', type=int, default=10)
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        scorer = LexiconScorer()
+        index = ReviewSearchIndex.load(args.index)
+        ledger = ReviewLedger.load(args.ledger)
+        if not Path(args.index).exists():
+            ledger.reset(LEDGER_STORE)
+        for chunk in pd.read_csv(args.reviews_file, chunksize=args.chunksize):
+            chunk = chunk[chunk['text'].notna()].copy()
+            polarities, _ = scorer.score(chunk['text'].astype(str).tolist())
+            chunk['sentiment'] = sentiment_labels(polarities)
+            index.add_frame(chunk, ledger)
+        index.save(args.index)
+        ledger.save(args.ledger)
+        print(f"🔎 Indexed {len(index):,} reviews into {args.index}")
+    else:
+        index = ReviewSearchIndex.load(args.index)
+        result = index.search(args.query, place_ids=args.place_id, sentiment=args.sentiment,
+                              start=args.start, end=args.end, page=args.page, per_page=args.per_page)
+        print(f"🔎 {result['total']} reviews match '{args.query}'")
+        for hit in result['results']:
+            print(f"   • [{hit['score']:.2f}] {hit['place_name']} ({hit['review_date']}, "
+                  f"{hit['rating']}⭐): {hit['text'][:120]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Reviewer index: cross-station activity per review author
+
+Maps every normalized author name to their reviews across stations and keeps
+running counts and rating statistics per author, updated as reviews are
+ingested, so "who reviews dozens of stations" and "who only ever gives 1 or
+5 stars" are answered from the index instead of a scan and groupby.
+
+The Places API exposes no stable author ID here, only the display name, so
+authors are keyed by the accent-folded, lowercased name. Common names
+("Carlos Henrique") merge different people; the prolific/extreme thresholds
+used for down-weighting are meant to be well above what a name collision
+produces.
+
+Which reviews are already in the index is tracked by the shared
+ReviewLedger (see review_ledger), keyed on the normalized author name so
+spelling variants of one review count once.
+
+Usage:
+    python reviewer_index.py data/raizen_places_reviews_..._reviews.csv --top 20
+"""
+
+import argparse
+import heapq
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from review_ledger import REVIEW_LEDGER_FILE, ReviewLedger
+from text_utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+REVIEWER_INDEX_FILE = "data/reviewer_index.json"
+LEDGER_STORE = 'reviewers'
+
+# 1- and 5-star ratings
+EXTREME_RATINGS = (1, 5)
+
+
+def normalize_author(name) -> str:
+    """Accent-folded, lowercased author name with punctuation and extra spaces removed"""
+    return ' '.join(tokenize(name)) if isinstance(name, str) else ''
+
+
+class ReviewerIndex:
+    """Incrementally maintained author -> reviews index with per-author statistics"""
+
+    def __init__(self):
+        # author key -> {'name', 'reviews': [[place_id, time, rating]], 'stations': {place_id: n},
+        #                'rated', 'rating_sum', 'rating_sq_sum', 'extreme'}
+        self.authors: Dict[str, Dict] = {}
+
+    def __len__(self) -> int:
+        return len(self.authors)
+
+    def add_review(self, place_id: str, time: int, author_name: str, rating: Optional[float] = None) -> bool:
+        """
+        Index one review (no duplicate check; see add_frame)
+
+        Args:
+            place_id: Station the review belongs to
+            time: Review timestamp
+            author_name: Author display name
+            rating: Star rating (optional)
+
+        Returns:
+            True if the review was added (it has an author name)
+        """
+        key = normalize_author(author_name)
+        if not key:
+            return False
+
+        entry = self.authors.get(key)
+        if entry is None:
+            entry = self.authors[key] = {'name': author_name, 'reviews': [], 'stations': {}, 'rated': 0,
+                                         'rating_sum': 0.0, 'rating_sq_sum': 0.0, 'extreme': 0}
+        rating = float(rating) if rating is not None and rating == rating else None
+        entry['reviews'].append([place_id, int(time or 0), rating])
+        entry['stations'][place_id] = entry['stations'].get(place_id, 0) + 1
+        if rating is not None:
+            entry['rated'] += 1
+            entry['rating_sum'] += rating
+            entry['rating_sq_sum'] += rating * rating
+            entry['extreme'] += rating in EXTREME_RATINGS
+        return True
+
+    def add_frame(self, reviews_df: pd.DataFrame, ledger: Optional[ReviewLedger] = None) -> int:
+        """
+        Index every new review of a frame
+
+        Args:
+            reviews_df: Reviews with place_id, time, author_name and rating
+            ledger: Shared review ledger; reviews it lists for the reviewer
+                index are skipped (without one, every row is added)
+
+        Returns:
+            Number of reviews added
+        """
+        reviews = reviews_df[['place_id', 'time', 'author_name', 'rating']]
+        if ledger is not None:
+            # Keyed on the normalized name, so spelling variants of one review match
+            keyed = reviews.assign(author_name=reviews['author_name'].map(normalize_author))
+            keyed, _ = ledger.select(keyed[keyed['author_name'] != ''], LEDGER_STORE)
+            ledger.record(keyed, LEDGER_STORE)
+            reviews = reviews.loc[keyed.index]
+
+        added = 0
+        for place_id, time, author, rating in zip(reviews['place_id'], reviews['time'],
+                                                  reviews['author_name'], reviews['rating']):
+            added += self.add_review(place_id, time if time == time else 0, author, rating)
+        return added
+
+    @staticmethod
+    def _summary(key: str, entry: Dict) -> Dict:
+        rated = entry['rated']
+        mean = entry['rating_sum'] / rated if rated else None
+        variance = max(entry['rating_sq_sum'] / rated - mean * mean, 0.0) if rated else None
+        return {
+            'author': entry['name'],
+            'key': key,
+            'reviews': len(entry['reviews']),
+            'stations': len(entry['stations']),
+            'avg_rating': round(mean, 3) if mean is not None else None,
+            'rating_std': round(variance ** 0.5, 3) if variance is not None else None,
+            'extreme_share': round(entry['extreme'] / rated, 3) if rated else None,
+        }
+
+    def author(self, name: str) -> Dict:
+        """
+        One author's statistics and reviews
+
+        Raises:
+            KeyError: If the author has no indexed reviews
+        """
+        key = normalize_author(name)
+        entry = self.authors.get(key)
+        if entry is None:
+            raise KeyError(f"No reviews by '{name}'")
+        reviews = [{'place_id': place_id, 'time': time, 'rating': rating}
+                   for place_id, time, rating in sorted(entry['reviews'], key=lambda review: review[1], reverse=True)]
+        return {**self._summary(key, entry), 'review_list': reviews}
+
+    def prolific(self, limit: int = 20, min_stations: int = 2) -> List[Dict]:
+        """
+        Authors who reviewed the most distinct stations
+
+        Args:
+            limit: Number of authors to return
+            min_stations: Minimum distinct stations
+
+        Returns:
+            Author summaries, most stations (then most reviews) first
+        """
+        candidates = ((len(entry['stations']), len(entry['reviews']), key)
+                      for key, entry in self.authors.items() if len(entry['stations']) >= min_stations)
+        return [self._summary(key, self.authors[key]) for _, _, key in heapq.nlargest(limit, candidates)]
+
+    def extreme(self, limit: int = 20, min_reviews: int = 3) -> List[Dict]:
+        """
+        Authors whose ratings are most concentrated on 1 and 5 stars
+
+        Args:
+            limit: Number of authors to return
+            min_reviews: Minimum rated reviews (one 5-star review is not a pattern)
+
+        Returns:
+            Author summaries, highest extreme share (then most reviews) first
+        """
+        candidates = ((entry['extreme'] / entry['rated'], entry['rated'], key)
+                      for key, entry in self.authors.items() if entry['rated'] >= min_reviews)
+        return [self._summary(key, self.authors[key]) for _, _, key in heapq.nlargest(limit, candidates)]
+
+    def weights(self, author_names: Iterable, prolific_stations: int = 10, extreme_min_reviews: int = 5,
+                extreme_share: float = 0.9, factor: float = 0.25) -> np.ndarray:
+        """
+        Aggregation weight per review author
+
+        Reviews by prolific authors (at least ``prolific_stations`` distinct
+        stations) or extreme ones (at least ``extreme_min_reviews`` rated
+        reviews, ``extreme_share`` or more of them 1 or 5 stars) get
+        ``factor``; everyone else gets 1.
+
+        Args:
+            author_names: Author display names, one per review
+
+        Returns:
+            Float array of weights
+        """
+        cache: Dict[str, float] = {}
+        result = []
+        for name in author_names:
+            key = normalize_author(name)
+            weight = cache.get(key)
+            if weight is None:
+                entry = self.authors.get(key)
+                flagged = entry is not None and (
+                    len(entry['stations']) >= prolific_stations
+                    or (entry['rated'] >= extreme_min_reviews and entry['extreme'] >= extreme_share * entry['rated'])
+                )
+                weight = cache[key] = factor if flagged else 1.0
+            result.append(weight)
+        return np.array(result, dtype=float)
+
+    def save(self, path: str = REVIEWER_INDEX_FILE) -> str:
+        """
+        Persist the index as JSON (statistics are rebuilt on load)
+
+        Args:
+            path: Output file path
+
+        Returns:
+            Path to the written file
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        data = {'authors': {key: {'name': entry['name'], 'reviews': entry['reviews']}
+                            for key, entry in self.authors.items()}}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        logger.info(f"Reviewer index saved: {path} ({len(self)} authors)")
+        return path
+
+    @classmethod
+    def load(cls, path: str = REVIEWER_INDEX_FILE) -> 'ReviewerIndex':
+        """
+        Load an index written by save(); returns an empty index if the file is missing
+
+        Args:
+            path: Input file path
+
+        Returns:
+            ReviewerIndex instance
+        """
+        index = cls()
+        if not Path(path).exists():
+            return index
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for entry in data.get('authors', {}).values():
+            for place_id, time, rating in entry['reviews']:
+                index.add_review(place_id, time, entry['name'], rating)
+        return index
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Cross-station reviewer activity")
+    parser.add_argument('reviews_file')
+    parser.add_argument('--index', default=REVIEWER_INDEX_FILE)
+    parser.add_argument('--ledger', default=REVIEW_LEDGER_FILE)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    index = ReviewerIndex.load(args.index)
+    ledger = ReviewLedger.load(args.ledger)
+    if not Path(args.index).exists():
+        ledger.reset(LEDGER_STORE)
+    added = index.add_frame(pd.read_csv(args.reviews_file), ledger)
+    index.save(args.index)
+    ledger.save(args.ledger)
+    print(f"👥 {len(index):,} reviewers ({added:,} reviews added)")
+
+    print("🏃 Most prolific:")
+    for author in index.prolific(args.top):
+        print(f"   • {author['author']}: {author['stations']} stations, {author['reviews']} reviews, "
+              f"avg {author['avg_rating']}")
+    print("🎯 Most extreme:")
+    for author in index.extreme(args.top):
+        print(f"   • {author['author']}: {author['extreme_share']:.0%} 1/5-star over {author['reviews']} reviews")
+
+
+if __name__ == "__main__":
+    main()
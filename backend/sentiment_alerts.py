@@ -0,0 +1,426 @@
+"""
+Online sliding-window sentiment alerting
+
+Consumes reviews one at a time as they are ingested (the web app's fetch
+endpoints feed every fetched place in, and append its reviews to a JSON-lines
+journal; a journal or a reviews CSV can be replayed) and keeps, per station,
+a fixed-size window of recent reviews with running sums (count, negative
+ratio, mean rating), an EWMA of polarity and a slow-moving baseline of the
+station's rating and negative ratio. Every update is O(1). An alert is
+raised when a station's recent window deviates from its baseline; state is
+saved as a compact JSON snapshot so it survives restarts.
+
+The Places API returns at most 5 reviews per place per fetch, so a station's
+rating baseline is seeded from its overall Google rating when that is known
+instead of waiting for enough reviews to build one.
+
+Usage:
+    python sentiment_alerts.py data/raizen_places_reviews_20250609_150209_reviews.csv
+    python sentiment_alerts.py data/review_journal.jsonl --state data/alert_state.json
+    python sentiment_alerts.py reviews.csv --places places.csv
+"""
+
+import argparse
+import json
+import logging
+import math
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sentiment_scorers import get_scorer
+
+logger = logging.getLogger(__name__)
+
+ALERT_STATE_FILE = "data/alert_state.json"
+REVIEW_JOURNAL_FILE = "data/review_journal.jsonl"
+
+# Variance assumed for a baseline seeded from the place rating (star ratings
+# of a station typically spread about one star around their mean)
+PRIOR_RATING_VAR = 1.5
+
+JOURNAL_COLUMNS = ['place_id', 'place_name', 'rating', 'text', 'time', 'place_rating']
+
+
+class StationWindow:
+    """Rolling statistics for one station"""
+
+    __slots__ = (
+        'window', 'negatives', 'rating_sum', 'ewma_polarity', 'baseline_rating',
+        'baseline_rating_var', 'baseline_negative', 'reviews_seen', 'last_alert_at',
+        'last_review_time', 'seeded'
+    )
+
+    def __init__(self, window_size: int):
+        self.window = deque(maxlen=window_size)  # (rating, is_negative)
+        self.negatives = 0
+        self.rating_sum = 0.0
+        self.ewma_polarity = None
+        self.baseline_rating = None
+        self.baseline_rating_var = 0.0
+        self.baseline_negative = None
+        self.reviews_seen = 0
+        self.last_alert_at = None
+        self.last_review_time = 0
+        self.seeded = False
+
+    def push(self, rating: float, is_negative: bool):
+        if len(self.window) == self.window.maxlen:
+            old_rating, old_negative = self.window[0]
+            self.rating_sum -= old_rating
+            self.negatives -= old_negative
+        self.window.append((rating, is_negative))
+        self.rating_sum += rating
+        self.negatives += is_negative
+
+    @property
+    def count(self) -> int:
+        return len(self.window)
+
+    @property
+    def mean_rating(self) -> float:
+        return self.rating_sum / len(self.window) if self.window else 0.0
+
+    @property
+    def negative_ratio(self) -> float:
+        return self.negatives / len(self.window) if self.window else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'window': [[rating, int(negative)] for rating, negative in self.window],
+            'ewma_polarity': self.ewma_polarity,
+            'baseline_rating': self.baseline_rating,
+            'baseline_rating_var': self.baseline_rating_var,
+            'baseline_negative': self.baseline_negative,
+            'reviews_seen': self.reviews_seen,
+            'last_alert_at': self.last_alert_at,
+            'last_review_time': self.last_review_time,
+            'seeded': self.seeded
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, window_size: int) -> 'StationWindow':
+        station = cls(window_size)
+        for rating, negative in data['window'][-window_size:]:
+            station.push(rating, bool(negative))
+        station.ewma_polarity = data['ewma_polarity']
+        station.baseline_rating = data['baseline_rating']
+        station.baseline_rating_var = data['baseline_rating_var']
+        station.baseline_negative = data['baseline_negative']
+        station.reviews_seen = data['reviews_seen']
+        station.last_alert_at = data['last_alert_at']
+        station.last_review_time = data.get('last_review_time', 0)
+        station.seeded = data.get('seeded', False)
+        return station
+
+
+class SentimentAlertEngine:
+    """
+    Per-station rolling windows with baseline-deviation alerts
+
+    The baseline is an exponentially weighted mean (and variance) of the
+    station's ratings and negative flags with a slow ``baseline_alpha``, so it
+    reflects the station's long-run behaviour. The rating baseline starts from
+    the station's overall rating when one is passed (``place_rating``) and is
+    trusted right away; otherwise, like the negative-ratio baseline, it is
+    trusted after ``warmup`` reviews. A station is flagged when its recent
+    window holds at least ``min_reviews`` reviews and either the window's
+    mean rating sits more than ``rating_z`` standard errors below the
+    baseline, or its negative ratio exceeds the baseline by more than
+    ``negative_ratio_delta``. Alerts for a station are suppressed for
+    ``cooldown`` reviews after one fires. Thread-safe.
+    """
+
+    def __init__(self, window_size: int = 5, min_reviews: int = 3, polarity_alpha: float = 0.3,
+                 baseline_alpha: float = 0.05, warmup: int = 10, rating_z: float = 2.5,
+                 negative_ratio_delta: float = 0.3, cooldown: int = 5, scorer='lexicon'):
+        """
+        Args:
+            window_size: Number of recent reviews per station window
+            min_reviews: Reviews needed in the window before alerting
+            polarity_alpha: Smoothing factor of the polarity EWMA
+            baseline_alpha: Smoothing factor of the long-run baseline
+            warmup: Reviews a station needs before a baseline built from its
+                reviews is trusted
+            rating_z: Standard errors below baseline that trigger a rating alert
+            negative_ratio_delta: Excess negative ratio that triggers an alert
+            cooldown: Reviews to wait before alerting the same station again
+            scorer: Sentiment scorer (name or instance) for reviews without polarity
+        """
+        self.window_size = window_size
+        self.min_reviews = min_reviews
+        self.polarity_alpha = polarity_alpha
+        self.baseline_alpha = baseline_alpha
+        self.warmup = warmup
+        self.rating_z = rating_z
+        self.negative_ratio_delta = negative_ratio_delta
+        self.cooldown = cooldown
+        self.scorer = get_scorer(scorer)
+
+        self.stations: Dict[str, StationWindow] = {}
+        self.alerts: deque = deque(maxlen=1000)
+        self.handlers: List[Callable[[Dict], None]] = []
+        self._lock = threading.RLock()
+
+    def on_alert(self, handler: Callable[[Dict], None]):
+        """Register a callback that receives every alert dictionary"""
+        self.handlers.append(handler)
+
+    def consume(self, place_id: str, rating: float, text: str = '', polarity: Optional[float] = None,
+                name: str = '', timestamp: Optional[int] = None,
+                place_rating: Optional[float] = None) -> Optional[Dict]:
+        """
+        Fold one review into its station window
+
+        Args:
+            place_id: Station the review belongs to
+            rating: Star rating
+            text: Review text (scored when polarity is not given)
+            polarity: Precomputed sentiment polarity
+            name: Station name, included in alerts
+            timestamp: Review time (unix seconds); reviews not newer than the
+                station's last seen review are skipped, so replaying an
+                overlapping export does not count reviews twice
+            place_rating: The station's overall rating, seeding the rating
+                baseline of a station seen for the first time
+
+        Returns:
+            Alert dictionary if this review triggered one, else None
+        """
+        with self._lock:
+            return self._consume(place_id, rating, text, polarity, name, timestamp, place_rating)
+
+    def _consume(self, place_id, rating, text, polarity, name, timestamp, place_rating) -> Optional[Dict]:
+        station = self.stations.get(place_id)
+        if timestamp and station is not None and timestamp <= station.last_review_time:
+            return None
+
+        if polarity is None:
+            polarity = float(self.scorer.score([text or ''])[0][0]) if text else 0.0
+        rating = float(rating or 0)
+        is_negative = polarity < -0.1 or (0 < rating <= 2)
+
+        if station is None:
+            station = self.stations[place_id] = StationWindow(self.window_size)
+            if place_rating is not None and place_rating == place_rating and place_rating > 0:
+                station.baseline_rating = float(place_rating)
+                station.baseline_rating_var = PRIOR_RATING_VAR
+                station.seeded = True
+        if timestamp:
+            station.last_review_time = int(timestamp)
+
+        # Check the window against the baseline built from *previous* reviews
+        station.push(rating, is_negative)
+        station.reviews_seen += 1
+        alert = self._check(place_id, station, name, timestamp)
+
+        # Then fold the review into the EWMA and the baseline
+        alpha = self.polarity_alpha
+        station.ewma_polarity = polarity if station.ewma_polarity is None \
+            else alpha * polarity + (1 - alpha) * station.ewma_polarity
+
+        alpha = self.baseline_alpha
+        if station.baseline_rating is None:
+            station.baseline_rating = rating
+        else:
+            deviation = rating - station.baseline_rating
+            station.baseline_rating += alpha * deviation
+            station.baseline_rating_var = (1 - alpha) * (station.baseline_rating_var + alpha * deviation ** 2)
+        if station.baseline_negative is None:
+            station.baseline_negative = float(is_negative)
+        else:
+            station.baseline_negative += alpha * (float(is_negative) - station.baseline_negative)
+
+        return alert
+
+    def _check(self, place_id: str, station: StationWindow, name: str, timestamp: Optional[int]) -> Optional[Dict]:
+        warmed_up = station.reviews_seen > self.warmup
+        if not (warmed_up or station.seeded) or station.count < self.min_reviews:
+            return None
+        if station.last_alert_at is not None and station.reviews_seen - station.last_alert_at < self.cooldown:
+            return None
+
+        reasons = []
+        std_error = math.sqrt(max(station.baseline_rating_var, 0.25) / station.count)
+        rating_z = (station.baseline_rating - station.mean_rating) / std_error
+        if rating_z > self.rating_z:
+            reasons.append(f"mean rating {station.mean_rating:.2f} vs baseline {station.baseline_rating:.2f}")
+        if warmed_up and station.negative_ratio - station.baseline_negative > self.negative_ratio_delta:
+            reasons.append(f"negative ratio {station.negative_ratio:.0%} vs baseline {station.baseline_negative:.0%}")
+        if not reasons:
+            return None
+
+        station.last_alert_at = station.reviews_seen
+        alert = {
+            'place_id': place_id,
+            'name': name,
+            'raised_at': datetime.now().isoformat(timespec='seconds'),
+            'review_time': timestamp,
+            'window_reviews': station.count,
+            'mean_rating': round(station.mean_rating, 2),
+            'negative_ratio': round(station.negative_ratio, 3),
+            'ewma_polarity': round(station.ewma_polarity or 0.0, 3),
+            'baseline_rating': round(station.baseline_rating, 2),
+            'baseline_negative_ratio': round(station.baseline_negative, 3),
+            'reasons': reasons
+        }
+        self.alerts.append(alert)
+        logger.warning(f"🚨 Alert for {name or place_id}: {'; '.join(reasons)}")
+        for handler in self.handlers:
+            handler(alert)
+        return alert
+
+    def consume_places(self, places: Iterable) -> List[Dict]:
+        """
+        Consume the reviews of PlaceInfo objects (e.g. from iter_places)
+
+        Reviews are fed oldest first so windows follow review time.
+
+        Returns:
+            Alerts raised while consuming
+        """
+        alerts = []
+        for place in places:
+            if place is None:
+                continue
+            for review in sorted(place.reviews, key=lambda review: review.time or 0):
+                alert = self.consume(place.place_id, review.rating, review.text,
+                                     name=place.name, timestamp=review.time, place_rating=place.rating)
+                if alert:
+                    alerts.append(alert)
+        return alerts
+
+    def consume_records(self, records: Iterable[Dict]) -> List[Dict]:
+        """
+        Consume review dictionaries shaped like rows of *_reviews.csv (or
+        journal lines, which also carry the station's place_rating)
+
+        Returns:
+            Alerts raised while consuming
+        """
+        alerts = []
+        for record in records:
+            polarity = record.get('polarity')
+            if polarity is not None and polarity != polarity:
+                polarity = None
+            text = record.get('text')
+            alert = self.consume(
+                record['place_id'], record.get('rating', 0),
+                text if isinstance(text, str) else '',
+                polarity=polarity, name=record.get('place_name', ''), timestamp=record.get('time'),
+                place_rating=record.get('place_rating')
+            )
+            if alert:
+                alerts.append(alert)
+        return alerts
+
+    def save(self, path: str = ALERT_STATE_FILE) -> str:
+        """Write the engine state as a compact JSON snapshot"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            state = {
+                'window_size': self.window_size,
+                'stations': {place_id: station.to_dict() for place_id, station in self.stations.items()},
+                'alerts': list(self.alerts)
+            }
+        tmp_path = Path(path).with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+        tmp_path.replace(path)
+        return path
+
+    def load(self, path: str = ALERT_STATE_FILE) -> bool:
+        """
+        Restore state written by save()
+
+        Returns:
+            True if a snapshot was loaded, False if none exists
+        """
+        if not Path(path).exists():
+            return False
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        self.stations = {
+            place_id: StationWindow.from_dict(data, self.window_size)
+            for place_id, data in state['stations'].items()
+        }
+        self.alerts.extend(state.get('alerts', []))
+        return True
+
+
+def journal_places(places: Iterable, path: str = REVIEW_JOURNAL_FILE) -> int:
+    """
+    Append the reviews of PlaceInfo objects to the JSON-lines review journal
+
+    Each line holds the JOURNAL_COLUMNS of one review, so the journal can be
+    replayed through consume_records.
+
+    Returns:
+        Number of reviews written
+    """
+    lines = []
+    for place in places:
+        if place is None:
+            continue
+        for review in place.reviews:
+            lines.append(json.dumps({
+                'place_id': place.place_id, 'place_name': place.name, 'rating': review.rating,
+                'text': review.text, 'time': review.time, 'place_rating': place.rating
+            }, ensure_ascii=False))
+    if lines:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # One write per batch keeps concurrent jobs from interleaving lines
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+    return len(lines)
+
+
+def _iter_source(path: str, places_path: Optional[str] = None) -> Iterable[Dict]:
+    if path.endswith('.jsonl'):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+
+    import pandas as pd
+    # Sorted as a whole: a station whose reviews straddle a chunk boundary
+    # would otherwise see its older reviews skipped as already seen
+    reviews = pd.read_csv(path, usecols=lambda column: column in JOURNAL_COLUMNS + ['polarity'])
+    if places_path and Path(places_path).exists():
+        places = pd.read_csv(places_path, usecols=['place_id', 'rating'])
+        place_ratings = places.drop_duplicates('place_id').set_index('place_id')['rating']
+        reviews['place_rating'] = reviews['place_id'].map(place_ratings)
+    yield from reviews.sort_values('time', kind='stable').to_dict('records')
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Replay reviews through the sentiment alert engine")
+    parser.add_argument('source', help="Reviews CSV or JSON-lines journal")
+    parser.add_argument('--state', default=ALERT_STATE_FILE, help="Engine state snapshot")
+    parser.add_argument('--places', help="Places CSV seeding the station baselines "
+                                         "(default: the *_places.csv next to a *_reviews.csv source)")
+    args = parser.parse_args()
+
+    places_path = args.places
+    if places_path is None and args.source.endswith('_reviews.csv'):
+        places_path = args.source[:-len('_reviews.csv')] + '_places.csv'
+
+    engine = SentimentAlertEngine()
+    if engine.load(args.state):
+        print(f"♻️  Restored state for {len(engine.stations)} stations")
+
+    alerts = engine.consume_records(_iter_source(args.source, places_path))
+    engine.save(args.state)
+
+    print(f"🚨 {len(alerts)} alerts raised across {len(engine.stations)} stations")
+    for alert in alerts[-10:]:
+        print(f"   • {alert['name'] or alert['place_id']}: {'; '.join(alert['reasons'])}")
+
+
+if __name__ == "__main__":
+    main()
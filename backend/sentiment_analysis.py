@@ -1,95 +1,353 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use('Agg')  # non-interactive: figures are only saved, never shown
+from matplotlib.figure import Figure
 import seaborn as sns
-from textblob import TextBlob
 from wordcloud import WordCloud
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import functools
+import os
 import re
 from collections import Counter
 import warnings
+from sentiment_scorers import STOP_WORDS, get_scorer, sentiment_labels
+from sentiment_rollups import ROLLUPS_FILE, SentimentRollupStore
+from review_ledger import REVIEW_LEDGER_FILE, ReviewLedger
+from station_reports import generate_station_reports
+from review_search import SEARCH_INDEX_FILE, ReviewSearchIndex
+from chunked_analysis import PLACE_COLUMNS, PLACE_DTYPES, ReviewAggregates, iter_review_chunks
+from stage_profiler import StageProfiler, profiled_stage
+from pipeline_runner import StageGraph
+from near_duplicates import NEAR_DUPLICATES_FILE, NearDuplicateDetector
+from station_similarity import StationSimilarityIndex
+from station_index import STATION_INDEX_FILE, write_station_index
+from reviewer_index import REVIEWER_INDEX_FILE, ReviewerIndex
+from region_rollups import ADDRESS_CACHE_FILE, REGION_ROLLUPS_FILE, AddressCache, RegionRollups
+from company_rollups import COMPANY_ROLLUPS_FILE, PLACE_COMPANIES_FILE, CompanyRollupStore
+from google_places_extractor import load_place_companies
 warnings.filterwarnings('ignore')
 
+# Incremental stores that grow with the number of reviews; each is only
+# maintained when asked for (the time-series rollups always are)
+OPTIONAL_INDEXES = ('search', 'reviewers', 'companies')
+
+# Default paths of the persistent stores, by name (see index_files)
+INDEX_FILES = {
+    'rollups': ROLLUPS_FILE,
+    'ledger': REVIEW_LEDGER_FILE,
+    'search': SEARCH_INDEX_FILE,
+    'reviewers': REVIEWER_INDEX_FILE,
+    'companies': COMPANY_ROLLUPS_FILE,
+    'place_companies': PLACE_COMPANIES_FILE,
+    'near_duplicates': NEAR_DUPLICATES_FILE,
+}
+
+def render_key_topics(word_freq, sentiment_type, top_words=20, text=None):
+    """
+    Render the word cloud of a sentiment and print its top words
+    
+    A module-level function so the pipeline can run it in a worker process.
+    
+    Args:
+        word_freq: Counter of topic words
+        sentiment_type: 'positive', 'negative', or 'neutral'
+        top_words: Number of top words to print and return
+        text: Filtered review text to lay the cloud out from (as WordCloud
+            does for raw text); without it the cloud uses word_freq
+    
+    Returns:
+        List of (word, count) tuples, or None if there are no words
+    """
+    if not word_freq:
+        print(f"No {sentiment_type} reviews found!")
+        return None
+    
+    top_words_list = word_freq.most_common(top_words)
+    
+    wordcloud = WordCloud(
+        width=800, height=400, 
+        background_color='white',
+        colormap='RdYlGn' if sentiment_type == 'positive' else 'Reds'
+    )
+    wordcloud = wordcloud.generate(text) if text else wordcloud.generate_from_frequencies(word_freq)
+    
+    # Figure objects instead of pyplot's global state, so word clouds can
+    # be rendered from concurrent pipeline stages
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
+    ax.imshow(wordcloud, interpolation='bilinear')
+    ax.axis('off')
+    ax.set_title(f'Key Topics in {sentiment_type.title()} Reviews', fontsize=16, fontweight='bold')
+    fig.tight_layout()
+    fig.savefig(f'data/wordcloud_{sentiment_type}.png', dpi=300, bbox_inches='tight')
+    
+    print(f"📝 Top {top_words} words in {sentiment_type} reviews:")
+    for word, count in top_words_list:
+        print(f"   • {word}: {count}")
+    
+    return top_words_list
+
+
+def _render_topics_stage(sentiment_type, top_words, results):
+    """Pipeline stage: render a word cloud from the 'topic_words' stage result"""
+    word_freq, text = results['topic_words'][sentiment_type]
+    return render_key_topics(word_freq, sentiment_type, top_words, text)
+
+
 class RaizenSentimentAnalyzer:
-    def __init__(self, places_file: str, reviews_file: str):
+    def __init__(self, places_file: str, reviews_file: str, scorer=None, chunksize: int = None,
+                 indexes=(), index_files=None, near_duplicates: str = None,
+                 reviewer_weighting: bool = False, profile: bool = False, profile_dir: str = None):
         """
         Initialize the sentiment analyzer with data files
         
         Args:
             places_file: Path to places CSV file
             reviews_file: Path to reviews CSV file
+            scorer: Sentiment scorer instance or name ('textblob', 'lexicon');
+                defaults to TextBlob
+            chunksize: If set, run out-of-core: reviews are streamed from the
+                CSV in chunks of this many rows and folded into aggregates
+                instead of being loaded into memory
+            indexes: Optional stores to update, any of OPTIONAL_INDEXES:
+                'search' (full-text index), 'reviewers' (cross-station
+                reviewer index, implied by reviewer_weighting) and
+                'companies' (company rollups). Each grows with the number of
+                reviews, so none is built unless asked for
+            index_files: Paths overriding INDEX_FILES, by store name
+                ('ledger' is the shared ReviewLedger of all the stores)
+            near_duplicates: 'flag' adds dup_cluster/near_duplicate columns,
+                'collapse' also keeps only the first review of each
+                near-duplicate cluster before aggregation; None disables
+            reviewer_weighting: Down-weight reviews by prolific or extreme
+                reviewers (see ReviewerIndex.weights) in the station averages
+                and ratios; review counts stay unweighted
+            profile: Record wall time, CPU time and peak memory of each stage
+                (see self.profiler.summary())
+            profile_dir: If set (and profiling), save a cProfile dump per stage
         """
-        self.places_df = pd.read_csv(places_file)
-        self.reviews_df = pd.read_csv(reviews_file)
-        
-        # Filter only places and reviews with actual data
-        self.places_with_reviews = self.places_df[self.places_df['reviews_count'] > 0].copy()
-        self.reviews_with_text = self.reviews_df[
-            (self.reviews_df['text'].notna()) & 
-            (self.reviews_df['text'].str.len() > 5)
-        ].copy()
+        files = {**INDEX_FILES, **(index_files or {})}
+        unknown = set(files) - set(INDEX_FILES)
+        if unknown:
+            raise ValueError(f"Unknown index files {sorted(unknown)}. Use any of {tuple(INDEX_FILES)}")
+        self.indexes = set(indexes) | ({'reviewers'} if reviewer_weighting else set())
+        unknown = self.indexes - set(OPTIONAL_INDEXES)
+        if unknown:
+            raise ValueError(f"Unknown indexes {sorted(unknown)}. Use any of {OPTIONAL_INDEXES}")
+        
+        self.profiler = StageProfiler(profile_dir) if profile else None
+        if near_duplicates not in (None, 'flag', 'collapse'):
+            raise ValueError("near_duplicates must be None, 'flag' or 'collapse'")
+        self.near_duplicates = near_duplicates
+        self.near_duplicates_file = files['near_duplicates']
+        self.duplicate_detector = NearDuplicateDetector.load(self.near_duplicates_file) if near_duplicates else None
+        self.scorer = get_scorer(scorer)
+        self.rollups_file = files['rollups']
+        self.rollups = SentimentRollupStore.load(self.rollups_file)
+        self.ledger_file = files['ledger']
+        self.ledger = ReviewLedger.load(self.ledger_file)
+        self.search_index_file = files['search']
+        self.search_index = ReviewSearchIndex.load(self.search_index_file) if 'search' in self.indexes else None
+        self.reviewer_index_file = files['reviewers']
+        self.reviewer_index = ReviewerIndex.load(self.reviewer_index_file) if 'reviewers' in self.indexes else None
+        self.reviewer_weighting = reviewer_weighting
+        self.company_rollups_file = files['companies']
+        self.company_rollups = CompanyRollupStore.load(self.company_rollups_file) if 'companies' in self.indexes else None
+        self.companies_file = files['place_companies']
+        # A store file deleted for a rebuild: every review goes back into that store
+        for store, path in (('rollups', self.rollups_file), ('search', self.search_index_file),
+                            ('reviewers', self.reviewer_index_file), ('companies', self.company_rollups_file)):
+            if not os.path.exists(path):
+                self.ledger.reset(store)
+        self.reviews_file = reviews_file
+        self.chunksize = chunksize
+        self.aggregates = None
+        self._load_data(places_file, reviews_file)
+    
+    @profiled_stage(name='load_data')
+    def _load_data(self, places_file, reviews_file):
+        """
+        Load places and (unless running out-of-core) reviews
+        """
+        chunksize = self.chunksize
+        if chunksize:
+            # Out-of-core mode: only the (small) places table is held in memory
+            # company is only in exports written since it was added
+            self.places_df = pd.read_csv(places_file, usecols=lambda column: column in PLACE_COLUMNS + ['company'],
+                                         dtype=PLACE_DTYPES)
+            self.reviews_df = None
+            self.places_with_reviews = self.places_df[self.places_df['reviews_count'] > 0]
+            self.reviews_with_text = None
+        else:
+            self.places_df = pd.read_csv(places_file)
+            self.reviews_df = pd.read_csv(reviews_file)
+            
+            # Filter only places and reviews with actual data
+            self.places_with_reviews = self.places_df[self.places_df['reviews_count'] > 0].copy()
+            self.reviews_with_text = self.reviews_df[
+                (self.reviews_df['text'].notna()) & 
+                (self.reviews_df['text'].str.len() > 5)
+            ].copy()
         
         print(f"📊 Data Summary:")
         print(f"   • Total places: {len(self.places_df)}")
         print(f"   • Places with reviews: {len(self.places_with_reviews)}")
-        print(f"   • Total reviews with text: {len(self.reviews_with_text)}")
+        if self.reviews_with_text is not None:
+            print(f"   • Total reviews with text: {len(self.reviews_with_text)}")
+        else:
+            print(f"   • Reviews streamed in chunks of {chunksize:,} rows")
         print(f"   • Average rating: {self.places_with_reviews['rating'].mean():.2f}")
+        
+        # Map stations to companies: the places export's own column wins over the table
+        if self.company_rollups is not None:
+            if os.path.exists(self.companies_file):
+                self.company_rollups.set_companies(load_place_companies(self.companies_file))
+            self.company_rollups.set_places(self.places_df)
+            print(f"   • Companies: {len(self.company_rollups)}")
     
+    @profiled_stage
     def perform_sentiment_analysis(self):
         """
         Perform sentiment analysis on review texts
         """
-        print("🔍 Performing sentiment analysis...")
+        print(f"🔍 Performing sentiment analysis ({self.scorer.name} scorer)...")
         
-        # Calculate sentiment scores using TextBlob
-        sentiments = []
-        polarities = []
-        subjectivities = []
+        if self.chunksize:
+            return self._perform_chunked_sentiment_analysis()
         
-        for text in self.reviews_with_text['text']:
-            if pd.isna(text) or len(str(text).strip()) < 3:
-                sentiments.append('neutral')
-                polarities.append(0.0)
-                subjectivities.append(0.0)
-                continue
-                
-            try:
-                blob = TextBlob(str(text))
-                polarity = blob.sentiment.polarity
-                subjectivity = blob.sentiment.subjectivity
-                
-                # Classify sentiment based on polarity
-                if polarity > 0.1:
-                    sentiment = 'positive'
-                elif polarity < -0.1:
-                    sentiment = 'negative'
-                else:
-                    sentiment = 'neutral'
-                
-                sentiments.append(sentiment)
-                polarities.append(polarity)
-                subjectivities.append(subjectivity)
-                
-            except Exception as e:
-                sentiments.append('neutral')
-                polarities.append(0.0)
-                subjectivities.append(0.0)
+        if self.duplicate_detector is not None:
+            self.reviews_with_text = self._handle_near_duplicates(self.reviews_with_text, set())
+            self.duplicate_detector.save(self.near_duplicates_file)
+        
+        self._score_reviews(self.reviews_with_text)
+        
+        # Fold newly seen reviews into the rollups and the requested indexes
+        added = self._update_indexes(self.reviews_with_text)
+        self._save_indexes(added)
+        
+        print("✅ Sentiment analysis completed!")
+        return self.reviews_with_text
+    
+    def _perform_chunked_sentiment_analysis(self):
+        """
+        Score the reviews chunk by chunk and fold them into aggregates
+        
+        Memory stays bounded by the chunk size (plus the memory-mapped review
+        ledger) unless near-duplicate detection or one of the optional
+        indexes, which hold every review, is enabled.
+        """
+        self.aggregates = ReviewAggregates()
+        added = Counter()
+        seen_clusters = set()
+        
+        for chunk in iter_review_chunks(self.reviews_file, self.chunksize):
+            chunk = chunk.copy()
+            if self.duplicate_detector is not None:
+                chunk = self._handle_near_duplicates(chunk, seen_clusters)
+            self._score_reviews(chunk)
+            added.update(self._update_indexes(chunk))
+            self.aggregates.fold(chunk)
+            print(f"   • {self.aggregates.total_reviews:,} reviews scored")
+        
+        self._save_indexes(added)
+        if self.duplicate_detector is not None:
+            self.duplicate_detector.save(self.near_duplicates_file)
+        
+        print("✅ Sentiment analysis completed!")
+        return self.aggregates
+    
+    def _update_indexes(self, reviews):
+        """
+        Fold a scored reviews frame into the rollups and the enabled indexes
+        
+        Returns:
+            Counter of reviews added per store
+        """
+        added = Counter(rollups=self.rollups.add_frame(reviews, self.ledger))
+        if self.search_index is not None:
+            added['search'] = self.search_index.add_frame(reviews, self.ledger)
+        if self.reviewer_index is not None:
+            # Track authors across stations, then weight their reviews if asked to
+            added['reviewers'] = self.reviewer_index.add_frame(reviews, self.ledger)
+            self._weight_reviewers(reviews)
+        if self.company_rollups is not None:
+            added['companies'] = self.company_rollups.add_frame(reviews, self.ledger)
+        return added
+    
+    def _save_indexes(self, added):
+        """
+        Persist the rollups, the review ledger and the enabled indexes
+        """
+        self.rollups.save(self.rollups_file)
+        self.ledger.save(self.ledger_file)
+        print(f"📈 Added {added['rollups']} reviews to time-series rollups")
+        if self.search_index is not None:
+            self.search_index.save(self.search_index_file)
+            print(f"🔎 Added {added['search']} reviews to the search index")
+        if self.reviewer_index is not None:
+            self.reviewer_index.save(self.reviewer_index_file)
+            print(f"👥 Added {added['reviewers']} reviews to the reviewer index")
+        if self.company_rollups is not None:
+            self.company_rollups.save(self.company_rollups_file)
+            print(f"🏢 Added {added['companies']} reviews to the company rollups")
+    
+    def _weight_reviewers(self, reviews):
+        """
+        Add a reviewer_weight column when reviewer weighting is on
+        
+        Out-of-core runs weight each chunk with the index as it stands after
+        that chunk (plus earlier runs).
+        """
+        if not self.reviewer_weighting:
+            return
+        reviews['reviewer_weight'] = self.reviewer_index.weights(reviews['author_name'])
+        down_weighted = int((reviews['reviewer_weight'] < 1).sum())
+        if down_weighted:
+            print(f"👥 Down-weighted {down_weighted} reviews by prolific or extreme reviewers")
+    
+    def _handle_near_duplicates(self, reviews, seen_clusters):
+        """
+        Flag (or drop, in 'collapse' mode) near-duplicate reviews
+        """
+        reviews = self.duplicate_detector.mark_frame(reviews, seen_clusters)
+        flagged = int(reviews['near_duplicate'].sum())
+        if self.near_duplicates == 'collapse':
+            reviews = reviews[~reviews['near_duplicate']].copy()
+            print(f"🔁 Collapsed {flagged} near-duplicate reviews")
+        else:
+            print(f"🔁 Flagged {flagged} near-duplicate reviews")
+        return reviews
+    
+    def _score_reviews(self, reviews):
+        """
+        Add sentiment, polarity and subjectivity columns to a reviews frame
+        """
+        # Calculate sentiment scores with the configured scorer
+        texts = reviews['text']
+        polarities, subjectivities = self.scorer.score(texts.astype(str).tolist())
+        
+        # Very short texts carry no usable sentiment
+        too_short = (texts.isna() | (texts.astype(str).str.strip().str.len() < 3)).to_numpy()
+        polarities[too_short] = 0.0
+        subjectivities[too_short] = 0.0
+        
+        # Classify sentiment based on polarity
+        sentiments = sentiment_labels(polarities)
         
         # Add sentiment data to reviews dataframe
-        self.reviews_with_text['sentiment'] = sentiments
-        self.reviews_with_text['polarity'] = polarities
-        self.reviews_with_text['subjectivity'] = subjectivities
+        reviews['sentiment'] = sentiments
+        reviews['polarity'] = polarities
+        reviews['subjectivity'] = subjectivities
         
         # Create sentiment categories based on rating as well
-        self.reviews_with_text['rating_sentiment'] = self.reviews_with_text['rating'].apply(
+        reviews['rating_sentiment'] = reviews['rating'].apply(
             lambda x: 'positive' if x >= 4 else ('negative' if x <= 2 else 'neutral')
         )
-        
-        print("✅ Sentiment analysis completed!")
-        return self.reviews_with_text
     
+    @profiled_stage
     def create_sentiment_dashboard(self):
         """
         Create comprehensive sentiment analysis dashboard
@@ -107,8 +365,18 @@ class RaizenSentimentAnalyzer:
                    [{"type": "scatter"}, {"type": "scatter"}]]
         )
         
+        # In out-of-core mode the distributions come from the aggregates and
+        # the scatter from a bounded reservoir sample
+        if self.aggregates is not None:
+            sentiment_counts = pd.Series(self.aggregates.sentiment_counts).sort_values(ascending=False)
+            rating_counts = pd.Series(self.aggregates.rating_counts).sort_index()
+            scatter_reviews = self.aggregates.sample_frame()
+        else:
+            sentiment_counts = self.reviews_with_text['sentiment'].value_counts()
+            rating_counts = self.reviews_with_text['rating'].value_counts().sort_index()
+            scatter_reviews = self.reviews_with_text
+        
         # 1. Sentiment distribution pie chart
-        sentiment_counts = self.reviews_with_text['sentiment'].value_counts()
         colors = {'positive': '#2E8B57', 'neutral': '#FFD700', 'negative': '#DC143C'}
         
         fig.add_trace(
@@ -122,7 +390,6 @@ class RaizenSentimentAnalyzer:
         )
         
         # 2. Rating distribution
-        rating_counts = self.reviews_with_text['rating'].value_counts().sort_index()
         fig.add_trace(
             go.Bar(
                 x=rating_counts.index,
@@ -134,17 +401,17 @@ class RaizenSentimentAnalyzer:
         )
         
         # 3. Sentiment vs Rating scatter
-        sentiment_numeric = self.reviews_with_text['sentiment'].map({
+        sentiment_numeric = scatter_reviews['sentiment'].map({
             'positive': 1, 'neutral': 0, 'negative': -1
         })
         
         fig.add_trace(
             go.Scatter(
-                x=self.reviews_with_text['rating'],
+                x=scatter_reviews['rating'],
                 y=sentiment_numeric,
                 mode='markers',
                 marker=dict(
-                    color=self.reviews_with_text['polarity'],
+                    color=scatter_reviews['polarity'],
                     colorscale='RdYlGn',
                     size=8,
                     opacity=0.6
@@ -154,26 +421,22 @@ class RaizenSentimentAnalyzer:
             row=2, col=1
         )
         
-        # 4. Sentiment trends over time (if we have dates)
-        if 'review_date' in self.reviews_with_text.columns:
-            self.reviews_with_text['review_date'] = pd.to_datetime(self.reviews_with_text['review_date'])
-            monthly_sentiment = self.reviews_with_text.groupby([
-                self.reviews_with_text['review_date'].dt.to_period('M'),
-                'sentiment'
-            ]).size().unstack(fill_value=0)
-            
-            for sentiment in ['positive', 'negative', 'neutral']:
-                if sentiment in monthly_sentiment.columns:
-                    fig.add_trace(
-                        go.Scatter(
-                            x=monthly_sentiment.index.astype(str),
-                            y=monthly_sentiment[sentiment],
-                            mode='lines+markers',
-                            name=f"{sentiment.title()} Trends",
-                            line=dict(color=colors[sentiment])
-                        ),
-                        row=2, col=2
-                    )
+        # 4. Sentiment trends over time (precomputed monthly network rollups)
+        monthly_sentiment = self.rollups.series('month')
+        months = [bucket['bucket'] for bucket in monthly_sentiment]
+        
+        for sentiment in ['positive', 'negative', 'neutral']:
+            if any(bucket[sentiment] for bucket in monthly_sentiment):
+                fig.add_trace(
+                    go.Scatter(
+                        x=months,
+                        y=[bucket[sentiment] for bucket in monthly_sentiment],
+                        mode='lines+markers',
+                        name=f"{sentiment.title()} Trends",
+                        line=dict(color=colors[sentiment])
+                    ),
+                    row=2, col=2
+                )
         
         fig.update_layout(
             title_text="🏪 Raizen Gas Stations - Sentiment Analysis Dashboard",
@@ -185,6 +448,7 @@ class RaizenSentimentAnalyzer:
         print("📊 Dashboard saved to data/sentiment_dashboard.html")
         return fig
     
+    @profiled_stage
     def analyze_by_station(self, min_reviews=5):
         """
         Analyze sentiment by individual gas station
@@ -194,6 +458,12 @@ class RaizenSentimentAnalyzer:
         """
         print(f"🏪 Analyzing sentiment by station (min {min_reviews} reviews)...")
         
+        if self.aggregates is not None:
+            station_df = self.aggregates.station_frame(self.places_with_reviews, min_reviews)
+            station_df.to_csv('data/station_sentiment_analysis.csv', index=False)
+            print(f"💾 Station analysis saved to data/station_sentiment_analysis.csv")
+            return station_df
+        
         # Group by place and calculate sentiment metrics
         station_analysis = []
         
@@ -204,6 +474,14 @@ class RaizenSentimentAnalyzer:
             if len(place_reviews) >= min_reviews:
                 sentiment_counts = place_reviews['sentiment'].value_counts()
                 
+                # Averages and ratios honour reviewer weights; counts stay raw
+                if 'reviewer_weight' in place_reviews.columns:
+                    weights = place_reviews['reviewer_weight']
+                else:
+                    weights = pd.Series(1.0, index=place_reviews.index)
+                total_weight = weights.sum()
+                weighted_counts = weights.groupby(place_reviews['sentiment']).sum()
+                
                 station_analysis.append({
                     'place_id': place_id,
                     'name': place_info['name'],
@@ -211,13 +489,13 @@ class RaizenSentimentAnalyzer:
                     'latitude': place_info.get('latitude'),
                     'longitude': place_info.get('longitude'),
                     'total_reviews': len(place_reviews),
-                    'avg_rating': place_reviews['rating'].mean(),
-                    'avg_polarity': place_reviews['polarity'].mean(),
+                    'avg_rating': (place_reviews['rating'] * weights).sum() / total_weight,
+                    'avg_polarity': (place_reviews['polarity'] * weights).sum() / total_weight,
                     'positive_reviews': sentiment_counts.get('positive', 0),
                     'negative_reviews': sentiment_counts.get('negative', 0),
                     'neutral_reviews': sentiment_counts.get('neutral', 0),
-                    'positive_ratio': sentiment_counts.get('positive', 0) / len(place_reviews),
-                    'negative_ratio': sentiment_counts.get('negative', 0) / len(place_reviews),
+                    'positive_ratio': weighted_counts.get('positive', 0) / total_weight,
+                    'negative_ratio': weighted_counts.get('negative', 0) / total_weight,
                     'sentiment_score': sentiment_counts.get('positive', 0) - sentiment_counts.get('negative', 0)
                 })
         
@@ -239,16 +517,39 @@ class RaizenSentimentAnalyzer:
             top_words: Number of top words to extract
         """
         print(f"🔍 Extracting key topics from {sentiment_type} reviews...")
+        word_freq, text = self.topic_words(sentiment_type)
+        return self.render_topics(word_freq, sentiment_type, top_words, text)
+    
+    @profiled_stage
+    def render_topics(self, word_freq, sentiment_type='negative', top_words=20, text=None):
+        """
+        Render a word cloud in-process (see render_key_topics)
+        
+        Returns:
+            List of (word, count) tuples, or None if there are no words
+        """
+        return render_key_topics(word_freq, sentiment_type, top_words, text)
+    
+    @profiled_stage
+    def topic_words(self, sentiment_type='negative'):
+        """
+        Count the topic words of the reviews with a given sentiment
+        
+        Args:
+            sentiment_type: 'positive', 'negative', or 'neutral'
+        
+        Returns:
+            Tuple of (word Counter, filtered text for the word cloud); the
+            text is None in out-of-core mode, where only the counts are kept
+        """
+        if self.aggregates is not None:
+            return self.aggregates.topic_counts[sentiment_type], None
         
         # Filter reviews by sentiment
         sentiment_reviews = self.reviews_with_text[
             self.reviews_with_text['sentiment'] == sentiment_type
         ]
         
-        if len(sentiment_reviews) == 0:
-            print(f"No {sentiment_type} reviews found!")
-            return
-        
         # Combine all review texts
         all_text = ' '.join(sentiment_reviews['text'].astype(str))
         
@@ -256,49 +557,11 @@ class RaizenSentimentAnalyzer:
         text_clean = re.sub(r'[^\w\s]', ' ', all_text.lower())
         words = text_clean.split()
         
-        # Remove common stop words (basic list)
-        stop_words = {
-            'o', 'a', 'os', 'as', 'um', 'uma', 'de', 'do', 'da', 'dos', 'das', 'em', 'no', 'na', 'nos', 'nas',
-            'para', 'por', 'com', 'sem', 'sobre', 'até', 'após', 'antes', 'durante', 'entre', 'contra',
-            'e', 'ou', 'mas', 'porém', 'contudo', 'todavia', 'entretanto',
-            'que', 'se', 'quando', 'onde', 'como', 'porque', 'qual', 'quem', 'quanto',
-            'eu', 'tu', 'ele', 'ela', 'nós', 'vós', 'eles', 'elas',
-            'meu', 'minha', 'meus', 'minhas', 'teu', 'tua', 'teus', 'tuas', 'seu', 'sua', 'seus', 'suas',
-            'este', 'esta', 'estes', 'estas', 'esse', 'essa', 'esses', 'essas', 'aquele', 'aquela', 'aqueles', 'aquelas',
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'was', 'are', 'were',
-            'posto', 'shell', 'gas', 'station', 'gasolina', 'combustível', 'top'
-        }
-        
         # Filter out stop words and short words
-        filtered_words = [word for word in words if len(word) > 2 and word not in stop_words]
-        
-        # Count word frequencies
-        word_freq = Counter(filtered_words)
-        top_words_list = word_freq.most_common(top_words)
-        
-        # Create word cloud
-        if len(filtered_words) > 0:
-            wordcloud_text = ' '.join(filtered_words)
-            wordcloud = WordCloud(
-                width=800, height=400, 
-                background_color='white',
-                colormap='RdYlGn' if sentiment_type == 'positive' else 'Reds'
-            ).generate(wordcloud_text)
-            
-            plt.figure(figsize=(12, 6))
-            plt.imshow(wordcloud, interpolation='bilinear')
-            plt.axis('off')
-            plt.title(f'Key Topics in {sentiment_type.title()} Reviews', fontsize=16, fontweight='bold')
-            plt.tight_layout()
-            plt.savefig(f'data/wordcloud_{sentiment_type}.png', dpi=300, bbox_inches='tight')
-            plt.show()
-        
-        print(f"📝 Top {top_words} words in {sentiment_type} reviews:")
-        for word, count in top_words_list:
-            print(f"   • {word}: {count}")
-        
-        return top_words_list
-    
+        filtered_words = [word for word in words if len(word) > 2 and word not in STOP_WORDS]
+        return Counter(filtered_words), ' '.join(filtered_words)
+
+    @profiled_stage
     def create_map_visualization(self, station_df):
         """
         Create an interactive map showing stations colored by sentiment
@@ -345,6 +608,7 @@ class RaizenSentimentAnalyzer:
         print("🗺️ Map saved to data/sentiment_map.html")
         return fig
     
+    @profiled_stage
     def generate_summary_report(self, station_df):
         """
         Generate a comprehensive summary report
@@ -352,11 +616,16 @@ class RaizenSentimentAnalyzer:
         print("📋 Generating summary report...")
         
         # Calculate overall statistics
-        total_reviews = len(self.reviews_with_text)
-        avg_rating = self.reviews_with_text['rating'].mean()
-        avg_polarity = self.reviews_with_text['polarity'].mean()
-        
-        sentiment_dist = self.reviews_with_text['sentiment'].value_counts(normalize=True)
+        if self.aggregates is not None:
+            total_reviews = self.aggregates.total_reviews
+            avg_rating = self.aggregates.avg_rating
+            avg_polarity = self.aggregates.avg_polarity
+            sentiment_dist = pd.Series(self.aggregates.sentiment_counts) / max(total_reviews, 1)
+        else:
+            total_reviews = len(self.reviews_with_text)
+            avg_rating = self.reviews_with_text['rating'].mean()
+            avg_polarity = self.reviews_with_text['polarity'].mean()
+            sentiment_dist = self.reviews_with_text['sentiment'].value_counts(normalize=True)
         
         # Best and worst performing stations
         best_stations = station_df.head(5)
@@ -406,6 +675,101 @@ Generated on: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}
         print("📋 Report saved to data/sentiment_analysis_report.md")
         return report
 
+    @profiled_stage
+    def build_station_similarity(self, output_file='data/station_similarity.npz', min_reviews=3):
+        """
+        Build the complaint-profile similarity index served by the web app
+        
+        Args:
+            output_file: Path of the index file
+            min_reviews: Minimum negative reviews for a station to be profiled
+        """
+        if self.reviews_with_text is None:
+            print("🧭 Station similarity needs review texts; skipped in out-of-core mode")
+            return None
+        
+        print("🧭 Building station complaint-profile similarity index...")
+        index = StationSimilarityIndex.build(self.reviews_with_text, self.places_with_reviews, min_reviews=min_reviews)
+        index.save(output_file)
+        print(f"🧭 Profiled {len(index)} stations, saved to {output_file}")
+        return index
+    
+    @profiled_stage
+    def build_station_index(self, output_file=STATION_INDEX_FILE):
+        """
+        Write the memory-mapped station/score index the web app serves lookups from
+        
+        Every station is indexed, with metrics over all of its scored reviews
+        (no min_reviews cut-off, unlike analyze_by_station).
+        
+        Args:
+            output_file: Path of the index file
+        """
+        print("🗂️ Building memory-mapped station index...")
+        
+        if self.aggregates is not None:
+            station_df = self.aggregates.station_frame(self.places_with_reviews, min_reviews=1)
+        else:
+            reviews = self.reviews_with_text
+            station_df = reviews.groupby('place_id').agg(
+                total_reviews=('rating', 'size'), avg_rating=('rating', 'mean'), avg_polarity=('polarity', 'mean')
+            )
+            counts = pd.crosstab(reviews['place_id'], reviews['sentiment'])
+            counts = counts.reindex(columns=['positive', 'negative', 'neutral'], fill_value=0).add_suffix('_reviews')
+            station_df = station_df.join(counts).reset_index()
+            station_df['positive_ratio'] = station_df['positive_reviews'] / station_df['total_reviews']
+            station_df['negative_ratio'] = station_df['negative_reviews'] / station_df['total_reviews']
+            station_df['sentiment_score'] = station_df['positive_reviews'] - station_df['negative_reviews']
+        
+        header = write_station_index(self.places_df, station_df, output_file)
+        print(f"🗂️ Indexed {header['count']} stations, saved to {output_file}")
+        return header
+    
+    @profiled_stage
+    def build_region_rollups(self, station_df, cache_file=ADDRESS_CACHE_FILE, output_file=REGION_ROLLUPS_FILE):
+        """
+        Roll station metrics up to cities and states for the regional views
+        
+        Addresses are parsed once per place_id and kept in a persistent cache.
+        
+        Args:
+            station_df: Output of analyze_by_station
+            cache_file: Path of the address cache
+            output_file: Path of the rollups file
+        """
+        print("🗺️ Building state/city rollups...")
+        
+        cache = AddressCache.load(cache_file)
+        rollups = RegionRollups.build(station_df, cache)
+        cache.save(cache_file)
+        rollups.save(output_file)
+        print(f"🗺️ {len(rollups.states)} states ({cache.misses} addresses parsed, {cache.hits} cached), "
+              f"saved to {output_file}")
+        return rollups
+    
+    @profiled_stage
+    def generate_station_reports(self, station_df, output_dir='data/station_reports', workers=None):
+        """
+        Generate per-station drill-down pages (only stations whose data changed)
+        
+        Args:
+            station_df: Output of analyze_by_station
+            output_dir: Directory for the station pages
+            workers: Number of worker processes (defaults to the CPU count)
+        """
+        print("📄 Generating per-station reports...")
+        
+        # Out-of-core runs only keep the most recent negatives per station
+        reviews = self.aggregates.negative_reviews_frame() if self.aggregates is not None else self.reviews_with_text
+        summary = generate_station_reports(
+            station_df, reviews, self.rollups,
+            output_dir=output_dir, workers=workers
+        )
+        
+        print(f"📄 Station reports saved to {output_dir}/ "
+              f"({summary['rendered']} rendered, {summary['unchanged']} unchanged)")
+        return summary
+
 def main():
     """
     Main function to run the complete sentiment analysis
@@ -413,32 +777,69 @@ def main():
     print("🚀 Starting Raizen Gas Stations Sentiment Analysis...")
     
     # Initialize analyzer with your latest data
+    # (SENTIMENT_PROFILE=1 records per-stage timings, SENTIMENT_PROFILE_DIR adds cProfile dumps,
+    # SENTIMENT_REVIEWER_WEIGHTING=1 down-weights prolific/extreme reviewers in station metrics,
+    # SENTIMENT_INDEXES picks the optional stores to update, e.g. "search,reviewers,companies")
     analyzer = RaizenSentimentAnalyzer(
         places_file='data/raizen_places_reviews_20250609_150209_places.csv',
-        reviews_file='data/raizen_places_reviews_20250609_150209_reviews.csv'
+        reviews_file='data/raizen_places_reviews_20250609_150209_reviews.csv',
+        scorer='lexicon',
+        profile=bool(os.environ.get('SENTIMENT_PROFILE') or os.environ.get('SENTIMENT_PROFILE_DIR')),
+        profile_dir=os.environ.get('SENTIMENT_PROFILE_DIR'),
+        reviewer_weighting=bool(os.environ.get('SENTIMENT_REVIEWER_WEIGHTING')),
+        indexes=[name for name in os.environ.get('SENTIMENT_INDEXES', 'search').split(',') if name]
     )
     
-    # Perform sentiment analysis
-    reviews_with_sentiment = analyzer.perform_sentiment_analysis()
+    # Declare the pipeline: once scoring is done, the dashboard, the word
+    # clouds and the station -> map/report chain are independent
+    pipeline = StageGraph()
+    pipeline.add('sentiment', lambda results: analyzer.perform_sentiment_analysis())
+    pipeline.add('dashboard', lambda results: analyzer.create_sentiment_dashboard(),
+                 depends_on=['sentiment'])
+    pipeline.add('stations', lambda results: analyzer.analyze_by_station(min_reviews=3),
+                 depends_on=['sentiment'])
+    # Word counts are gathered in-process; the clouds are rendered in worker
+    # processes, except in profiled runs
+    pipeline.add('topic_words', lambda results: {sentiment_type: analyzer.topic_words(sentiment_type)
+                                                 for sentiment_type in ('positive', 'negative')},
+                 depends_on=['sentiment'])
     
-    # Create dashboard
-    dashboard_fig = analyzer.create_sentiment_dashboard()
+    def render_in_process(sentiment_type, results):
+        # The profiler only sees stages that run in this process
+        word_freq, text = results['topic_words'][sentiment_type]
+        return analyzer.render_topics(word_freq, sentiment_type, 15, text)
     
-    # Analyze by station
-    station_analysis = analyzer.analyze_by_station(min_reviews=3)
+    for sentiment_type in ('positive', 'negative'):
+        if analyzer.profiler is not None:
+            render = functools.partial(render_in_process, sentiment_type)
+        else:
+            render = functools.partial(_render_topics_stage, sentiment_type, 15)
+        pipeline.add(f'topics_{sentiment_type}', render, depends_on=['topic_words'],
+                     cpu_bound=analyzer.profiler is None)
+    pipeline.add('map', lambda results: analyzer.create_map_visualization(results['stations']),
+                 depends_on=['stations'])
+    pipeline.add('report', lambda results: analyzer.generate_summary_report(results['stations']),
+                 depends_on=['stations'])
+    pipeline.add('station_reports', lambda results: analyzer.generate_station_reports(results['stations']),
+                 depends_on=['stations'])
+    pipeline.add('similarity', lambda results: analyzer.build_station_similarity(),
+                 depends_on=['sentiment'])
+    pipeline.add('station_index', lambda results: analyzer.build_station_index(),
+                 depends_on=['sentiment'])
+    pipeline.add('regions', lambda results: analyzer.build_region_rollups(results['stations']),
+                 depends_on=['stations'])
     
-    # Extract key topics for positive and negative reviews
-    print("\n" + "="*50)
-    analyzer.extract_key_topics('positive', top_words=15)
+    # Profiled runs go one stage at a time, in-process, so timings are not mixed up
+    if analyzer.profiler is not None:
+        workers, processes = 1, 0
+    else:
+        workers = int(os.environ.get('SENTIMENT_WORKERS', 4))
+        processes = int(os.environ.get('SENTIMENT_PROCESSES', 2))
+    pipeline.run(max_workers=workers, max_processes=processes)
     
-    print("\n" + "="*50)
-    analyzer.extract_key_topics('negative', top_words=15)
-    
-    # Create map visualization
-    map_fig = analyzer.create_map_visualization(station_analysis)
-    
-    # Generate summary report
-    report = analyzer.generate_summary_report(station_analysis)
+    print("\n⏱️ Stage wall times: " + ', '.join(
+        f"{name} {seconds:.1f}s" for name, seconds in pipeline.timings.items()
+    ))
     
     print("\n🎉 Sentiment Analysis Complete!")
     print("📁 Generated Files:")
@@ -446,8 +847,20 @@ def main():
     print("   • data/sentiment_map.html - Interactive map")
     print("   • data/station_sentiment_analysis.csv - Detailed station analysis")
     print("   • data/sentiment_analysis_report.md - Summary report")
+    print("   • data/station_reports/ - Per-station drill-down pages")
+    print("   • data/station_similarity.npz - Complaint-profile similarity index")
+    print("   • data/station_index.bin - Memory-mapped station/score index for the web app")
+    print("   • data/region_rollups.json - State/city rollups of the station metrics")
+    if analyzer.company_rollups is not None:
+        print("   • data/company_rollups.json - Company (RAZAOSOCIAL) rollups of ratings and sentiment")
     print("   • data/wordcloud_positive.png - Positive reviews word cloud")
     print("   • data/wordcloud_negative.png - Negative reviews word cloud")
+    
+    if analyzer.profiler is not None:
+        analyzer.profiler.save('data/stage_profile.json')
+        analyzer.profiler.close()
+        print("\n⏱️ Stage Profile (data/stage_profile.json):")
+        print(analyzer.profiler.summary())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,180 @@
+"""
+Materialized time-series rollups of review metrics
+
+Keeps daily, weekly and monthly buckets of review counts, mean rating, mean
+polarity and sentiment counts per station and network-wide. Buckets are
+updated incrementally as reviews arrive, so trend charts and API queries read
+precomputed values instead of re-grouping the raw reviews.
+
+Buckets are in UTC. Which reviews were already folded in is tracked by the
+shared ReviewLedger, not in the rollup file, so loading the rollups costs
+time proportional to the number of buckets, not of reviews.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from review_ledger import ReviewLedger, review_totals
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_FILE = "data/sentiment_rollups.json"
+LEDGER_STORE = 'rollups'
+
+GRANULARITIES = ('day', 'week', 'month')
+NETWORK = '*'
+
+# Bucket layout: count, rating_sum, rating_count, polarity_sum, polarity_count,
+# positive, neutral, negative
+_COUNT, _RATING_SUM, _RATING_N, _POLARITY_SUM, _POLARITY_N = range(5)
+_SENTIMENT_SLOTS = {'positive': 5, 'neutral': 6, 'negative': 7}
+_BUCKET_SIZE = 8
+
+
+class SentimentRollupStore:
+    """Incrementally maintained per-station and network-wide review rollups"""
+
+    def __init__(self):
+        # granularity -> owner (place_id or NETWORK) -> bucket label -> bucket values
+        self.buckets: Dict[str, Dict[str, Dict[str, List[float]]]] = {g: {} for g in GRANULARITIES}
+
+    def _bucket(self, granularity: str, owner: str, label: str) -> List[float]:
+        labels = self.buckets[granularity].setdefault(owner, {})
+        values = labels.get(label)
+        if values is None:
+            values = labels[label] = [0] * _BUCKET_SIZE
+        return values
+
+    def add_frame(self, reviews_df, ledger: Optional[ReviewLedger] = None) -> int:
+        """
+        Add a batch of reviews from a DataFrame with aggregate-then-merge
+
+        Expects ``place_id`` and ``time`` (or ``review_date``) columns; uses
+        ``rating``, ``polarity`` and ``sentiment`` when present. With a
+        ledger, reviews already in the rollups are skipped, except that a
+        review first added without a polarity gets its score added once it
+        arrives with one.
+
+        Args:
+            reviews_df: Reviews DataFrame
+            ledger: Shared review ledger (without one, every row is added)
+
+        Returns:
+            Number of new reviews added
+        """
+        if ledger is None:
+            new, rescored = reviews_df, reviews_df.iloc[:0]
+        else:
+            new, rescored = ledger.select(reviews_df, LEDGER_STORE)
+
+        self._fold(new)
+        self._fold(rescored, scores_only=True)
+        if ledger is not None:
+            ledger.record(new, LEDGER_STORE)
+            ledger.record(rescored, LEDGER_STORE)
+        return len(new)
+
+    def _fold(self, df, scores_only: bool = False):
+        if df.empty:
+            return
+        # Unix time is UTC; review_date (local time of the extraction) only as a fallback
+        if 'time' in df.columns:
+            moments = pd.to_datetime(df['time'].where(df['time'] > 0), unit='s', errors='coerce')
+        else:
+            moments = pd.to_datetime(df['review_date'], errors='coerce')
+        df = df[moments.notna()]
+        moments = moments[moments.notna()]
+        if df.empty:
+            return
+
+        place_ids = df['place_id'].astype(str)
+        frequencies = {'day': 'D', 'month': 'M'}
+        for granularity in GRANULARITIES:
+            if granularity == 'week':
+                starts = moments.dt.normalize() - pd.to_timedelta(moments.dt.weekday, unit='D')
+                labels = starts.dt.strftime('%Y-%m-%d')
+            else:
+                labels = moments.dt.to_period(frequencies[granularity]).astype(str)
+            for grouped in (review_totals(df, [place_ids, labels], scores_only),
+                            review_totals(df, [pd.Series(NETWORK, index=df.index), labels], scores_only)):
+                for (owner, label), row in zip(grouped.index, grouped.to_numpy().tolist()):
+                    values = self._bucket(granularity, owner, label)
+                    for i, value in enumerate(row):
+                        values[i] += value
+
+    def series(self, granularity: str = 'month', place_id: Optional[str] = None,
+               start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+        """
+        Read precomputed buckets for a station or the whole network
+
+        Args:
+            granularity: 'day', 'week' or 'month'
+            place_id: Station ID, or None for network-wide buckets
+            start: First bucket label to include (inclusive)
+            end: Last bucket label to include (inclusive)
+
+        Returns:
+            List of bucket dictionaries ordered by bucket label
+        """
+        if granularity not in self.buckets:
+            raise ValueError(f"Unknown granularity '{granularity}'. Use one of {GRANULARITIES}")
+
+        result = []
+        for label, values in self.buckets[granularity].get(place_id or NETWORK, {}).items():
+            if (start and label < start) or (end and label > end):
+                continue
+            result.append({
+                'bucket': label,
+                'count': int(values[_COUNT]),
+                'avg_rating': values[_RATING_SUM] / values[_RATING_N] if values[_RATING_N] else None,
+                'avg_polarity': values[_POLARITY_SUM] / values[_POLARITY_N] if values[_POLARITY_N] else None,
+                'positive': int(values[_SENTIMENT_SLOTS['positive']]),
+                'neutral': int(values[_SENTIMENT_SLOTS['neutral']]),
+                'negative': int(values[_SENTIMENT_SLOTS['negative']]),
+            })
+        result.sort(key=lambda bucket: bucket['bucket'])
+        return result
+
+    def stations(self) -> List[str]:
+        """Return the station IDs that have at least one bucket"""
+        return sorted(owner for owner in self.buckets['month'] if owner != NETWORK)
+
+    def save(self, path: str = ROLLUPS_FILE) -> str:
+        """
+        Persist the buckets as JSON (the reviews they contain are in the ReviewLedger)
+
+        Args:
+            path: Output file path
+
+        Returns:
+            Path to the written file
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        data = {'buckets': self.buckets}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        logger.info(f"Rollups saved: {path}")
+        return path
+
+    @classmethod
+    def load(cls, path: str = ROLLUPS_FILE) -> 'SentimentRollupStore':
+        """
+        Load a store written by save(); returns an empty store if the file is missing
+
+        Args:
+            path: Input file path
+
+        Returns:
+            SentimentRollupStore instance
+        """
+        store = cls()
+        if not Path(path).exists():
+            return store
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        store.buckets.update(data.get('buckets', {}))
+        return store
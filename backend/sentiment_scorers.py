@@ -0,0 +1,280 @@
+"""
+Pluggable sentiment scorers for RaizenSentimentAnalyzer
+
+Every scorer exposes ``score(texts)`` and returns two float arrays of the same
+length as ``texts``: polarity in [-1, 1] and subjectivity in [0, 1].
+"""
+
+import re
+import unicodedata
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+
+class SentimentScorer:
+    """Base class for sentiment scorers"""
+
+    name = 'base'
+
+    def score(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score a batch of review texts
+
+        Args:
+            texts: Review texts
+
+        Returns:
+            Tuple of (polarities, subjectivities) arrays
+        """
+        raise NotImplementedError
+
+
+class TextBlobScorer(SentimentScorer):
+    """Per-review TextBlob scoring (original behaviour, English-centric)"""
+
+    name = 'textblob'
+
+    def score(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        from textblob import TextBlob
+
+        polarities = np.zeros(len(texts))
+        subjectivities = np.zeros(len(texts))
+
+        for i, text in enumerate(texts):
+            try:
+                sentiment = TextBlob(str(text)).sentiment
+                polarities[i] = sentiment.polarity
+                subjectivities[i] = sentiment.subjectivity
+            except Exception:
+                pass
+
+        return polarities, subjectivities
+
+
+# Portuguese + English sentiment lexicon (accent-free, lowercase keys)
+DEFAULT_LEXICON: Dict[str, float] = {
+    # Portuguese - positive
+    'bom': 0.6, 'boa': 0.6, 'bons': 0.6, 'boas': 0.6, 'otimo': 0.9, 'otima': 0.9,
+    'excelente': 1.0, 'excelentes': 1.0, 'maravilhoso': 1.0, 'maravilhosa': 1.0,
+    'perfeito': 1.0, 'perfeita': 1.0, 'top': 0.7, 'show': 0.7, 'legal': 0.5,
+    'gostei': 0.7, 'adorei': 0.9, 'amei': 0.9, 'recomendo': 0.8, 'satisfeito': 0.7,
+    'satisfeita': 0.7, 'satisfeitissimo': 1.0, 'satisfeitissima': 1.0,
+    'atencioso': 0.7, 'atenciosos': 0.7, 'atenciosa': 0.7, 'atenciosas': 0.7,
+    'educado': 0.6, 'educados': 0.6, 'educada': 0.6, 'simpatico': 0.6,
+    'simpaticos': 0.6, 'simpatica': 0.6, 'prestativo': 0.7, 'prestativos': 0.7,
+    'gentil': 0.6, 'gentis': 0.6, 'cordial': 0.6, 'limpo': 0.6, 'limpos': 0.6,
+    'limpa': 0.6, 'limpas': 0.6, 'organizado': 0.5, 'organizada': 0.5,
+    'rapido': 0.5, 'rapida': 0.5, 'agil': 0.5, 'eficiente': 0.6, 'seguro': 0.4,
+    'segura': 0.4, 'confiavel': 0.7, 'honesto': 0.7, 'honesta': 0.7,
+    'barato': 0.4, 'justo': 0.4, 'qualidade': 0.4, 'agradavel': 0.6,
+    'melhor': 0.7, 'melhores': 0.7, 'parabens': 0.9, 'obrigado': 0.4,
+    'obrigada': 0.4, 'tranquilo': 0.4, 'bonito': 0.5, 'confortavel': 0.5,
+    'ideal': 0.6, 'incrivel': 0.9, 'sensacional': 1.0, 'fantastico': 1.0,
+    # Portuguese - negative
+    'ruim': -0.7, 'ruins': -0.7, 'pessimo': -1.0, 'pessima': -1.0, 'pessimos': -1.0,
+    'horrivel': -1.0, 'horriveis': -1.0, 'terrivel': -1.0, 'pior': -0.8,
+    'piores': -0.8, 'lixo': -0.9, 'sujo': -0.7, 'suja': -0.7, 'sujos': -0.7,
+    'sujas': -0.7, 'imundo': -0.9, 'imunda': -0.9, 'caro': -0.5,
+    'caros': -0.5, 'carissimo': -0.8, 'demora': -0.5, 'demorado': -0.6,
+    'demorada': -0.6, 'lento': -0.5, 'lenta': -0.5, 'mal': -0.6, 'mau': -0.6,
+    'grosso': -0.8, 'grossa': -0.8, 'grossos': -0.8, 'grosseiro': -0.8,
+    'grosseira': -0.8, 'mal-educado': -0.8, 'despreparado': -0.7,
+    'despreparados': -0.7, 'desonesto': -1.0, 'desonesta': -1.0, 'roubo': -1.0,
+    'roubam': -1.0, 'ladrao': -1.0, 'ladroes': -1.0, 'golpe': -1.0,
+    'enganar': -0.8, 'enganaram': -0.9, 'adulterado': -1.0, 'adulterada': -1.0,
+    'batizado': -0.9, 'batizada': -0.9, 'quebrado': -0.6, 'quebrada': -0.6,
+    'quebrados': -0.6, 'problema': -0.5, 'problemas': -0.5, 'reclamacao': -0.5,
+    'decepcao': -0.8, 'decepcionado': -0.8, 'decepcionada': -0.8,
+    'descaso': -0.8, 'desrespeito': -0.9, 'absurdo': -0.8, 'vergonha': -0.8,
+    'evitem': -0.8, 'evite': -0.7, 'cuidado': -0.4,
+    'fila': -0.3, 'perigoso': -0.6, 'perigosa': -0.6, 'insatisfeito': -0.7,
+    'insatisfeita': -0.7, 'fraco': -0.5, 'fraca': -0.5, 'precario': -0.7,
+    'precaria': -0.7, 'fechado': -0.3, 'mentira': -0.8, 'falta': -0.4,
+    # English - positive
+    'good': 0.6, 'great': 0.8, 'excellent': 1.0, 'amazing': 0.9, 'awesome': 0.9,
+    'perfect': 1.0, 'nice': 0.6, 'friendly': 0.7, 'helpful': 0.7, 'clean': 0.6,
+    'fast': 0.5, 'quick': 0.5, 'cheap': 0.4, 'best': 0.8, 'love': 0.8,
+    'recommend': 0.7, 'polite': 0.6, 'safe': 0.4, 'reliable': 0.6, 'fair': 0.4,
+    # English - negative
+    'bad': -0.7, 'terrible': -1.0, 'horrible': -1.0, 'awful': -1.0,
+    'worst': -1.0, 'dirty': -0.7, 'rude': -0.8, 'slow': -0.5, 'expensive': -0.5,
+    'overpriced': -0.6, 'scam': -1.0, 'broken': -0.6, 'poor': -0.6,
+    'disappointed': -0.7, 'avoid': -0.8, 'unfriendly': -0.7, 'dangerous': -0.6,
+}
+
+# Tokens that flip the polarity of the next few tokens. English 'no' is left
+# out: in Portuguese it is "in the" (em + o) and appears in most reviews
+DEFAULT_NEGATIONS = frozenset({
+    'nao', 'nem', 'nunca', 'jamais', 'nenhum', 'nenhuma', 'sem',
+    'not', 'never', 'dont', 'didnt', 'isnt', 'wasnt', 'cant', 'wont',
+})
+
+# Words that start a new clause; a negation never reaches past them (or past punctuation)
+DEFAULT_CLAUSE_BREAKS = frozenset({
+    'mas', 'porem', 'contudo', 'todavia', 'entretanto', 'embora',
+    'but', 'however', 'although', 'though',
+})
+
+# Common Portuguese/English stop words plus domain words that carry no topic
+STOP_WORDS = frozenset({
+    'o', 'a', 'os', 'as', 'um', 'uma', 'de', 'do', 'da', 'dos', 'das', 'em', 'no', 'na', 'nos', 'nas',
+    'para', 'por', 'com', 'sem', 'sobre', 'até', 'após', 'antes', 'durante', 'entre', 'contra',
+    'e', 'ou', 'mas', 'porém', 'contudo', 'todavia', 'entretanto',
+    'que', 'se', 'quando', 'onde', 'como', 'porque', 'qual', 'quem', 'quanto',
+    'eu', 'tu', 'ele', 'ela', 'nós', 'vós', 'eles', 'elas',
+    'meu', 'minha', 'meus', 'minhas', 'teu', 'tua', 'teus', 'tuas', 'seu', 'sua', 'seus', 'suas',
+    'este', 'esta', 'estes', 'estas', 'esse', 'essa', 'esses', 'essas', 'aquele', 'aquela', 'aqueles', 'aquelas',
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'was', 'are', 'were',
+    'posto', 'shell', 'gas', 'station', 'gasolina', 'combustível', 'top'
+})
+
+
+class LexiconScorer(SentimentScorer):
+    """
+    Vectorized lexicon scorer for Portuguese and English reviews.
+
+    Texts are lowercased, stripped of accents and tokenized in batches. Each
+    token is mapped to a vocabulary id and the polarity of a review is the
+    sign-adjusted sum of its lexicon weights (computed as a sparse row sum
+    with ``np.bincount``), divided by the number of sentiment-bearing tokens.
+    Tokens within ``negation_window`` positions after a negation word have
+    their weight flipped, unless punctuation or a clause word ("mas", "but")
+    comes in between. Subjectivity is the share of tokens found in the
+    lexicon.
+    """
+
+    name = 'lexicon'
+
+    # Words, plus punctuation that ends a clause (kept as boundary tokens)
+    _token_pattern = re.compile(r"[a-z]+(?:-[a-z]+)*|[.,;:!?()]")
+
+    def __init__(self, lexicon: Dict[str, float] = None, negations=None,
+                 negation_window: int = 3, batch_size: int = 20000, clause_breaks=None):
+        """
+        Args:
+            lexicon: Mapping of word to weight in [-1, 1]
+            negations: Words that negate the following tokens
+            negation_window: Number of tokens after a negation to flip
+            batch_size: Number of texts tokenized per batch
+            clause_breaks: Words that end the reach of a negation
+        """
+        lexicon = DEFAULT_LEXICON if lexicon is None else lexicon
+        negations = DEFAULT_NEGATIONS if negations is None else negations
+        clause_breaks = DEFAULT_CLAUSE_BREAKS if clause_breaks is None else clause_breaks
+
+        # Vocabulary: id 0 is reserved for out-of-lexicon tokens
+        self.vocabulary: Dict[str, int] = {}
+        weights = [0.0]
+        for word, weight in lexicon.items():
+            self.vocabulary[self.normalize(word)] = len(weights)
+            weights.append(float(weight))
+        self.negation_id = len(weights)
+        for word in negations:
+            self.vocabulary.setdefault(self.normalize(word), self.negation_id)
+        weights.append(0.0)
+        self.boundary_id = len(weights)
+        for token in list(clause_breaks) + list('.,;:!?()'):
+            self.vocabulary.setdefault(self.normalize(token), self.boundary_id)
+        weights.append(0.0)
+
+        self.weights = np.asarray(weights)
+        self.negation_window = negation_window
+        self.batch_size = batch_size
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Lowercase and strip accents (``não`` -> ``nao``)"""
+        text = unicodedata.normalize('NFKD', str(text).lower())
+        return text.encode('ascii', 'ignore').decode('ascii').replace("'", '')
+
+    def _tokenize_batch(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return flat arrays of (document index, vocabulary id) for a batch"""
+        lookup = self.vocabulary.get
+        findall = self._token_pattern.findall
+        ids: List[int] = []
+        lengths = np.empty(len(texts), dtype=np.int64)
+
+        for i, text in enumerate(texts):
+            tokens = findall(self.normalize(text))
+            ids.extend([lookup(token, 0) for token in tokens])
+            lengths[i] = len(tokens)
+
+        docs = np.repeat(np.arange(len(texts)), lengths)
+        return docs, np.asarray(ids, dtype=np.int64)
+
+    def _score_batch(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        n = len(texts)
+        docs, ids = self._tokenize_batch(texts)
+        if len(ids) == 0:
+            return np.zeros(n), np.zeros(n)
+
+        # Clauses: a new one starts at every review and after every boundary token
+        is_boundary = ids == self.boundary_id
+        starts = np.empty(len(ids), dtype=bool)
+        starts[0] = True
+        starts[1:] = (docs[1:] != docs[:-1]) | is_boundary[:-1]
+        clauses = np.cumsum(starts | is_boundary)
+
+        # Flag tokens that follow a negation word in the same clause
+        is_negation = ids == self.negation_id
+        negated = np.zeros(len(ids), dtype=bool)
+        for shift in range(1, self.negation_window + 1):
+            if shift >= len(ids):
+                break
+            negated[shift:] |= is_negation[:-shift] & (clauses[shift:] == clauses[:-shift])
+        signs = np.where(negated, -1.0, 1.0)
+
+        token_weights = self.weights[ids] * signs
+        hits = (self.weights[ids] != 0).astype(float)
+
+        totals = np.bincount(docs, weights=token_weights, minlength=n)
+        hit_counts = np.bincount(docs, weights=hits, minlength=n)
+        token_counts = np.bincount(docs, weights=(~is_boundary).astype(float), minlength=n)
+
+        polarities = np.divide(totals, hit_counts, out=np.zeros(n), where=hit_counts > 0)
+        subjectivities = np.divide(hit_counts, token_counts, out=np.zeros(n), where=token_counts > 0)
+        return np.clip(polarities, -1.0, 1.0), subjectivities
+
+    def score(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        texts = list(texts)
+        polarities = np.zeros(len(texts))
+        subjectivities = np.zeros(len(texts))
+
+        for start in range(0, len(texts), self.batch_size):
+            end = start + self.batch_size
+            polarities[start:end], subjectivities[start:end] = self._score_batch(texts[start:end])
+
+        return polarities, subjectivities
+
+
+def sentiment_labels(polarities: np.ndarray, threshold: float = 0.1) -> np.ndarray:
+    """Label polarities 'positive' / 'negative' beyond +-threshold, else 'neutral'"""
+    return np.where(polarities > threshold, 'positive',
+                    np.where(polarities < -threshold, 'negative', 'neutral'))
+
+
+SCORERS = {
+    TextBlobScorer.name: TextBlobScorer,
+    LexiconScorer.name: LexiconScorer,
+}
+
+
+def get_scorer(scorer: Union[str, SentimentScorer, None] = None) -> SentimentScorer:
+    """
+    Resolve a scorer name or instance
+
+    Args:
+        scorer: Scorer instance, registered name ('textblob', 'lexicon') or None
+            for the default TextBlob scorer
+
+    Returns:
+        SentimentScorer instance
+    """
+    if scorer is None:
+        return TextBlobScorer()
+    if isinstance(scorer, str):
+        if scorer not in SCORERS:
+            raise ValueError(f"Unknown sentiment scorer '{scorer}'. Available: {', '.join(SCORERS)}")
+        return SCORERS[scorer]()
+    return scorer
@@ -0,0 +1,309 @@
+"""
+Sharded extraction with deterministic merge
+
+Place IDs are partitioned into N shards by a stable hash of the place_id, so
+the same place always lands in the same shard no matter which machine runs
+it or in which order the IDs are listed. Each shard writes its own shard
+output. Locally, shards sharing an API key run in one process under one rate
+limiter, so together they respect the key's quota; on separate machines,
+each shard runs with its own key and quota. Either way, the merge step
+combines the shard outputs into the usual ``_places.csv``, ``_reviews.csv``
+and ``.json`` files, and stores the merged run in the snapshot store (see
+snapshot_store).
+
+Usage:
+    # All shards on this machine, one process per API key
+    python sharded_extraction.py run --shards 4 --api-keys KEY1,KEY2
+
+    # One shard per machine, then merge the collected shard files
+    python sharded_extraction.py shard --index 0 --shards 4 --api-key KEY1
+    python sharded_extraction.py merge --shards 4
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from google_places_extractor import (
+    AIMDRateLimiter, GooglePlacesReviewsAPI, StreamingExporter, load_place_companies, load_place_ids_from_json,
+    place_from_json_dict
+)
+from snapshot_store import SNAPSHOTS_DIR, SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+SHARDS_DIR = "data/shards"
+
+
+def shard_for(place_id: str, num_shards: int) -> int:
+    """
+    Return the shard a place belongs to
+
+    Uses a content hash rather than the built-in hash(), which is salted per
+    process and would send the same place to different shards on each run.
+
+    Args:
+        place_id: Google Places ID
+        num_shards: Total number of shards
+
+    Returns:
+        Shard index in [0, num_shards)
+    """
+    digest = hashlib.sha1(place_id.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % num_shards
+
+
+def partition_place_ids(place_ids: List[str], num_shards: int) -> List[List[str]]:
+    """
+    Split place IDs into shards, de-duplicated and sorted within each shard
+
+    Args:
+        place_ids: List of Google Places IDs
+        num_shards: Total number of shards
+
+    Returns:
+        List of num_shards place ID lists
+    """
+    shards = [set() for _ in range(num_shards)]
+    for place_id in place_ids:
+        shards[shard_for(place_id, num_shards)].add(place_id)
+    return [sorted(shard) for shard in shards]
+
+
+def shard_name(index: int, num_shards: int) -> str:
+    return f"shard_{index:03d}_of_{num_shards:03d}"
+
+
+def run_shard(index: int, num_shards: int, api_key: str, place_ids_file: str = "place_razao_table.json",
+              shards_dir: str = SHARDS_DIR, batch_size: int = 10,
+              rate_limiter: Optional[AIMDRateLimiter] = None) -> Dict:
+    """
+    Extract one shard and write its output
+
+    The shard writes ``<name>.json`` (plus the CSVs) and, only once the run
+    finished, a ``<name>.manifest.json`` that the merge step requires.
+
+    Args:
+        index: Shard index in [0, num_shards)
+        num_shards: Total number of shards
+        api_key: Google Places API key for this shard
+        place_ids_file: JSON file with the place IDs
+        shards_dir: Directory for shard outputs
+        batch_size: Number of places between progress log lines
+        rate_limiter: Limiter shared with the other shards on the same key
+            (a new one by default)
+
+    Returns:
+        Shard manifest dictionary
+    """
+    place_ids = partition_place_ids(load_place_ids_from_json(place_ids_file), num_shards)[index]
+    name = shard_name(index, num_shards)
+    logger.info(f"Shard {index + 1}/{num_shards}: {len(place_ids)} places")
+
+    api = GooglePlacesReviewsAPI(api_key, rate_limiter=rate_limiter, companies=load_place_companies(place_ids_file))
+    failed = []
+    total_reviews = 0
+
+    with StreamingExporter(name, directory=shards_dir) as exporter:
+        for place_id, place in api.iter_places(place_ids, batch_size, keep=False):
+            if place is None:
+                failed.append(place_id)
+                continue
+            exporter.write(place)
+            total_reviews += len(place.reviews)
+
+    manifest = {
+        'shard': index,
+        'num_shards': num_shards,
+        'place_ids': len(place_ids),
+        'places_written': exporter.places_written,
+        'total_reviews': total_reviews,
+        'failed_place_ids': failed,
+        'json_file': exporter.json_file,
+        'completed_at': datetime.now().isoformat()
+    }
+    with open(f"{shards_dir}/{name}.manifest.json", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info(f"Shard {index + 1}/{num_shards} done: {exporter.places_written} places, {len(failed)} failed")
+    return manifest
+
+
+def run_key_shards(indexes: List[int], num_shards: int, api_key: str,
+                   place_ids_file: str = "place_razao_table.json", shards_dir: str = SHARDS_DIR,
+                   batch_size: int = 10) -> List[Dict]:
+    """
+    Run every shard assigned to one API key, paced by a single rate limiter
+
+    The shards run concurrently in threads of this process, so together they
+    stay within the key's quota instead of each pacing itself as if it had
+    the key to itself.
+
+    Args:
+        indexes: Shard indexes assigned to the key
+        num_shards: Total number of shards
+        api_key: Google Places API key
+        place_ids_file: JSON file with the place IDs
+        shards_dir: Directory for shard outputs
+        batch_size: Number of places between progress log lines
+
+    Returns:
+        List of shard manifests, in the order of indexes
+    """
+    limiter = AIMDRateLimiter()
+    with ThreadPoolExecutor(max_workers=len(indexes)) as threads:
+        futures = [
+            threads.submit(run_shard, index, num_shards, api_key, place_ids_file, shards_dir, batch_size, limiter)
+            for index in indexes
+        ]
+        return [future.result() for future in futures]
+
+
+def run_all_shards(num_shards: int, api_keys: List[str], place_ids_file: str = "place_razao_table.json",
+                   shards_dir: str = SHARDS_DIR, batch_size: int = 10, workers: int = None) -> List[Dict]:
+    """
+    Run every shard on this machine, one worker process per API key
+
+    Shards are assigned to keys round-robin; each key's process runs all of
+    its shards under one rate limiter (see run_key_shards).
+
+    Args:
+        num_shards: Total number of shards
+        api_keys: API keys, assigned to shards round-robin
+        place_ids_file: JSON file with the place IDs
+        shards_dir: Directory for shard outputs
+        batch_size: Number of places between progress log lines
+        workers: Number of worker processes (defaults to one per key in use)
+
+    Returns:
+        List of shard manifests, ordered by shard index
+    """
+    if not api_keys:
+        raise ValueError("At least one API key is required")
+
+    assignments: Dict[str, List[int]] = {}
+    for index in range(num_shards):
+        assignments.setdefault(api_keys[index % len(api_keys)], []).append(index)
+
+    with ProcessPoolExecutor(max_workers=workers or len(assignments)) as pool:
+        futures = [
+            pool.submit(run_key_shards, indexes, num_shards, api_key, place_ids_file, shards_dir, batch_size)
+            for api_key, indexes in assignments.items()
+        ]
+        manifests = [manifest for future in futures for manifest in future.result()]
+    return sorted(manifests, key=lambda manifest: manifest['shard'])
+
+
+def _iter_shard(json_file: str) -> Iterator[Dict]:
+    with open(json_file, 'r', encoding='utf-8') as f:
+        places = json.load(f)
+    # Shards fetch their IDs in sorted order; sort anyway so hand-edited or
+    # older shard files still merge deterministically
+    return iter(sorted(places, key=lambda place: place['place_id']))
+
+
+def merge_shards(num_shards: int, filename: str = None, shards_dir: str = SHARDS_DIR,
+                 output_dir: str = "data", snapshots_dir: Optional[str] = SNAPSHOTS_DIR) -> str:
+    """
+    Merge shard outputs into the usual CSV and JSON exports
+
+    Places are k-way merged in place_id order and duplicates are dropped, so
+    the result only depends on the shard contents, not on which worker
+    finished first.
+
+    Args:
+        num_shards: Total number of shards
+        filename: Base filename of the merged export (without extension)
+        shards_dir: Directory with shard outputs
+        output_dir: Directory for the merged export
+        snapshots_dir: Snapshot store the merged run is added to (None skips it)
+
+    Returns:
+        Base path of the created files (same convention as export_to_csv)
+    """
+    manifests = []
+    for index in range(num_shards):
+        manifest_file = Path(shards_dir) / f"{shard_name(index, num_shards)}.manifest.json"
+        if not manifest_file.exists():
+            raise FileNotFoundError(f"Shard {index} has not finished: {manifest_file} is missing")
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifests.append(json.load(f))
+
+    if filename is None:
+        filename = f"raizen_places_reviews_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    shard_files = [
+        str(Path(shards_dir) / f"{shard_name(index, num_shards)}.json") for index in range(num_shards)
+    ]
+    merged = heapq.merge(*(_iter_shard(path) for path in shard_files), key=lambda place: place['place_id'])
+
+    last_place_id = None
+    with StreamingExporter(filename, directory=output_dir) as exporter:
+        for place in merged:
+            if place['place_id'] == last_place_id:
+                continue
+            last_place_id = place['place_id']
+            exporter.write(place_from_json_dict(place))
+
+    failed = sum(len(manifest['failed_place_ids']) for manifest in manifests)
+    logger.info(f"Merged {num_shards} shards: {exporter.places_written} places, {failed} failed place IDs")
+    if snapshots_dir:
+        SnapshotStore(snapshots_dir).write_json_export(exporter.json_file)
+    return exporter.base_path
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Sharded Google Places extraction")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    shard_parser = subparsers.add_parser('shard', help="Extract a single shard")
+    shard_parser.add_argument('--index', type=int, required=True)
+    shard_parser.add_argument('--api-key', default=os.environ.get('GOOGLE_PLACES_API_KEY'))
+
+    run_parser = subparsers.add_parser('run', help="Extract all shards locally, then merge")
+    run_parser.add_argument('--api-keys', default=os.environ.get('GOOGLE_PLACES_API_KEY', ''),
+                            help="Comma-separated API keys, assigned to shards round-robin")
+    run_parser.add_argument('--workers', type=int)
+
+    merge_parser = subparsers.add_parser('merge', help="Merge finished shard outputs")
+
+    for sub in (shard_parser, run_parser, merge_parser):
+        sub.add_argument('--shards', type=int, required=True)
+        sub.add_argument('--shards-dir', default=SHARDS_DIR)
+    for sub in (shard_parser, run_parser):
+        sub.add_argument('--place-ids-file', default="place_razao_table.json")
+        sub.add_argument('--batch-size', type=int, default=10)
+    for sub in (run_parser, merge_parser):
+        sub.add_argument('--output', help="Base filename of the merged export")
+        sub.add_argument('--snapshots-dir', default=SNAPSHOTS_DIR,
+                         help="Snapshot store for the merged run ('' to skip)")
+
+    args = parser.parse_args()
+
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+    if args.command == 'shard':
+        if not 0 <= args.index < args.shards:
+            parser.error(f"--index must be in [0, {args.shards})")
+        if not args.api_key:
+            parser.error("--api-key (or GOOGLE_PLACES_API_KEY) is required")
+        run_shard(args.index, args.shards, args.api_key, args.place_ids_file, args.shards_dir, args.batch_size)
+    elif args.command == 'run':
+        api_keys = [key.strip() for key in args.api_keys.split(',') if key.strip()]
+        run_all_shards(args.shards, api_keys, args.place_ids_file, args.shards_dir, args.batch_size, args.workers)
+    if args.command in ('run', 'merge'):
+        merged = merge_shards(args.shards, args.output, args.shards_dir, snapshots_dir=args.snapshots_dir)
+        print(f"✅ Merged export: {merged}")
+
+
+if __name__ == "__main__":
+    main()
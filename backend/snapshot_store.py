@@ -0,0 +1,339 @@
+"""
+Compressed snapshot storage with delta encoding between runs
+
+Instead of writing a full pretty-printed JSON (plus two CSVs) for every
+extraction, a SnapshotStore keeps one gzip-compressed base snapshot followed
+by per-run deltas: places added, removed and changed, and reviews added,
+changed and removed, keyed by place_id and review identity
+(author_name, time). Any snapshot can be rebuilt by replaying the deltas on
+top of the nearest base, and a fresh base is written every ``rebase_every``
+runs to keep rebuilds cheap. Snapshots are keyed by place_id, so a place
+listed twice in an export is stored once (the last occurrence wins).
+
+Reviews are stored with their stable fields only. ``relative_time_description``
+("3 weeks ago") and ``review_date`` change with every run without the review
+changing, so they are not stored: review_date is rebuilt from the timestamp
+when a snapshot is read, and relative_time_description comes back empty.
+
+Usage:
+    python snapshot_store.py import data/raizen_places_reviews_*.json
+    python snapshot_store.py list
+    python snapshot_store.py export <run_id> --output restored_run
+"""
+
+import argparse
+import gzip
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOTS_DIR = "data/snapshots"
+
+# Fields that describe a place (everything in the JSON export but its reviews)
+PLACE_FIELDS = (
+    'place_id', 'name', 'rating', 'user_ratings_total', 'address', 'phone_number',
+    'website', 'business_status', 'price_level', 'latitude', 'longitude', 'company'
+)
+
+# Review fields that only change when the review itself does
+REVIEW_FIELDS = ('author_name', 'rating', 'text', 'time', 'language')
+
+
+def review_identity(review: Dict) -> Tuple[str, int]:
+    """Identity of a review within a place: (author_name, time)"""
+    return review.get('author_name', ''), int(review.get('time', 0) or 0)
+
+
+def _index_places(places: List[Dict]) -> Dict[str, Dict]:
+    return {place['place_id']: place for place in places}
+
+
+def stable_review(review: Dict) -> Dict:
+    """A review reduced to REVIEW_FIELDS"""
+    return {field: review[field] for field in REVIEW_FIELDS if field in review}
+
+
+def _stable_place(place: Dict) -> Dict:
+    return {**place, 'reviews': [stable_review(review) for review in place.get('reviews', [])]}
+
+
+def _with_review_dates(place: Dict) -> Dict:
+    reviews = [{**review, 'review_date': datetime.fromtimestamp(review['time']).strftime('%Y-%m-%d %H:%M:%S')
+                if review.get('time') else ''} for review in place.get('reviews', [])]
+    return {**place, 'reviews': reviews}
+
+
+def diff_snapshots(old_places: List[Dict], new_places: List[Dict]) -> Dict:
+    """
+    Compute the delta that turns one snapshot into another
+
+    Args:
+        old_places: Places in the JSON export structure
+        new_places: Places in the JSON export structure
+
+    Returns:
+        Delta dictionary (see apply_delta)
+    """
+    old_index = _index_places(old_places)
+    new_index = _index_places(new_places)
+
+    delta = {
+        'places_added': [],
+        'places_removed': sorted(set(old_index) - set(new_index)),
+        'places_changed': {},
+        'reviews_upserted': {},
+        'reviews_removed': {},
+        'review_order': {}
+    }
+
+    for place_id in sorted(new_index):
+        new_place = new_index[place_id]
+        old_place = old_index.get(place_id)
+        if old_place is None:
+            delta['places_added'].append(new_place)
+            continue
+
+        changed = {field: new_place.get(field) for field in PLACE_FIELDS
+                   if new_place.get(field) != old_place.get(field)}
+        if changed:
+            delta['places_changed'][place_id] = changed
+
+        old_reviews = {review_identity(review): stable_review(review) for review in old_place.get('reviews', [])}
+        new_reviews = {review_identity(review): stable_review(review) for review in new_place.get('reviews', [])}
+
+        upserted = [review for key, review in new_reviews.items() if old_reviews.get(key) != review]
+        removed = [list(key) for key in old_reviews if key not in new_reviews]
+        if upserted:
+            delta['reviews_upserted'][place_id] = upserted
+        if removed:
+            delta['reviews_removed'][place_id] = removed
+        if upserted or removed or list(old_reviews) != list(new_reviews):
+            delta['review_order'][place_id] = [list(key) for key in new_reviews]
+
+    return delta
+
+
+def apply_delta(places: List[Dict], delta: Dict) -> List[Dict]:
+    """
+    Apply a delta produced by diff_snapshots
+
+    Args:
+        places: Places in the JSON export structure
+        delta: Delta dictionary
+
+    Returns:
+        New list of places, ordered by place_id
+    """
+    index = _index_places(places)
+
+    for place_id in delta['places_removed']:
+        index.pop(place_id, None)
+    for place in delta['places_added']:
+        index[place['place_id']] = place
+
+    for place_id, changed in delta['places_changed'].items():
+        index[place_id] = {**index[place_id], **changed}
+
+    for place_id, order in delta['review_order'].items():
+        place = index[place_id]
+        reviews = {review_identity(review): review for review in place.get('reviews', [])}
+        for review in delta['reviews_upserted'].get(place_id, []):
+            reviews[review_identity(review)] = review
+        for key in delta['reviews_removed'].get(place_id, []):
+            reviews.pop(tuple(key), None)
+        index[place_id] = {**place, 'reviews': [reviews[tuple(key)] for key in order]}
+
+    return [index[place_id] for place_id in sorted(index)]
+
+
+class SnapshotStore:
+    """Directory of gzip-compressed base snapshots and per-run deltas"""
+
+    def __init__(self, directory: str = SNAPSHOTS_DIR, rebase_every: int = 30):
+        """
+        Args:
+            directory: Directory holding the snapshots and manifest
+            rebase_every: Write a full base snapshot after this many deltas
+        """
+        self.directory = Path(directory)
+        self.rebase_every = rebase_every
+        self.manifest_file = self.directory / "manifest.json"
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict:
+        if self.manifest_file.exists():
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'snapshots': []}
+
+    def _save_manifest(self):
+        tmp_file = self.manifest_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        tmp_file.replace(self.manifest_file)
+
+    def _write(self, filename: str, payload) -> int:
+        path = self.directory / filename
+        data = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        with gzip.open(path, 'wb') as f:
+            f.write(data)
+        return path.stat().st_size
+
+    def _read(self, filename: str):
+        with gzip.open(self.directory / filename, 'rb') as f:
+            return json.loads(f.read().decode('utf-8'))
+
+    def runs(self) -> List[Dict]:
+        """Return the manifest entries, oldest first"""
+        return list(self.manifest['snapshots'])
+
+    def write(self, places: List[Dict], run_id: Optional[str] = None) -> Dict:
+        """
+        Store a new snapshot as a delta against the latest one (or as a base)
+
+        Args:
+            places: Places in the JSON export structure
+            run_id: Snapshot identifier (defaults to a timestamp)
+
+        Returns:
+            Manifest entry of the stored snapshot
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        run_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+        if any(entry['run_id'] == run_id for entry in self.manifest['snapshots']):
+            raise ValueError(f"Snapshot '{run_id}' already exists")
+
+        places = [_stable_place(place) for _, place in sorted(_index_places(places).items())]
+        snapshots = self.manifest['snapshots']
+        deltas_since_base = 0
+        for entry in reversed(snapshots):
+            if entry['type'] == 'base':
+                break
+            deltas_since_base += 1
+
+        if not snapshots or deltas_since_base >= self.rebase_every:
+            entry = {'run_id': run_id, 'type': 'base', 'file': f"base_{run_id}.json.gz"}
+            entry['bytes'] = self._write(entry['file'], places)
+        else:
+            delta = diff_snapshots(self._replay(), places)
+            entry = {'run_id': run_id, 'type': 'delta', 'file': f"delta_{run_id}.json.gz"}
+            entry['bytes'] = self._write(entry['file'], delta)
+            entry['changes'] = {
+                'places_added': len(delta['places_added']),
+                'places_removed': len(delta['places_removed']),
+                'places_changed': len(delta['places_changed']),
+                'reviews_upserted': sum(len(reviews) for reviews in delta['reviews_upserted'].values()),
+                'reviews_removed': sum(len(keys) for keys in delta['reviews_removed'].values())
+            }
+
+        entry['places'] = len(places)
+        snapshots.append(entry)
+        self._save_manifest()
+        logger.info(f"Snapshot {run_id} stored as {entry['type']} ({entry['bytes']:,} bytes)")
+        return entry
+
+    def write_json_export(self, json_file: str, run_id: Optional[str] = None) -> Dict:
+        """
+        Store a JSON export (export_to_json or StreamingExporter output) as a snapshot
+
+        Args:
+            json_file: Path to the JSON export
+            run_id: Snapshot identifier (defaults to the file name)
+
+        Returns:
+            Manifest entry of the stored snapshot
+        """
+        with open(json_file, 'r', encoding='utf-8') as f:
+            places = json.load(f)
+        return self.write(places, run_id=run_id or Path(json_file).stem)
+
+    def read(self, run_id: Optional[str] = None) -> List[Dict]:
+        """
+        Rebuild a snapshot
+
+        Args:
+            run_id: Snapshot identifier (defaults to the latest)
+
+        Returns:
+            Places in the JSON export structure, ordered by place_id
+        """
+        return [_with_review_dates(place) for place in self._replay(run_id)]
+
+    def _replay(self, run_id: Optional[str] = None) -> List[Dict]:
+        """Replay base and deltas up to a snapshot (reviews with stable fields only)"""
+        snapshots = self.manifest['snapshots']
+        if not snapshots:
+            return []
+
+        if run_id is None:
+            position = len(snapshots) - 1
+        else:
+            positions = [i for i, entry in enumerate(snapshots) if entry['run_id'] == run_id]
+            if not positions:
+                raise KeyError(f"Unknown snapshot '{run_id}'")
+            position = positions[0]
+
+        base_position = max(i for i in range(position + 1) if snapshots[i]['type'] == 'base')
+        places = self._read(snapshots[base_position]['file'])
+        for entry in snapshots[base_position + 1:position + 1]:
+            places = apply_delta(places, self._read(entry['file']))
+        return places
+
+    def export(self, run_id: Optional[str] = None, filename: Optional[str] = None,
+               directory: str = "data") -> str:
+        """
+        Rebuild a snapshot into the usual CSV and JSON exports
+
+        Args:
+            run_id: Snapshot identifier (defaults to the latest)
+            filename: Base filename (without extension)
+            directory: Output directory
+
+        Returns:
+            Base path of the created files (same convention as export_to_csv)
+        """
+        from google_places_extractor import StreamingExporter, place_from_json_dict
+
+        run_id = run_id or self.manifest['snapshots'][-1]['run_id']
+        with StreamingExporter(filename or f"raizen_places_reviews_{run_id}", directory=directory) as exporter:
+            for place in self.read(run_id):
+                exporter.write(place_from_json_dict(place))
+        return exporter.base_path
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Compressed snapshot store for extraction runs")
+    parser.add_argument('--directory', default=SNAPSHOTS_DIR)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help="Add existing JSON exports as snapshots")
+    import_parser.add_argument('json_files', nargs='+')
+
+    subparsers.add_parser('list', help="List stored snapshots")
+
+    export_parser = subparsers.add_parser('export', help="Rebuild a snapshot as CSV/JSON files")
+    export_parser.add_argument('run_id', nargs='?')
+    export_parser.add_argument('--output', help="Base filename (without extension)")
+
+    args = parser.parse_args()
+    store = SnapshotStore(args.directory)
+
+    if args.command == 'import':
+        for json_file in sorted(args.json_files):
+            entry = store.write_json_export(json_file)
+            print(f"📦 {entry['run_id']}: {entry['type']}, {entry['bytes']:,} bytes")
+    elif args.command == 'list':
+        for entry in store.runs():
+            print(f"{entry['run_id']}: {entry['type']}, {entry['places']} places, {entry['bytes']:,} bytes")
+    else:
+        print(f"✅ Snapshot exported: {store.export(args.run_id, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Opt-in stage profiling for the analysis pipeline
+
+Methods decorated with ``@profiled_stage`` record wall time, CPU time and
+peak traced memory (tracemalloc) when their object has an active
+``StageProfiler`` in ``self.profiler``; with profiling off the wrapper only
+checks that attribute. Optionally a cProfile dump is written per stage call,
+to be inspected with ``python -m pstats`` or snakeviz.
+
+CPU time is process-wide and tracemalloc peaks are global, so numbers are
+exact when stages run one after another; when stages overlap, a stage's CPU
+time and peak include its concurrent neighbours.
+"""
+
+import cProfile
+import functools
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StageProfiler:
+    """Collects per-stage wall time, CPU time and peak memory"""
+
+    def __init__(self, profile_dir: Optional[str] = None, trace_memory: bool = True):
+        """
+        Args:
+            profile_dir: If set, write a cProfile dump per stage call here
+            trace_memory: Record peak memory with tracemalloc (slows
+                allocation-heavy code while on)
+        """
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.trace_memory = trace_memory
+        self.records: List[Dict] = []
+        self._calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._started_tracing = False
+
+        if self.profile_dir:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+
+    def _label(self, name: str) -> str:
+        with self._lock:
+            count = self._calls[name] = self._calls.get(name, 0) + 1
+        return name if count == 1 else f"{name}#{count}"
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Profile the enclosed block as one stage
+
+        Args:
+            name: Stage name; repeated names get a ``#n`` suffix
+        """
+        label = self._label(name)
+
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+
+        profile = None
+        if self.profile_dir:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is already active (concurrent stages on 3.12+)
+                profile = None
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+
+            record = {'stage': label, 'wall_s': wall, 'cpu_s': cpu, 'peak_mb': None}
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                record['peak_mb'] = max(peak - memory_before, 0) / 1024 ** 2
+            if profile is not None:
+                dump = self.profile_dir / f"{label.replace('#', '_')}.prof"
+                profile.dump_stats(str(dump))
+                record['profile'] = str(dump)
+
+            with self._lock:
+                self.records.append(record)
+            logger.debug(f"Stage {label}: {wall:.3f}s wall, {cpu:.3f}s CPU")
+
+    def summary(self) -> str:
+        """Return a text table of every recorded stage, slowest first"""
+        total_wall = sum(record['wall_s'] for record in self.records) or 1.0
+        lines = [
+            f"{'Stage':<34} {'Wall (s)':>9} {'CPU (s)':>9} {'Peak (MB)':>10} {'Share':>7}",
+            '-' * 73
+        ]
+        for record in sorted(self.records, key=lambda r: r['wall_s'], reverse=True):
+            peak = f"{record['peak_mb']:.1f}" if record['peak_mb'] is not None else '-'
+            lines.append(
+                f"{record['stage']:<34} {record['wall_s']:>9.3f} {record['cpu_s']:>9.3f} "
+                f"{peak:>10} {record['wall_s'] / total_wall:>7.1%}"
+            )
+        return '\n'.join(lines)
+
+    def save(self, path: str) -> str:
+        """
+        Write the records as JSON
+
+        Args:
+            path: Output file path
+
+        Returns:
+            Path to the written file
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.records, f, indent=2)
+        return path
+
+    def close(self):
+        """Stop tracemalloc if this profiler started it"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+
+def profiled_stage(method=None, *, name: Optional[str] = None):
+    """
+    Decorate a method so it is recorded as a stage when ``self.profiler`` is set
+
+    Args:
+        method: Method to wrap (when used without arguments)
+        name: Stage name, defaults to the method name
+    """
+    def decorate(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            profiler = self.profiler
+            if profiler is None:
+                return func(self, *args, **kwargs)
+            with profiler.stage(stage_name):
+                return func(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorate(method) if method is not None else decorate
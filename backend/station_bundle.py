@@ -0,0 +1,210 @@
+"""
+Precomputed station bundle for the React frontend
+
+Validates and deduplicates the extracted stations once on the backend, keeps
+only the fields the UI reads, rounds coordinates to a fixed precision and
+writes a content-versioned JSON file together with gzip (and, when the
+``brotli`` package is installed, brotli) pre-compressed copies. The web app
+serves the bundle with an ETag equal to its version, so the browser gets a
+ready-to-render list and revalidates it with a 304.
+
+Usage:
+    python station_bundle.py data/raizen_places_reviews_20250609_150209.json
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import math
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional: bundles are still served gzip-compressed
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_DIR = "data/bundle"
+BUNDLE_FORMAT = 1
+
+# Coordinates are rounded to 5 decimals (~1 m), plenty for map markers
+COORDINATE_PRECISION = 5
+
+# Only what the frontend components read
+STATION_FIELDS = ('place_id', 'name', 'rating', 'user_ratings_total', 'address', 'phone_number',
+                  'website', 'business_status', 'price_level')
+REVIEW_FIELDS = ('author_name', 'rating', 'text', 'time', 'relative_time_description', 'language')
+
+
+def is_valid_station(station) -> bool:
+    """Same rules as the frontend's dataUtils.isValidStation"""
+    if not isinstance(station, dict) or not station.get('place_id') or not station.get('name'):
+        return False
+    latitude, longitude = station.get('latitude'), station.get('longitude')
+    if not isinstance(latitude, (int, float)) or not isinstance(longitude, (int, float)):
+        return False
+    if math.isnan(latitude) or math.isnan(longitude):
+        return False
+    return -90 <= latitude <= 90 and -180 <= longitude <= 180
+
+
+def _compact(record: Dict, fields: Iterable[str]) -> Dict:
+    # Missing/empty values are dropped; the UI treats undefined like null
+    return {field: record[field] for field in fields if record.get(field) not in (None, '')}
+
+
+def build_station_bundle(stations: Iterable[Dict]) -> Dict:
+    """
+    Validate, deduplicate and slim down stations for the frontend
+
+    Args:
+        stations: Station dictionaries in the JSON export structure
+
+    Returns:
+        Bundle dictionary with format, version, stats and stations
+    """
+    seen = set()
+    compact = []
+    total = invalid = duplicates = 0
+
+    for station in stations:
+        total += 1
+        if not is_valid_station(station):
+            invalid += 1
+            continue
+        # First occurrence wins, as in the frontend's removeDuplicateStations
+        if station['place_id'] in seen:
+            duplicates += 1
+            continue
+        seen.add(station['place_id'])
+
+        entry = _compact(station, STATION_FIELDS)
+        entry['latitude'] = round(station['latitude'], COORDINATE_PRECISION)
+        entry['longitude'] = round(station['longitude'], COORDINATE_PRECISION)
+        entry['reviews'] = [_compact(review, REVIEW_FIELDS) for review in station.get('reviews') or []]
+        compact.append(entry)
+
+    encoded = json.dumps(compact, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return {
+        'format': BUNDLE_FORMAT,
+        'version': hashlib.sha1(encoded).hexdigest()[:16],
+        'stats': {'original': total, 'invalid': invalid, 'duplicates': duplicates, 'stations': len(compact)},
+        'stations': compact
+    }
+
+
+def write_station_bundle(stations: Iterable[Dict], output_dir: str = BUNDLE_DIR) -> Dict:
+    """
+    Build the bundle and write it with its compressed variants
+
+    Writes ``stations.<version>.json`` (plus ``.gz`` and ``.br``) and points
+    ``manifest.json`` at the new version; older versions are removed.
+
+    Args:
+        stations: Station dictionaries in the JSON export structure
+        output_dir: Bundle directory
+
+    Returns:
+        Manifest dictionary (version, files, sizes, stats)
+    """
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+
+    bundle = build_station_bundle(stations)
+    version = bundle['version']
+    raw = json.dumps(bundle, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    files = {'identity': f"stations.{version}.json", 'gzip': f"stations.{version}.json.gz"}
+    variants = {'identity': raw, 'gzip': gzip.compress(raw, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        files['br'] = f"stations.{version}.json.br"
+        variants['br'] = brotli.compress(raw, quality=11)
+
+    for encoding, data in variants.items():
+        (output / files[encoding]).write_bytes(data)
+
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'version': version,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'files': files,
+        'sizes': {encoding: len(data) for encoding, data in variants.items()},
+        'stats': bundle['stats']
+    }
+    with open(output / "manifest.json", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Drop superseded versions
+    current = set(files.values())
+    for stale in output.glob("stations.*.json*"):
+        if stale.name not in current:
+            stale.unlink()
+
+    logger.info(f"Station bundle {version}: {bundle['stats']} {manifest['sizes']}")
+    return manifest
+
+
+class StationBundleCache:
+    """In-memory copy of the latest bundle variants, reloaded when the manifest changes"""
+
+    def __init__(self, bundle_dir: str = BUNDLE_DIR):
+        self.bundle_dir = Path(bundle_dir)
+        self._current: Optional[Tuple[Dict, Dict[str, bytes]]] = None
+        self._mtime = None
+
+    def get(self) -> Optional[Tuple[Dict, Dict[str, bytes]]]:
+        """
+        Return the current manifest and its variant bytes keyed by encoding,
+        or None if no bundle has been built
+        """
+        manifest_file = self.bundle_dir / "manifest.json"
+        if not manifest_file.exists():
+            return None
+        mtime = manifest_file.stat().st_mtime
+        if mtime != self._mtime:
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            variants = {encoding: (self.bundle_dir / name).read_bytes()
+                        for encoding, name in manifest['files'].items()}
+            # Swap manifest and bytes together so readers never mix versions
+            self._current = (manifest, variants)
+            self._mtime = mtime
+        return self._current
+
+    @staticmethod
+    def negotiate(variants: Dict[str, bytes], accept_encoding: str) -> str:
+        """Pick the best pre-compressed variant for an Accept-Encoding header"""
+        accepted = {part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')}
+        for encoding in ('br', 'gzip'):
+            if encoding in variants and encoding in accepted:
+                return encoding
+        return 'identity'
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Build the precomputed station bundle for the frontend")
+    parser.add_argument('json_files', nargs='+', help="JSON exports of the extractor")
+    parser.add_argument('--output-dir', default=BUNDLE_DIR)
+    args = parser.parse_args()
+
+    stations: List[Dict] = []
+    for json_file in args.json_files:
+        with open(json_file, 'r', encoding='utf-8') as f:
+            stations.extend(json.load(f))
+
+    manifest = write_station_bundle(stations, args.output_dir)
+    print(f"📦 Station bundle {manifest['version']} written to {args.output_dir}/")
+    print(f"   • Stations: {manifest['stats']['stations']} "
+          f"(removed {manifest['stats']['invalid']} invalid, {manifest['stats']['duplicates']} duplicates)")
+    print(f"   • Sizes: " + ', '.join(f"{encoding} {size:,} B" for encoding, size in manifest['sizes'].items()))
+
+
+if __name__ == "__main__":
+    main()
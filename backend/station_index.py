@@ -0,0 +1,337 @@
+"""
+Memory-mapped binary station/score index for the web app
+
+The analysis step writes every station's coordinates, Places metadata and
+review-sentiment metrics as one fixed-width NumPy record per station, plus a
+string table for place IDs, names and addresses, into a single file. The web
+app maps that file read-only at startup: nothing is parsed, worker processes
+share the same page-cache pages, and lookups only touch the records they read.
+
+File layout (all sections 64-byte aligned, little-endian):
+    magic ``RZSTIDX1`` | uint32 header length | JSON header (first 4 KiB)
+    records         RECORD_DTYPE x count
+    order           uint32 x count, record numbers sorted by place_id
+    string_offsets  uint64 x (strings + 1)
+    string_data     UTF-8 bytes
+
+Usage:
+    python station_index.py build data/raizen_places_reviews_..._places.csv \
+        --stations data/station_sentiment_analysis.csv
+    python station_index.py get ChIJNfsZ_rhXuAARjNK8xskk1zU
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+STATION_INDEX_FILE = "data/station_index.bin"
+INDEX_FORMAT = 1
+
+_MAGIC = b'RZSTIDX1'
+_ALIGN = 64
+# Reserved for magic, length and JSON header; records start right after
+_HEADER_SIZE = 4096
+
+RECORD_DTYPE = np.dtype([
+    ('latitude', '<f8'),
+    ('longitude', '<f8'),
+    ('rating', '<f4'),
+    ('avg_rating', '<f4'),
+    ('avg_polarity', '<f4'),
+    ('positive_ratio', '<f4'),
+    ('negative_ratio', '<f4'),
+    ('user_ratings_total', '<i4'),
+    ('total_reviews', '<i4'),
+    ('positive_reviews', '<i4'),
+    ('negative_reviews', '<i4'),
+    ('neutral_reviews', '<i4'),
+    ('sentiment_score', '<i4'),
+    ('place_id', '<u4'),
+    ('name', '<u4'),
+    ('address', '<u4'),
+])
+
+STRING_FIELDS = ('place_id', 'name', 'address')
+METRIC_FIELDS = tuple(field for field in RECORD_DTYPE.names if field not in STRING_FIELDS)
+
+_FLOAT32_FIELDS = frozenset(field for field in METRIC_FIELDS if RECORD_DTYPE[field] == np.dtype('<f4'))
+
+# Stations without scored reviews keep NaN averages and zero counts
+_MISSING = {field: (np.nan if RECORD_DTYPE[field].kind == 'f' else 0) for field in METRIC_FIELDS}
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def write_station_index(places_df: pd.DataFrame, station_df: Optional[pd.DataFrame] = None,
+                        path: str = STATION_INDEX_FILE) -> Dict:
+    """
+    Write the binary index of every station in places_df
+
+    Args:
+        places_df: Places with place_id, name, address, coordinates and ratings
+        station_df: Output of analyze_by_station; its metrics are joined on
+            place_id (stations missing from it get NaN averages and zero counts)
+        path: Output file path
+
+    Returns:
+        Header dictionary
+    """
+    places = places_df.drop_duplicates('place_id').reset_index(drop=True)
+    if station_df is not None and len(station_df):
+        metrics = [column for column in METRIC_FIELDS if column in station_df.columns and column not in places.columns]
+        places = places.merge(station_df[['place_id'] + metrics].drop_duplicates('place_id'),
+                              on='place_id', how='left')
+
+    count = len(places)
+    records = np.zeros(count, dtype=RECORD_DTYPE)
+    for field in METRIC_FIELDS:
+        if field in places.columns:
+            values = pd.to_numeric(places[field], errors='coerce')
+            records[field] = values.fillna(_MISSING[field]).to_numpy()
+        else:
+            records[field] = _MISSING[field]
+
+    # String table, with repeated names/addresses stored once
+    strings: List[str] = []
+    string_ids: Dict[str, int] = {}
+    for field in STRING_FIELDS:
+        column = places[field] if field in places.columns else pd.Series([''] * count)
+        refs = np.empty(count, dtype=np.uint32)
+        for row, value in enumerate(column):
+            text = value if isinstance(value, str) else ''
+            ref = string_ids.get(text)
+            if ref is None:
+                ref = string_ids[text] = len(strings)
+                strings.append(text)
+            refs[row] = ref
+        records[field] = refs
+
+    encoded = [text.encode('utf-8') for text in strings]
+    string_offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+    np.cumsum([len(data) for data in encoded], out=string_offsets[1:])
+    string_data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    order = np.argsort(np.array([strings[ref] for ref in records['place_id']], dtype=object),
+                       kind='stable').astype('<u4')
+
+    sections = [('records', records), ('order', order),
+                ('string_offsets', string_offsets), ('string_data', string_data)]
+    header = {
+        'format': INDEX_FORMAT,
+        'count': count,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'record_dtype': RECORD_DTYPE.descr,
+        'sections': {}
+    }
+    offset = _HEADER_SIZE
+    for name, array in sections:
+        header['sections'][name] = {'offset': offset, 'length': len(array)}
+        offset = _aligned(offset + array.nbytes)
+    header_bytes = json.dumps(header).encode('utf-8')
+    if len(_MAGIC) + 4 + len(header_bytes) > _HEADER_SIZE:
+        raise RuntimeError("Station index header does not fit its reserved space")
+
+    # Write next to the target and swap, so mapped readers keep the old inode
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(_MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes)
+        for name, array in sections:
+            f.seek(header['sections'][name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(offset)
+    os.replace(temporary, path)
+
+    logger.info(f"Station index saved: {path} ({count} stations, {offset:,} bytes)")
+    return header
+
+
+class StationIndex:
+    """Read-only view of a station index file through one memory map"""
+
+    def __init__(self, path: str = STATION_INDEX_FILE):
+        """
+        Args:
+            path: Index file written by write_station_index
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{path} is not a station index")
+        start = len(_MAGIC) + 4
+        header_length = struct.unpack('<I', self._map[len(_MAGIC):start])[0]
+        self.header = json.loads(self._map[start:start + header_length])
+        if self.header['format'] != INDEX_FORMAT:
+            raise ValueError(f"Unsupported station index format {self.header['format']}")
+
+        self.records = self._section('records', RECORD_DTYPE)
+        self._order = self._section('order', np.dtype('<u4'))
+        self._string_offsets = self._section('string_offsets', np.dtype('<u8'))
+        self._string_base = self.header['sections']['string_data']['offset']
+
+    @classmethod
+    def load(cls, path: str = STATION_INDEX_FILE) -> 'StationIndex':
+        return cls(path)
+
+    def _section(self, name: str, dtype: np.dtype) -> np.ndarray:
+        # Read-only arrays backed directly by the mapped pages
+        section = self.header['sections'][name]
+        return np.frombuffer(self._map, dtype=dtype, count=section['length'], offset=section['offset'])
+
+    def __len__(self) -> int:
+        return self.header['count']
+
+    def string(self, ref: int) -> str:
+        """Decode one entry of the string table"""
+        start = self._string_base + int(self._string_offsets[ref])
+        end = self._string_base + int(self._string_offsets[ref + 1])
+        return self._map[start:end].decode('utf-8')
+
+    def place_id_at(self, position: int) -> str:
+        return self.string(int(self.records['place_id'][position]))
+
+    def position(self, place_id: str) -> int:
+        """
+        Record number of a station (binary search over the sorted order)
+
+        Raises:
+            KeyError: If the station is not in the index
+        """
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.place_id_at(int(self._order[middle])) < place_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self) and self.place_id_at(int(self._order[low])) == place_id:
+            return int(self._order[low])
+        raise KeyError(f"Station {place_id} is not in the index")
+
+    def record(self, position: int) -> Dict:
+        """One station as a JSON-ready dictionary (NaN metrics become None)"""
+        row = self.records[position]
+        station = {field: self.string(int(row[field])) for field in STRING_FIELDS}
+        for field in METRIC_FIELDS:
+            value = row[field].item()
+            if isinstance(value, float):
+                if value != value:
+                    value = None
+                elif field in _FLOAT32_FIELDS:
+                    # Drop the digits float32 storage never had (3.9, not 3.9000000953674316)
+                    value = float(f"{value:.7g}")
+            station[field] = value
+        return station
+
+    def get(self, place_id: str) -> Dict:
+        """
+        Look up a station by place_id
+
+        Raises:
+            KeyError: If the station is not in the index
+        """
+        return self.record(self.position(place_id))
+
+    def select(self, bbox: Optional[Sequence[float]] = None, min_reviews: int = 0) -> np.ndarray:
+        """
+        Record numbers of stations inside a bounding box with enough reviews
+
+        Args:
+            bbox: (min_lat, min_lng, max_lat, max_lng)
+            min_reviews: Minimum scored reviews
+
+        Returns:
+            Array of record numbers
+        """
+        mask = self.records['total_reviews'] >= min_reviews
+        if bbox is not None:
+            min_lat, min_lng, max_lat, max_lng = bbox
+            latitude, longitude = self.records['latitude'], self.records['longitude']
+            mask &= (latitude >= min_lat) & (latitude <= max_lat) & (longitude >= min_lng) & (longitude <= max_lng)
+        return np.flatnonzero(mask)
+
+    def top(self, metric: str = 'sentiment_score', limit: int = 20, ascending: bool = False,
+            bbox: Optional[Sequence[float]] = None, min_reviews: int = 1) -> List[Dict]:
+        """
+        Stations ranked by a metric
+
+        Args:
+            metric: Any numeric field of RECORD_DTYPE
+            limit: Number of stations to return (at least 1)
+            ascending: Lowest first (e.g. for avg_rating)
+            bbox: Optional (min_lat, min_lng, max_lat, max_lng) filter
+            min_reviews: Minimum scored reviews
+
+        Returns:
+            List of station dictionaries
+        """
+        if metric not in METRIC_FIELDS:
+            raise ValueError(f"Unknown metric '{metric}'")
+        positions = self.select(bbox, min_reviews)
+        values = self.records[metric][positions].astype(np.float64)
+        # Missing values sort last either way
+        values = np.where(np.isnan(values), np.inf, values if ascending else -values)
+        ranked = positions[np.argsort(values, kind='stable')[:max(int(limit), 1)]]
+        return [self.record(int(position)) for position in ranked]
+
+
+def parse_bbox(value: Optional[str]) -> Optional[Tuple[float, float, float, float]]:
+    """Parse 'min_lat,min_lng,max_lat,max_lng' (None if empty)"""
+    if not value:
+        return None
+    parts = [float(part) for part in value.split(',')]
+    if len(parts) != 4:
+        raise ValueError("bbox must be min_lat,min_lng,max_lat,max_lng")
+    return parts[0], parts[1], parts[2], parts[3]
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Memory-mapped station/score index")
+    parser.add_argument('--index', default=STATION_INDEX_FILE)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="Build the index from a places CSV")
+    build_parser.add_argument('places_file')
+    build_parser.add_argument('--stations', help="Station analysis CSV written by sentiment_analysis.py")
+
+    get_parser = subparsers.add_parser('get', help="Look up one station")
+    get_parser.add_argument('place_id')
+
+    top_parser = subparsers.add_parser('top', help="Stations ranked by a metric")
+    top_parser.add_argument('--metric', default='sentiment_score')
+    top_parser.add_argument('--limit', type=int, default=10)
+    top_parser.add_argument('--ascending', action='store_true')
+    top_parser.add_argument('--bbox')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        stations = pd.read_csv(args.stations) if args.stations else None
+        header = write_station_index(pd.read_csv(args.places_file), stations, args.index)
+        print(f"🗂️ Station index written to {args.index} ({header['count']} stations)")
+        return
+
+    index = StationIndex(args.index)
+    if args.command == 'get':
+        print(json.dumps(index.get(args.place_id), ensure_ascii=False, indent=2))
+    else:
+        for station in index.top(args.metric, args.limit, args.ascending, parse_bbox(args.bbox)):
+            print(f"   • {station[args.metric]}: {station['name']} ({station['place_id']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Per-station drill-down report pages
+
+Builds one markdown page per station (metrics, monthly trend, top complaint
+terms and recent negative reviews) from string templates, rendered across a
+process pool. Each page's input data is hashed and recorded in a manifest, so
+later runs only re-render the stations whose data changed.
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from string import Template
+from typing import Dict, List, Optional
+
+from sentiment_scorers import STOP_WORDS
+
+logger = logging.getLogger(__name__)
+
+REPORTS_DIR = "data/station_reports"
+
+STATION_TEMPLATE = Template("""# $name
+[← All stations](index.md)
+
+- **Place ID**: `$place_id`
+- **Location**: $address
+
+## 📊 Metrics
+| Metric | Value |
+|---|---|
+| Reviews analyzed | $total_reviews |
+| Average rating | $avg_rating |
+| Average polarity | $avg_polarity |
+| Positive | $positive_reviews ($positive_ratio) |
+| Neutral | $neutral_reviews |
+| Negative | $negative_reviews ($negative_ratio) |
+| Sentiment score | $sentiment_score |
+
+## 📈 Monthly Trend
+$trend
+
+## ⚠️ Top Complaint Terms
+$complaints
+
+## 📝 Recent Negative Reviews
+$negative_reviews_list
+""")
+
+INDEX_TEMPLATE = Template("""# 🏪 Raizen Gas Stations - Station Reports
+$count stations, ordered by sentiment score.
+
+| Station | Location | Reviews | Avg Rating | Positive | Negative | Score |
+|---|---|---|---|---|---|---|
+$rows
+""")
+
+
+def _complaint_terms(texts: List[str], top_n: int) -> List[List]:
+    words = re.sub(r'[^\w\s]', ' ', ' '.join(texts).lower()).split()
+    counts = Counter(word for word in words if len(word) > 2 and word not in STOP_WORDS)
+    return [[word, count] for word, count in counts.most_common(top_n)]
+
+
+def build_station_payloads(station_df, reviews_df, rollups=None, top_terms: int = 10,
+                           recent_negative: int = 5) -> List[Dict]:
+    """
+    Collect the data each station page is rendered from
+
+    Args:
+        station_df: Output of RaizenSentimentAnalyzer.analyze_by_station
+        reviews_df: Scored reviews (needs place_id, text, rating, sentiment, review_date)
+        rollups: Optional SentimentRollupStore for the monthly trend
+        top_terms: Number of complaint terms per station
+        recent_negative: Number of recent negative reviews per station
+
+    Returns:
+        List of JSON-serializable payloads, one per station
+    """
+    reviews_by_station = {place_id: group for place_id, group in reviews_df.groupby('place_id')}
+    payloads = []
+
+    for station in station_df.to_dict('records'):
+        place_reviews = reviews_by_station.get(station['place_id'])
+        negative = place_reviews[place_reviews['sentiment'] == 'negative'] if place_reviews is not None else None
+
+        if rollups is not None:
+            trend = [[bucket['bucket'], bucket['count'], bucket['avg_rating'], bucket['negative']]
+                     for bucket in rollups.series('month', station['place_id'])]
+        else:
+            trend = []
+
+        complaints = []
+        recent = []
+        if negative is not None and len(negative):
+            complaints = _complaint_terms(negative['text'].astype(str).tolist(), top_terms)
+            latest = negative.sort_values('review_date', ascending=False).head(recent_negative)
+            recent = [[str(review['review_date']), int(review['rating']), str(review['text'])]
+                      for review in latest.to_dict('records')]
+
+        payloads.append({
+            'place_id': station['place_id'],
+            'station': {key: (value.item() if hasattr(value, 'item') else value) for key, value in station.items()},
+            'trend': trend,
+            'complaints': complaints,
+            'recent_negative': recent
+        })
+
+    return payloads
+
+
+def payload_hash(payload: Dict) -> str:
+    """Content hash of a station payload, used to skip unchanged pages"""
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def _markdown_text(text) -> str:
+    return str(text).replace('|', '\\|').replace('\n', ' ')
+
+
+def render_station_page(payload: Dict) -> str:
+    """Render one station page from its payload"""
+    station = payload['station']
+
+    if payload['trend']:
+        trend = "| Month | Reviews | Avg Rating | Negative |\n|---|---|---|---|\n" + '\n'.join(
+            f"| {month} | {count} | {avg_rating:.2f} | {negative} |" if avg_rating is not None
+            else f"| {month} | {count} | - | {negative} |"
+            for month, count, avg_rating, negative in payload['trend']
+        )
+    else:
+        trend = "_No dated reviews._"
+
+    complaints = '\n'.join(f"- **{word}**: {count}" for word, count in payload['complaints']) \
+        or "_No negative reviews._"
+    negative_reviews_list = '\n'.join(
+        f"- {date} — {'⭐' * rating}\n  > {_markdown_text(text)}" for date, rating, text in payload['recent_negative']
+    ) or "_No negative reviews._"
+
+    return STATION_TEMPLATE.substitute(
+        name=station['name'],
+        place_id=station['place_id'],
+        address=station['address'],
+        total_reviews=station['total_reviews'],
+        avg_rating=f"{station['avg_rating']:.2f}",
+        avg_polarity=f"{station['avg_polarity']:.3f}",
+        positive_reviews=station['positive_reviews'],
+        positive_ratio=f"{station['positive_ratio']:.1%}",
+        neutral_reviews=station['neutral_reviews'],
+        negative_reviews=station['negative_reviews'],
+        negative_ratio=f"{station['negative_ratio']:.1%}",
+        sentiment_score=station['sentiment_score'],
+        trend=trend,
+        complaints=complaints,
+        negative_reviews_list=negative_reviews_list
+    )
+
+
+def _render_batch(payloads: List[Dict], output_dir: str) -> int:
+    for payload in payloads:
+        page = render_station_page(payload)
+        with open(Path(output_dir) / f"{payload['place_id']}.md", 'w', encoding='utf-8') as f:
+            f.write(page)
+    return len(payloads)
+
+
+def generate_station_reports(station_df, reviews_df, rollups=None, output_dir: str = REPORTS_DIR,
+                             workers: Optional[int] = None, batch_size: int = 50, force: bool = False) -> Dict:
+    """
+    Render per-station pages, skipping stations whose data did not change
+
+    Args:
+        station_df: Output of RaizenSentimentAnalyzer.analyze_by_station
+        reviews_df: Scored reviews
+        rollups: Optional SentimentRollupStore for the monthly trend
+        output_dir: Directory for the pages, index and manifest
+        workers: Number of worker processes (defaults to the CPU count)
+        batch_size: Pages per worker task
+        force: Re-render every page regardless of the manifest (the manifest
+            is still read to remove pages of stations that left the analysis)
+
+    Returns:
+        Dictionary with rendered/unchanged/removed page counts
+    """
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    manifest_file = output / "manifest.json"
+
+    previous = {}
+    if manifest_file.exists():
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+
+    payloads = build_station_payloads(station_df, reviews_df, rollups)
+    hashes = {payload['place_id']: payload_hash(payload) for payload in payloads}
+    changed = [payload for payload in payloads
+               if force or previous.get(payload['place_id']) != hashes[payload['place_id']]
+               or not (output / f"{payload['place_id']}.md").exists()]
+
+    batches = [changed[i:i + batch_size] for i in range(0, len(changed), batch_size)]
+    if len(batches) > 1:
+        # Called from a pipeline thread while other stages run: spawn, as
+        # forking a threaded process can copy locks (logging, stdout) mid-use
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            rendered = sum(pool.map(_render_batch, batches, [output_dir] * len(batches)))
+    else:
+        rendered = sum(_render_batch(batch, output_dir) for batch in batches)
+
+    # Drop pages of stations that are no longer in the analysis
+    removed = 0
+    for place_id in set(previous) - set(hashes):
+        page = output / f"{place_id}.md"
+        if page.exists():
+            page.unlink()
+        removed += 1
+
+    rows = '\n'.join(
+        f"| [{_markdown_text(station['name'])}]({station['place_id']}.md) | {_markdown_text(station['address'])} | "
+        f"{station['total_reviews']} | {station['avg_rating']:.2f} | {station['positive_ratio']:.1%} | "
+        f"{station['negative_ratio']:.1%} | {station['sentiment_score']} |"
+        for station in (payload['station'] for payload in payloads)
+    )
+    with open(output / "index.md", 'w', encoding='utf-8') as f:
+        f.write(INDEX_TEMPLATE.substitute(count=len(payloads), rows=rows))
+
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(hashes, f, indent=2)
+
+    summary = {'rendered': rendered, 'unchanged': len(payloads) - len(changed), 'removed': removed}
+    logger.info(f"Station reports: {summary}")
+    return summary
@@ -0,0 +1,312 @@
+"""
+Complaint-profile similarity between stations
+
+Every station's complaint text (its negative reviews) becomes one row of a
+sparse, L2-normalized TF-IDF matrix over accent-folded terms, so stations with
+the same problem mix (slow service, prices, bathrooms, ...) have a high cosine
+similarity. "Stations most similar to X" is a sparse row-times-matrix product
+through a column (term) index, touching only stations that share a term with X.
+
+For very large networks an approximate index is kept as well: a random
+projection of every row to a short dense sketch, whose dot products estimate
+the cosine. Approximate queries rank by sketch and re-score only the best
+candidates exactly.
+
+The matrix is stored as plain CSR arrays (no scipy dependency).
+
+Usage:
+    python station_similarity.py build data/raizen_places_reviews_..._reviews.csv
+    python station_similarity.py query ChIJNfsZ_rhXuAARjNK8xskk1zU
+"""
+
+import argparse
+import json
+import logging
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from sentiment_scorers import STOP_WORDS, LexiconScorer
+from text_utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+SIMILARITY_INDEX_FILE = "data/station_similarity.npz"
+
+_STOP_TOKENS = frozenset(LexiconScorer.normalize(word) for word in STOP_WORDS)
+
+
+def complaint_reviews(reviews_df: pd.DataFrame) -> pd.DataFrame:
+    """Negative reviews by text sentiment when scored, otherwise by a 1-2 star rating"""
+    if 'sentiment' in reviews_df.columns:
+        return reviews_df[reviews_df['sentiment'] == 'negative']
+    return reviews_df[reviews_df['rating'] <= 2]
+
+
+class StationSimilarityIndex:
+    """Sparse TF-IDF station profiles with exact and approximate top-k cosine queries"""
+
+    def __init__(self, place_ids: List[str], names: List[str], vocabulary: List[str],
+                 indptr: np.ndarray, indices: np.ndarray, data: np.ndarray,
+                 sketch_dim: int = 128, seed: int = 0):
+        """
+        Args:
+            place_ids: Station of each row
+            names: Station names
+            vocabulary: Term of each column
+            indptr, indices, data: L2-normalized CSR rows
+            sketch_dim: Length of the dense sketches of the approximate index
+            seed: Seed of the random projection
+        """
+        self.place_ids = place_ids
+        self.names = names
+        self.vocabulary = vocabulary
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.sketch_dim = sketch_dim
+        self.seed = seed
+        self._row_of = {place_id: row for row, place_id in enumerate(place_ids)}
+
+        # Column index (CSC view) for row-times-matrix products
+        order = np.argsort(indices, kind='stable')
+        row_numbers = np.repeat(np.arange(len(place_ids), dtype=np.int32), np.diff(indptr))
+        self._col_rows = row_numbers[order]
+        self._col_data = data[order]
+        self._col_ptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(indices, minlength=len(vocabulary)), out=self._col_ptr[1:])
+
+        self._sketches = self._sketch()
+
+    @classmethod
+    def build(cls, reviews_df: pd.DataFrame, places_df: Optional[pd.DataFrame] = None,
+              min_reviews: int = 3, min_df: int = 2, max_df: float = 0.5, complaints_only: bool = True,
+              **kwargs) -> 'StationSimilarityIndex':
+        """
+        Build station profiles from reviews
+
+        Args:
+            reviews_df: Reviews with place_id and text (and sentiment or rating)
+            places_df: Optional places with place_id and name for display
+            min_reviews: Minimum complaint reviews for a station to get a profile
+            min_df: Minimum number of stations a term must appear in
+            max_df: Maximum share of stations a term may appear in
+            complaints_only: Profile negative reviews only (otherwise all reviews)
+            **kwargs: Passed to the constructor
+
+        Returns:
+            StationSimilarityIndex instance
+        """
+        reviews = complaint_reviews(reviews_df) if complaints_only else reviews_df
+        reviews = reviews[reviews['text'].notna()]
+
+        counts: Dict[str, Counter] = {}
+        review_counts = Counter()
+        for place_id, text in zip(reviews['place_id'], reviews['text']):
+            terms = counts.setdefault(place_id, Counter())
+            terms.update(token for token in tokenize(text) if len(token) > 2 and token not in _STOP_TOKENS)
+            review_counts[place_id] += 1
+
+        place_ids = sorted(place_id for place_id in counts if review_counts[place_id] >= min_reviews)
+        document_frequency = Counter()
+        for place_id in place_ids:
+            document_frequency.update(counts[place_id].keys())
+
+        max_stations = max(int(max_df * len(place_ids)), min_df)
+        vocabulary = sorted(term for term, df in document_frequency.items() if min_df <= df <= max_stations)
+        column_of = {term: column for column, term in enumerate(vocabulary)}
+        idf = np.array([np.log((1 + len(place_ids)) / (1 + document_frequency[term])) + 1 for term in vocabulary])
+
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for place_id in place_ids:
+            row = sorted((column_of[term], count) for term, count in counts[place_id].items() if term in column_of)
+            columns = np.array([column for column, _ in row], dtype=np.int32)
+            # Sublinear term frequency, then L2 normalization
+            weights = (1 + np.log([count for _, count in row])) * idf[columns] if row else np.empty(0)
+            norm = np.linalg.norm(weights)
+            indices.extend(columns.tolist())
+            data.extend((weights / norm if norm else weights).tolist())
+            indptr.append(len(indices))
+
+        names = {}
+        if places_df is not None:
+            names = dict(zip(places_df['place_id'], places_df['name']))
+        elif 'place_name' in reviews_df.columns:
+            names = dict(zip(reviews_df['place_id'], reviews_df['place_name']))
+
+        return cls(place_ids, [str(names.get(place_id, '')) for place_id in place_ids], vocabulary,
+                   np.array(indptr, dtype=np.int64), np.array(indices, dtype=np.int32),
+                   np.array(data, dtype=np.float32), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.place_ids)
+
+    def _sketch(self) -> np.ndarray:
+        """Random-projection sketches of every row (approximate index)"""
+        generator = np.random.RandomState(self.seed)
+        projection = generator.standard_normal((len(self.vocabulary), self.sketch_dim)).astype(np.float32)
+        projection /= np.sqrt(self.sketch_dim)
+        sketches = np.zeros((len(self.place_ids), self.sketch_dim), dtype=np.float32)
+        row_numbers = np.repeat(np.arange(len(self.place_ids)), np.diff(self.indptr))
+        np.add.at(sketches, row_numbers, self.data[:, None] * projection[self.indices])
+        norms = np.linalg.norm(sketches, axis=1, keepdims=True)
+        return sketches / np.where(norms > 0, norms, 1)
+
+    def _row(self, place_id: str):
+        row = self._row_of.get(place_id)
+        if row is None:
+            raise KeyError(f"No complaint profile for station '{place_id}'")
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return row, self.indices[start:end], self.data[start:end]
+
+    def _exact_scores(self, columns: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Sparse row-times-matrix product through the column index"""
+        starts, ends = self._col_ptr[columns], self._col_ptr[columns + 1]
+        lengths = ends - starts
+        if not lengths.sum():
+            return np.zeros(len(self.place_ids))
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return np.bincount(self._col_rows[positions],
+                           weights=self._col_data[positions] * np.repeat(weights, lengths),
+                           minlength=len(self.place_ids))
+
+    def _row_scores(self, columns: np.ndarray, weights: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Sparse dot products of the query with the given rows only (columns are sorted)"""
+        starts, ends = self.indptr[rows], self.indptr[rows + 1]
+        lengths = ends - starts
+        if not len(columns) or not lengths.sum():
+            return np.zeros(len(rows))
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        row_columns = self.indices[positions]
+        at = np.minimum(np.searchsorted(columns, row_columns), len(columns) - 1)
+        products = np.where(columns[at] == row_columns, weights[at] * self.data[positions], 0.0)
+        return np.bincount(np.repeat(np.arange(len(rows)), lengths), weights=products, minlength=len(rows))
+
+    def _shared_terms(self, columns: np.ndarray, weights: np.ndarray, row: int, top: int) -> List[str]:
+        start, end = self.indptr[row], self.indptr[row + 1]
+        common, query_at, other_at = np.intersect1d(columns, self.indices[start:end],
+                                                    assume_unique=True, return_indices=True)
+        contributions = weights[query_at] * self.data[start:end][other_at]
+        return [self.vocabulary[common[i]] for i in np.argsort(-contributions)[:top]]
+
+    def similar(self, place_id: str, k: int = 10, approximate: bool = False, candidates: int = 50) -> List[Dict]:
+        """
+        Stations whose complaint profile is most similar to a station's
+
+        Args:
+            place_id: Query station
+            k: Number of stations to return
+            approximate: Rank by sketch first and score only the best
+                ``candidates`` exactly
+            candidates: Candidates scored exactly in approximate mode
+
+        Returns:
+            List of dictionaries with place_id, name, similarity and the
+            terms contributing most to it
+        """
+        row, columns, weights = self._row(place_id)
+
+        if approximate:
+            estimates = self._sketches @ self._sketches[row]
+            estimates[row] = -np.inf
+            pool = np.argpartition(-estimates, min(candidates, len(estimates) - 1))[:candidates]
+            scores = np.full(len(self.place_ids), -np.inf)
+            scores[pool] = self._row_scores(columns, weights, pool)
+        else:
+            scores = self._exact_scores(columns, weights)
+        scores[row] = -np.inf
+
+        k = min(k, len(scores) - 1)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [{
+            'place_id': self.place_ids[other],
+            'name': self.names[other],
+            'similarity': round(float(scores[other]), 4),
+            'shared_terms': self._shared_terms(columns, weights, other, 5)
+        } for other in top if scores[other] > 0]
+
+    def profile(self, place_id: str, top: int = 10) -> List[List]:
+        """Highest-weighted complaint terms of a station"""
+        _, columns, weights = self._row(place_id)
+        order = np.argsort(-weights)[:top]
+        return [[self.vocabulary[columns[i]], round(float(weights[i]), 4)] for i in order]
+
+    def save(self, path: str = SIMILARITY_INDEX_FILE) -> str:
+        """
+        Persist the CSR arrays and labels as .npz
+
+        Args:
+            path: Output file path
+
+        Returns:
+            Path to the written file
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        labels = json.dumps({'place_ids': self.place_ids, 'names': self.names, 'vocabulary': self.vocabulary,
+                             'sketch_dim': self.sketch_dim, 'seed': self.seed}, ensure_ascii=False)
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, indptr=self.indptr, indices=self.indices, data=self.data,
+                                labels=np.array([labels], dtype=object))
+        logger.info(f"Station similarity index saved: {path} ({len(self)} stations, {len(self.vocabulary)} terms)")
+        return path
+
+    @classmethod
+    def load(cls, path: str = SIMILARITY_INDEX_FILE) -> 'StationSimilarityIndex':
+        """
+        Load an index written by save()
+
+        Args:
+            path: Input file path
+
+        Returns:
+            StationSimilarityIndex instance
+        """
+        with np.load(path, allow_pickle=True) as data:
+            labels = json.loads(data['labels'][0])
+            return cls(labels['place_ids'], labels['names'], labels['vocabulary'],
+                       data['indptr'], data['indices'], data['data'],
+                       sketch_dim=labels['sketch_dim'], seed=labels['seed'])
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Complaint-profile similarity between stations")
+    parser.add_argument('--index', default=SIMILARITY_INDEX_FILE)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="Build profiles from a reviews CSV (1-2 star reviews)")
+    build_parser.add_argument('reviews_file')
+    build_parser.add_argument('--places-file')
+    build_parser.add_argument('--min-reviews', type=int, default=3)
+
+    query_parser = subparsers.add_parser('query', help="Stations most similar to a station")
+    query_parser.add_argument('place_id')
+    query_parser.add_argument('-k', type=int, default=10)
+    query_parser.add_argument('--approximate', action='store_true')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        places = pd.read_csv(args.places_file) if args.places_file else None
+        index = StationSimilarityIndex.build(pd.read_csv(args.reviews_file), places, min_reviews=args.min_reviews)
+        index.save(args.index)
+        print(f"🧭 Profiled {len(index)} stations over {len(index.vocabulary)} terms")
+    else:
+        index = StationSimilarityIndex.load(args.index)
+        print(f"🧭 Complaint profile: {', '.join(term for term, _ in index.profile(args.place_id))}")
+        for station in index.similar(args.place_id, k=args.k, approximate=args.approximate):
+            print(f"   • {station['similarity']:.3f} {station['name']} ({station['place_id']}): "
+                  f"{', '.join(station['shared_terms'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""
+Text helpers shared by the review indexes
+
+``tokenize`` is the one tokenization the search index, the near-duplicate
+detector, the station similarity profiles and the author and company name
+keys agree on: accent-folded, lowercased runs of letters and digits.
+"""
+
+import re
+from typing import List
+
+from sentiment_scorers import LexiconScorer
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, accent-folded tokens of a text (``Não funcionou`` -> ``nao``, ``funcionou``)"""
+    return _TOKEN_PATTERN.findall(LexiconScorer.normalize(text))
@@ -1,8 +1,23 @@
-from flask import Flask, render_template, request, jsonify, send_file
-from google_places_extractor import GooglePlacesReviewsAPI, load_place_ids_from_json
+from flask import Flask, Response, render_template, request, jsonify, send_file, stream_with_context
+from google_places_extractor import StreamingExporter, load_place_companies, load_place_ids_from_json
+from client_pool import PlacesClientPool
+from sentiment_rollups import ROLLUPS_FILE, SentimentRollupStore
+from review_search import SEARCH_INDEX_FILE, ReviewSearchIndex
+from station_bundle import StationBundleCache
+from station_similarity import SIMILARITY_INDEX_FILE, StationSimilarityIndex
+from station_index import STATION_INDEX_FILE, StationIndex, parse_bbox
+from reviewer_index import REVIEWER_INDEX_FILE, ReviewerIndex
+from region_rollups import REGION_ROLLUPS_FILE, RegionRollups
+from company_rollups import COMPANY_ROLLUPS_FILE, CompanyRollupStore
+from review_export import EXPORT_DIR, EXPORT_FORMATS, ExportFilters, find_dataset, parse_columns, stream_export
+from sentiment_alerts import ALERT_STATE_FILE, SentimentAlertEngine, journal_places
+from snapshot_store import SNAPSHOTS_DIR, SnapshotStore
 from datetime import datetime
+from pathlib import Path
 import logging
 import json
+import os
+import threading
 
 app = Flask(__name__)
 
@@ -13,6 +28,72 @@ logger = logging.getLogger(__name__)
 # Global instance
 places_api = None
 
+# Shared keep-alive clients and rate limiters, one per API key
+client_pool = PlacesClientPool(idle_timeout=600)
+
+# Station -> company (RAZAOSOCIAL) mapping stamped onto extracted places
+PLACE_COMPANIES_SOURCE = "place_razao_table.json"
+
+# Precomputed frontend station bundle written by station_bundle.py
+station_bundle = StationBundleCache()
+
+# Online alerting over every place the fetch endpoints ingest
+alert_engine = SentimentAlertEngine()
+alert_engine.load(ALERT_STATE_FILE)
+
+# Every extraction is also added to the compressed snapshot store
+# (EXTRACTION_SNAPSHOTS=0 turns this off); jobs share one manifest
+SNAPSHOT_EXTRACTIONS = os.environ.get('EXTRACTION_SNAPSHOTS', '1') != '0'
+snapshot_lock = threading.Lock()
+
+def snapshot_extraction(json_file):
+    """Store a finished extraction's JSON export as a snapshot; returns its manifest entry"""
+    if not SNAPSHOT_EXTRACTIONS:
+        return None
+    try:
+        with snapshot_lock:
+            return SnapshotStore(SNAPSHOTS_DIR).write_json_export(json_file)
+    except Exception as e:
+        logger.error(f"Error storing snapshot of {json_file}: {str(e)}")
+        return None
+
+def ingest_places(places) -> list:
+    """Journal freshly fetched places and feed their reviews to the alert engine"""
+    journal_places(places)
+    return alert_engine.consume_places(places)
+
+class FileBackedIndex:
+    """An index loaded from a file once, and reloaded when the file is rebuilt"""
+    
+    def __init__(self, path, loader):
+        self.path = path
+        self.loader = loader
+        self._index = None
+        self._mtime = None
+        self._lock = threading.Lock()
+    
+    def get(self):
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        with self._lock:
+            if self._index is None or mtime != self._mtime:
+                self._index = self.loader(self.path)
+                self._mtime = mtime
+            return self._index
+
+# Indexes written by sentiment_analysis.py
+search_index = FileBackedIndex(SEARCH_INDEX_FILE, ReviewSearchIndex.load)
+similarity_index = FileBackedIndex(SIMILARITY_INDEX_FILE, StationSimilarityIndex.load)
+trend_rollups = FileBackedIndex(ROLLUPS_FILE, SentimentRollupStore.load)
+
+# Memory-mapped at startup: no parsing, and the pages are shared by every worker
+station_index = FileBackedIndex(STATION_INDEX_FILE, StationIndex.load)
+region_rollups = FileBackedIndex(REGION_ROLLUPS_FILE, RegionRollups.load)
+reviewer_index = FileBackedIndex(REVIEWER_INDEX_FILE, ReviewerIndex.load)
+company_rollups = FileBackedIndex(COMPANY_ROLLUPS_FILE, CompanyRollupStore.load)
+place_companies = FileBackedIndex(PLACE_COMPANIES_SOURCE, load_place_companies)
+if os.path.exists(STATION_INDEX_FILE):
+    station_index.get()
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -47,17 +128,22 @@ def fetch_places():
             return jsonify({'error': 'No place IDs provided'}), 400
         
         global places_api
-        places_api = GooglePlacesReviewsAPI(api_key)
+        with client_pool.lease(api_key, companies=place_companies.get()) as api:
+            places_api = api
+            
+            # Process places
+            logger.info(f"Starting to process {len(place_ids)} places")
+            places_data = places_api.fetch_multiple_places(place_ids, batch_size)
         
-        # Process places
-        logger.info(f"Starting to process {len(place_ids)} places")
-        places_data = places_api.fetch_multiple_places(place_ids, batch_size)
+        alerts = ingest_places(places_data)
+        alert_engine.save(ALERT_STATE_FILE)
         
         # Export data
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         base_filename = f"raizen_places_reviews_{timestamp}"
         csv_path = places_api.export_to_csv(base_filename)
         json_path = places_api.export_to_json(base_filename)
+        snapshot = snapshot_extraction(json_path)
         
         # Prepare response
         total_reviews = sum(len(place.reviews) for place in places_data)
@@ -70,7 +156,10 @@ def fetch_places():
             'avg_rating': round(avg_rating, 2),
             'csv_places_file': f"{csv_path}_places.csv",
             'csv_reviews_file': f"{csv_path}_reviews.csv",
-            'json_file': json_path
+            'json_file': json_path,
+            'errors': dict(places_api.error_counts),
+            'alerts': len(alerts),
+            'snapshot': snapshot
         }
         
         # Get sample data for preview
@@ -86,18 +175,403 @@ def fetch_places():
         return jsonify({
             'success': True,
             'summary': summary,
-            'sample_places': sample_places
+            'sample_places': sample_places,
+            'alerts': alerts
         })
         
     except Exception as e:
         logger.error(f"Error in fetch_places: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def sse_event(event: str, data: dict) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/api/fetch-places/stream', methods=['POST'])
+def fetch_places_stream():
+    """
+    API endpoint streaming extraction results as server-sent events
+    
+    Emits a `place` event per fetched place with running aggregates, an
+    `alert` event per sentiment alert its reviews raise, a `failed` event per
+    place that could not be fetched and a final `done` event with the
+    summary and export file paths. Places are fetched lazily
+    as the response is consumed, so a slow client slows the extraction down
+    rather than making the server buffer results. Exports are written
+    incrementally and no place is kept in memory after it has been sent.
+    """
+    data = request.get_json() or {}
+    api_key = data.get('api_key')
+    place_ids = data.get('place_ids', [])
+    batch_size = data.get('batch_size', 10)
+    
+    if not api_key:
+        return jsonify({'error': 'API key is required'}), 400
+    
+    if not place_ids:
+        return jsonify({'error': 'No place IDs provided'}), 400
+    
+    def generate():
+        with client_pool.lease(api_key, companies=place_companies.get()) as api:
+            yield from stream_places(api)
+    
+    def stream_places(api):
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        exporter = StreamingExporter(f"raizen_places_reviews_{timestamp}")
+        
+        processed = 0
+        total_places = 0
+        total_reviews = 0
+        rating_sum = 0.0
+        rated_places = 0
+        alerts = 0
+        
+        try:
+            yield sse_event('start', {'total_ids': len(place_ids)})
+            
+            for place_id, place in api.iter_places(place_ids, batch_size, keep=False):
+                processed += 1
+                if place is None:
+                    yield sse_event('failed', {'place_id': place_id, 'processed': processed})
+                    continue
+                
+                exporter.write(place)
+                total_places += 1
+                total_reviews += len(place.reviews)
+                if place.rating and place.rating > 0:
+                    rating_sum += place.rating
+                    rated_places += 1
+                
+                yield sse_event('place', {
+                    'place': {
+                        'place_id': place.place_id,
+                        'name': place.name,
+                        'rating': place.rating,
+                        'reviews_count': len(place.reviews),
+                        'address': place.address[:50] + '...' if len(place.address) > 50 else place.address
+                    },
+                    'processed': processed,
+                    'total_ids': len(place_ids),
+                    'total_places': total_places,
+                    'total_reviews': total_reviews,
+                    'avg_rating': round(rating_sum / rated_places, 2) if rated_places else 0
+                })
+                
+                for alert in ingest_places([place]):
+                    alerts += 1
+                    yield sse_event('alert', alert)
+        except Exception as e:
+            logger.error(f"Error in fetch_places_stream: {str(e)}")
+            yield sse_event('error', {'error': str(e)})
+        finally:
+            csv_path = exporter.close()
+            alert_engine.save(ALERT_STATE_FILE)
+        snapshot = snapshot_extraction(exporter.json_file)
+        
+        yield sse_event('done', {
+            'summary': {
+                'total_places': total_places,
+                'total_reviews': total_reviews,
+                'avg_rating': round(rating_sum / rated_places, 2) if rated_places else 0,
+                'csv_places_file': f"{csv_path}_places.csv",
+                'csv_reviews_file': f"{csv_path}_reviews.csv",
+                'json_file': exporter.json_file,
+                'errors': dict(api.error_counts),
+                'alerts': alerts,
+                'snapshot': snapshot
+            }
+        })
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/client-pool', methods=['GET'])
+def client_pool_stats():
+    """API endpoint reporting pooled Places clients"""
+    return jsonify({'success': True, 'pool': client_pool.stats()})
+
+@app.route('/api/alerts', methods=['GET'])
+def get_alerts():
+    """API endpoint listing the most recent sentiment alerts, newest first"""
+    limit = max(request.args.get('limit', 50, type=int), 1)
+    recent = list(alert_engine.alerts)[-limit:][::-1]
+    return jsonify({'success': True, 'alerts': recent, 'stations': len(alert_engine.stations)})
+
+@app.route('/api/trends', methods=['GET'])
+def get_trends():
+    """API endpoint serving precomputed sentiment trend buckets"""
+    try:
+        granularity = request.args.get('granularity', 'month')
+        buckets = trend_rollups.get().series(
+            granularity,
+            place_id=request.args.get('place_id'),
+            start=request.args.get('start'),
+            end=request.args.get('end')
+        )
+        return jsonify({
+            'success': True,
+            'granularity': granularity,
+            'place_id': request.args.get('place_id'),
+            'buckets': buckets
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error loading trends: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/search', methods=['GET'])
+def search_reviews():
+    """API endpoint for full-text review search (terms, "phrases", OR, -exclusions)"""
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'Query parameter q is required'}), 400
+        
+        min_rating = request.args.get('min_rating', type=float)
+        max_rating = request.args.get('max_rating', type=float)
+        result = search_index.get().search(
+            query,
+            place_ids=request.args.getlist('place_id'),
+            sentiment=request.args.get('sentiment'),
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            min_rating=min_rating,
+            max_rating=max_rating,
+            page=request.args.get('page', 1, type=int),
+            per_page=min(request.args.get('per_page', 20, type=int), 100)
+        )
+        return jsonify({'success': True, 'query': query, **result})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error searching reviews: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/stations/bundle', methods=['GET'])
+def get_station_bundle():
+    """Serve the precomputed station bundle, pre-compressed and revalidated by ETag"""
+    try:
+        current = station_bundle.get()
+        if current is None:
+            return jsonify({'error': 'Station bundle not built yet. Run station_bundle.py'}), 404
+        manifest, variants = current
+        
+        etag = manifest['version']
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            encoding = station_bundle.negotiate(variants, request.headers.get('Accept-Encoding', ''))
+            response = Response(variants[encoding], mimetype='application/json')
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except Exception as e:
+        logger.error(f"Error serving station bundle: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/stations/scores', methods=['GET'])
+def station_scores():
+    """API endpoint ranking stations by a metric of the station index"""
+    try:
+        if not os.path.exists(STATION_INDEX_FILE):
+            return jsonify({'error': 'Station index not built yet. Run sentiment_analysis.py'}), 404
+        
+        stations = station_index.get().top(
+            metric=request.args.get('metric', 'sentiment_score'),
+            limit=min(max(request.args.get('limit', 20, type=int), 1), 500),
+            ascending=request.args.get('order', 'desc').lower() == 'asc',
+            bbox=parse_bbox(request.args.get('bbox')),
+            min_reviews=request.args.get('min_reviews', 1, type=int)
+        )
+        return jsonify({'success': True, 'stations': stations})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error ranking stations: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/stations/<place_id>', methods=['GET'])
+def station_scores_by_id(place_id):
+    """API endpoint for one station's metadata and sentiment metrics"""
+    try:
+        if not os.path.exists(STATION_INDEX_FILE):
+            return jsonify({'error': 'Station index not built yet. Run sentiment_analysis.py'}), 404
+        return jsonify({'success': True, 'station': station_index.get().get(place_id)})
+    except KeyError as e:
+        return jsonify({'error': str(e.args[0])}), 404
+    except Exception as e:
+        logger.error(f"Error looking up station {place_id}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/stations/<place_id>/similar', methods=['GET'])
+def similar_stations(place_id):
+    """API endpoint for stations with the most similar complaint profile"""
+    try:
+        if not os.path.exists(SIMILARITY_INDEX_FILE):
+            return jsonify({'error': 'Similarity index not built yet. Run sentiment_analysis.py'}), 404
+        
+        index = similarity_index.get()
+        k = min(request.args.get('k', 10, type=int), 100)
+        approximate = request.args.get('approximate', 'false').lower() in ('1', 'true', 'yes')
+        return jsonify({
+            'success': True,
+            'place_id': place_id,
+            'profile': index.profile(place_id),
+            'similar': index.similar(place_id, k=k, approximate=approximate)
+        })
+    except KeyError as e:
+        return jsonify({'error': str(e.args[0])}), 404
+    except Exception as e:
+        logger.error(f"Error finding similar stations: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/regions', methods=['GET'])
+@app.route('/api/regions/<state>', methods=['GET'])
+@app.route('/api/regions/<state>/<city>', methods=['GET'])
+def get_regions(state=None, city=None):
+    """API endpoint for the precomputed state -> city -> station rollups"""
+    try:
+        if not os.path.exists(REGION_ROLLUPS_FILE):
+            return jsonify({'error': 'Region rollups not built yet. Run sentiment_analysis.py'}), 404
+        
+        rollups = region_rollups.get()
+        if city is not None:
+            return jsonify({'success': True, **rollups.city(state, city)})
+        if state is not None:
+            return jsonify({'success': True, 'state': state.upper(), 'cities': rollups.city_summary(state)})
+        return jsonify({'success': True, 'generated_at': rollups.generated_at,
+                        'network': rollups.network, 'states': rollups.state_summary()})
+    except KeyError as e:
+        return jsonify({'error': str(e.args[0])}), 404
+    except Exception as e:
+        logger.error(f"Error loading region rollups: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reviewers', methods=['GET'])
+def get_reviewers():
+    """API endpoint for the most prolific (?sort=stations) or extreme (?sort=extreme) reviewers"""
+    try:
+        if not os.path.exists(REVIEWER_INDEX_FILE):
+            return jsonify({'error': 'Reviewer index not built yet. Run sentiment_analysis.py'}), 404
+        
+        index = reviewer_index.get()
+        sort = request.args.get('sort', 'stations')
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+        if sort == 'stations':
+            reviewers = index.prolific(limit, min_stations=request.args.get('min_stations', 2, type=int))
+        elif sort == 'extreme':
+            reviewers = index.extreme(limit, min_reviews=request.args.get('min_reviews', 3, type=int))
+        else:
+            return jsonify({'error': "sort must be 'stations' or 'extreme'"}), 400
+        return jsonify({'success': True, 'total_reviewers': len(index), 'reviewers': reviewers})
+    except Exception as e:
+        logger.error(f"Error loading reviewers: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reviewers/<path:author>', methods=['GET'])
+def get_reviewer(author):
+    """API endpoint for one reviewer's statistics and reviews across stations"""
+    try:
+        if not os.path.exists(REVIEWER_INDEX_FILE):
+            return jsonify({'error': 'Reviewer index not built yet. Run sentiment_analysis.py'}), 404
+        return jsonify({'success': True, 'reviewer': reviewer_index.get().author(author)})
+    except KeyError as e:
+        return jsonify({'error': str(e.args[0])}), 404
+    except Exception as e:
+        logger.error(f"Error loading reviewer {author}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/companies', methods=['GET'])
+def get_companies():
+    """API endpoint for company (RAZAOSOCIAL) rollups, e.g. ?min_stations=2 for franchise groups"""
+    try:
+        if not os.path.exists(COMPANY_ROLLUPS_FILE):
+            return jsonify({'error': 'Company rollups not built yet. Run sentiment_analysis.py'}), 404
+        
+        rollups = company_rollups.get()
+        companies = rollups.summary(
+            sort=request.args.get('sort', 'stations'),
+            limit=min(max(request.args.get('limit', 50, type=int), 1), 500),
+            min_stations=request.args.get('min_stations', 1, type=int)
+        )
+        return jsonify({'success': True, 'total_companies': len(rollups), 'generated_at': rollups.generated_at,
+                        'companies': companies})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error loading company rollups: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/companies/<path:name>', methods=['GET'])
+def get_company(name):
+    """API endpoint for one company's rollup and its stations"""
+    try:
+        if not os.path.exists(COMPANY_ROLLUPS_FILE):
+            return jsonify({'error': 'Company rollups not built yet. Run sentiment_analysis.py'}), 404
+        return jsonify({'success': True, 'company': company_rollups.get().company(name)})
+    except KeyError as e:
+        return jsonify({'error': str(e.args[0])}), 404
+    except Exception as e:
+        logger.error(f"Error loading company {name}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/export', methods=['GET'])
+def export_reviews():
+    """
+    API endpoint streaming a filtered review export as CSV or NDJSON
+    
+    Filters: place_id (repeatable), sentiment, min_rating, max_rating,
+    start/end (YYYY-MM-DD), bbox (min_lat,min_lng,max_lat,max_lng). Output:
+    columns (comma-separated), format (csv or ndjson), gzip=true for a
+    compressed download, dataset (extraction base name, default the latest).
+    Rows are read, filtered and sent chunk by chunk with chunked transfer
+    encoding, so memory use does not grow with the export size.
+    """
+    try:
+        reviews_file, places_file = find_dataset(request.args.get('dataset'), EXPORT_DIR)
+        filters = ExportFilters(
+            place_ids=request.args.getlist('place_id'),
+            sentiment=request.args.get('sentiment') or None,
+            min_rating=request.args.get('min_rating', type=float),
+            max_rating=request.args.get('max_rating', type=float),
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            bbox=parse_bbox(request.args.get('bbox'))
+        )
+        columns = parse_columns(request.args.get('columns'))
+        fmt = request.args.get('format', 'csv').lower()
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+        compress = request.args.get('gzip', 'false').lower() in ('1', 'true', 'yes')
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    filename = f"{Path(reviews_file).name[:-len('.csv')]}_export.{fmt}" + ('.gz' if compress else '')
+    blocks = stream_export(reviews_file, places_file, filters, columns, fmt, compress,
+                           scorer=os.environ.get('EXPORT_SCORER', 'lexicon'), companies=place_companies.get())
+    return Response(
+        stream_with_context(blocks),
+        mimetype='application/gzip' if compress else EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/download/<path:filename>')
 def download_file(filename):
-    """Download exported files"""
+    """Download exported files (only from the export directory)"""
     try:
-        return send_file(filename, as_attachment=True)
+        path = Path(filename).resolve()
+        if not path.is_relative_to(Path(EXPORT_DIR).resolve()) or not path.is_file():
+            return jsonify({'error': f"File not found: {filename}"}), 404
+        return send_file(path, as_attachment=True)
     except Exception as e:
         logger.error(f"Error downloading file {filename}: {str(e)}")
         return jsonify({'error': str(e)}), 404
@@ -2,6 +2,28 @@ import { useState, useEffect } from 'react'
 import { AlertCircle, RefreshCw } from 'lucide-react'
 import { cleanStationData } from '../utils/dataUtils'
 
+const STATION_BUNDLE_FORMAT = 1
+
+/**
+ * Fetch the backend's precomputed station bundle
+ * @returns {Object|null} - Bundle, or null if unavailable (falls back to the raw JSON)
+ */
+const loadStationBundle = async () => {
+  try {
+    const response = await fetch('/api/stations/bundle')
+    if (!response.ok) return null
+    
+    const bundle = await response.json()
+    if (bundle.format !== STATION_BUNDLE_FORMAT || !Array.isArray(bundle.stations) || bundle.stations.length === 0) {
+      return null
+    }
+    return bundle
+  } catch (err) {
+    console.warn('Station bundle unavailable, using raw data:', err)
+    return null
+  }
+}
+
 const DataLoader = ({ onDataLoaded }) => {
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
@@ -12,6 +34,14 @@ const DataLoader = ({ onDataLoaded }) => {
       setLoading(true)
       setError(null)
       
+      // Precomputed bundle from the backend: already validated and deduplicated
+      const bundle = await loadStationBundle()
+      if (bundle) {
+        onDataLoaded(bundle.stations)
+        setLoading(false)
+        return
+      }
+      
       const response = await fetch('/raizen_places_cleaned.json')
       
       if (!response.ok) {
@@ -10,9 +10,12 @@
 export const removeDuplicateStations = (stations) => {
   if (!Array.isArray(stations)) return []
   
-  const uniqueStations = stations.filter((station, index, self) =>
-    index === self.findIndex(s => s.place_id === station.place_id)
-  )
+  const seen = new Set()
+  const uniqueStations = stations.filter(station => {
+    if (seen.has(station.place_id)) return false
+    seen.add(station.place_id)
+    return true
+  })
   
   if (uniqueStations.length !== stations.length) {
     console.warn(`Removed ${stations.length - uniqueStations.length} duplicate stations`)
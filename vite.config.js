@@ -7,6 +7,10 @@ export default defineConfig({
   plugins: [react(),tailwindcss()],
   server: {
     proxy: {
+      '/api': {
+        target: 'http://localhost:5000',
+        changeOrigin: true
+      },
       '/backend': {
         target: 'http://localhost:5173',
         changeOrigin: true,